@@ -4,6 +4,7 @@
 
 # --- Variables ---
 ENV ?= dev
+SOURCES_MODE ?= put
 
 # ===============================
 # ENVIRONMENT SETUP
@@ -25,7 +26,7 @@ create-user:
 
 set-sources:
 	@echo "📰 Setting news sources..."
-	python3 $(BUILD_SCRIPTS_DIR)/set_sources.py
+	python3 $(BUILD_SCRIPTS_DIR)/set_sources.py --mode $(SOURCES_MODE)
 
 create-bucket:
 	@echo "💾 Creating bucket..."
@@ -80,7 +81,7 @@ setup-help:
 	@echo "  layers          Create Lambda layers"
 	@echo "  config-env      Configure environment variables"
 	@echo "  create-user     Create system user"
-	@echo "  set-sources     Configure news sources"
+	@echo "  set-sources     Configure news sources [SOURCES_MODE=put|bulk|sync]"
 	@echo ""
 	@echo "  Dependencies:"
 	@echo "  check-deps      Check system dependencies"
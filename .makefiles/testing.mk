@@ -26,6 +26,78 @@ test-integration:
 	@echo "🔗 Running integration tests..."
 	$(TESTING_SCRIPTS_DIR)/integration-tests.sh
 
+import-profile:
+	@echo "⏱️  Profiling handler cold-start imports..."
+	python3 $(TESTING_SCRIPTS_DIR)/import_profile.py
+
+bench-recurrence:
+	@echo "📅 Checking recurrence expansion at DST edges and benchmarking..."
+	python3 $(TESTING_SCRIPTS_DIR)/bench_recurrence.py
+
+bench-schedule:
+	@echo "🗓️  Comparing bulk and single-item scheduling..."
+	python3 $(TESTING_SCRIPTS_DIR)/bench_schedule.py
+
+check-uploads:
+	@echo "📤 Checking multipart media uploads..."
+	python3 $(TESTING_SCRIPTS_DIR)/check_uploads.py
+
+check-media:
+	@echo "🖼️  Running the media pipeline on sample files..."
+	python3 $(TESTING_SCRIPTS_DIR)/check_media.py
+
+bench-publisher:
+	@echo "📣 Benchmarking the rate-limited publisher against a mock platform..."
+	python3 $(TESTING_SCRIPTS_DIR)/bench_publisher.py
+
+check-home-view:
+	@echo "🏠 Checking incremental home views against a rebuild..."
+	python3 $(TESTING_SCRIPTS_DIR)/check_home_view.py
+
+check-idempotency:
+	@echo "🔁 Checking that retried mutating requests run once..."
+	python3 $(TESTING_SCRIPTS_DIR)/check_idempotency.py
+
+bench-response:
+	@echo "📦 Benchmarking response serialization and compression..."
+	python3 $(TESTING_SCRIPTS_DIR)/bench_response.py
+
+bench-handlers:
+	@echo "⏱️  Benchmarking the handlers end to end on local stand-ins [SAVE=$(SAVE)]..."
+	python3 $(TESTING_SCRIPTS_DIR)/bench_handlers.py $(if $(SAVE),--save)
+
+bench-metrics:
+	@echo "📈 Benchmarking the metrics instrumentation overhead..."
+	python3 $(TESTING_SCRIPTS_DIR)/bench_metrics.py
+
+bench-logging:
+	@echo "🪵 Benchmarking per-invocation logging on large events..."
+	python3 $(TESTING_SCRIPTS_DIR)/bench_logging.py
+
+bench-dynamodb:
+	@echo "🗄️  Benchmarking the DynamoDB access layer against the boto3 resource layer..."
+	python3 $(TESTING_SCRIPTS_DIR)/bench_dynamodb.py
+
+bench-uuid:
+	@echo "🆔 Benchmarking bulk UUIDv7 generation against uuid7()..."
+	python3 $(TESTING_SCRIPTS_DIR)/bench_uuid.py
+
+check-error-scan:
+	@echo "🧮 Checking the Lambda error scans against a fake CloudWatch Logs client..."
+	python3 $(TESTING_SCRIPTS_DIR)/check_error_scan.py
+
+bench-token:
+	@echo "🔑 Benchmarking token verification cold and warm..."
+	python3 $(TESTING_SCRIPTS_DIR)/bench_token.py
+
+check-dispatch:
+	@echo "📤 Checking that the dispatcher drains missed buckets..."
+	python3 $(TESTING_SCRIPTS_DIR)/check_dispatch.py
+
+check-ingest:
+	@echo "📰 Checking feed ingestion against a local server of fixture feeds..."
+	python3 $(TESTING_SCRIPTS_DIR)/check_ingest.py
+
 # test-performance:
 # 	@echo "⚡ Running performance tests..."
 # 	$(TESTING_SCRIPTS_DIR)/performance-tests.sh
@@ -39,6 +111,10 @@ check-errors:
 	python3 $(AWS_SCRIPTS_DIR)/check_lambda_errors.py
 
 
+check-home-views:
+	@echo "🏠 Checking the deployed home views against the job records [FIX=$(FIX)]..."
+	python3 $(AWS_SCRIPTS_DIR)/check_home_views.py $(if $(FIX),--fix)
+
 delete-logs:
 	@echo "🗑️  Deleting CloudWatch logs..."
 	$(AWS_SCRIPTS_DIR)/delete-logs.sh
@@ -71,9 +147,28 @@ testing-help:
 	@echo "  test-reader    Test Lambda reader [SOURCE=name]"
 	@echo "  test-all       Run comprehensive test suite"
 	@echo "  test-integration Run integration tests"
+	@echo "  import-profile Check handler import time against budgets"
+	@echo "  bench-recurrence Check and benchmark recurring schedule expansion"
+	@echo "  bench-schedule Compare bulk and single-item scheduling"
+	@echo "  check-uploads  Check multipart media uploads end to end"
+	@echo "  check-media    Run the media pipeline on sample files"
+	@echo "  bench-publisher Benchmark rate-limited publishing against a mock platform"
+	@echo "  check-home-view Check incremental home views against a rebuild"
+	@echo "  check-idempotency Check that retried mutating requests run once"
+	@echo "  bench-response Benchmark response serialization and compression"
+	@echo "  bench-handlers Benchmark handler latency against baselines [SAVE=1]"
+	@echo "  bench-metrics  Benchmark the metrics instrumentation overhead"
+	@echo "  bench-logging  Benchmark per-invocation logging on large events"
+	@echo "  bench-dynamodb Benchmark the DynamoDB access layer against boto3's resource layer"
+	@echo "  check-ingest   Check conditional-GET feed ingestion against fixture feeds"
+	@echo "  bench-uuid     Benchmark bulk UUIDv7 generation against uuid7()"
+	@echo "  check-error-scan Check the Lambda error scans against a fake CloudWatch Logs client"
+	@echo "  bench-token    Benchmark JWKS fetch, token verification and the claims cache"
+	@echo "  check-dispatch Check that the dispatcher drains buckets missed during an outage"
 	@echo ""
 	@echo "  Error Monitoring:"
 	@echo "  check-errors   Check Lambda errors in CloudWatch"
+	@echo "  check-home-views Check deployed home views against job records [FIX=1]"
 	@echo "  delete-logs    Clean up old CloudWatch logs"
 	@echo ""
 	@echo "  Utilities:"
@@ -81,4 +176,4 @@ testing-help:
 
 
 
-.PHONY: test-reader test-all check-errors delete-logs test-integration test-setup
\ No newline at end of file
+.PHONY: test-reader test-all check-errors delete-logs test-integration test-setup import-profile bench-recurrence bench-schedule check-uploads check-media bench-publisher check-home-view check-home-views check-idempotency bench-response bench-handlers bench-metrics bench-logging bench-dynamodb check-ingest bench-uuid check-error-scan bench-token check-dispatch
\ No newline at end of file
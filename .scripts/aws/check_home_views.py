@@ -0,0 +1,148 @@
+"""
+Checks the materialized home views against the job records they are built from.
+
+Scans the table once in parallel segments, rebuilds every user's view from their job records
+with shared.views.build_home_view and compares it with the stored view. With --fix, views that
+differ are replaced by the rebuilt one, unless the stream updated them since the scan.
+
+Usage:
+    python .scripts/aws/check_home_views.py [--table-name NAME] [--segments 8] [--fix]
+"""
+
+import argparse
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import boto3
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "aws" / "src"))
+
+from shared.schedule import JOB_PREFIX
+from shared.views import HOME_VIEW_SK, build_home_view
+
+# === CONFIG ===
+TABLE_NAME_SSM_PARAMETER = "/SnapNews/common/table-name"
+AWS_REGION = "us-east-1"
+DEFAULT_SEGMENTS = 8
+VIEW_MAPS = ("Upcoming", "Results")
+
+
+def scan_segment(table: object, segment: int, segments: int) -> tuple[list[dict], list[dict]]:
+    """
+    Get the (job records, home views) of one scan segment
+    """
+    kwargs = {
+        "Segment": segment,
+        "TotalSegments": segments,
+        "FilterExpression": "begins_with(sk, :job) OR sk = :view",
+        "ExpressionAttributeValues": {":job": JOB_PREFIX, ":view": HOME_VIEW_SK},
+    }
+    jobs, views = [], []
+    while True:
+        response = table.scan(**kwargs)
+        for item in response.get("Items", []):
+            (views if item["sk"] == HOME_VIEW_SK else jobs).append(item)
+        if "LastEvaluatedKey" not in response:
+            return jobs, views
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def diff_view(expected: dict, actual: dict | None) -> dict[str, int]:
+    """
+    Count the entries a stored view is missing, has in excess, or holds with stale values. A wrong count of
+    the upcoming jobs past the kept ones (Later) is one stale value
+    """
+    counts = {"missing": 0, "extra": 0, "stale": 0}
+    for name in VIEW_MAPS:
+        wanted, stored = expected.get(name, {}), (actual or {}).get(name, {})
+        counts["missing"] += len(wanted.keys() - stored.keys())
+        counts["extra"] += len(stored.keys() - wanted.keys())
+        counts["stale"] += sum(1 for job_id in wanted.keys() & stored.keys() if wanted[job_id] != stored[job_id])
+    counts["stale"] += int(expected.get("Later", 0) != (actual or {}).get("Later", 0))
+    return counts
+
+
+def check(table: object, segments: int = DEFAULT_SEGMENTS, *, fix: bool = False) -> dict:
+    """
+    Compare every stored view with its rebuild. Returns {user id: differences} for the views that differ
+    """
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        results = list(executor.map(lambda segment: scan_segment(table, segment, segments), range(segments)))
+
+    jobs_by_user: dict[str, list[dict]] = defaultdict(list)
+    views = {}
+    for jobs, segment_views in results:
+        for job in jobs:
+            jobs_by_user[job.get("UserId")].append(job)
+        views.update({view["pk"].removeprefix("USER#"): view for view in segment_views})
+    jobs_by_user.pop(None, None)
+
+    report = {}
+    for user_id in jobs_by_user.keys() | views.keys():
+        expected = build_home_view(user_id, jobs_by_user.get(user_id, []))
+        actual = views.get(user_id)
+        differences = diff_view(expected, actual)
+        if not any(differences.values()):
+            continue
+        report[user_id] = differences
+        if fix:
+            differences["fixed"] = replace_view(table, expected, actual)
+    return report
+
+
+def replace_view(table: object, expected: dict, actual: dict | None) -> bool:
+    """
+    Write a rebuilt view, unless the stored one changed since it was scanned
+    """
+    if actual is None:
+        condition = {"ConditionExpression": "attribute_not_exists(pk)"}
+    elif "Version" not in actual:
+        condition = {"ConditionExpression": "attribute_not_exists(Version)"}
+    else:
+        condition = {"ConditionExpression": "Version = :seen", "ExpressionAttributeValues": {":seen": actual["Version"]}}
+    try:
+        # The stream records counted in Later stay counted, so a redelivered one does not move the rebuilt count
+        item = {**expected, "Counted": (actual or {}).get("Counted", []), "Version": (actual or {}).get("Version", 0) + 1}
+        table.put_item(Item=item, **condition)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return False
+    return True
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check the home views against the job records")
+    parser.add_argument("--table-name", help="Table to check; read from SSM when omitted")
+    parser.add_argument("--segments", type=int, default=DEFAULT_SEGMENTS, help="Parallel scan segments")
+    parser.add_argument("--fix", action="store_true", help="Replace the views that differ with their rebuild")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    table_name = args.table_name
+    if not table_name:
+        table_name = boto3.client("ssm", region_name=AWS_REGION).get_parameter(Name=TABLE_NAME_SSM_PARAMETER)["Parameter"]["Value"]
+    table = boto3.resource("dynamodb", region_name=AWS_REGION).Table(table_name)
+
+    print(f"Checking home views in {table_name} ({args.segments} segments)...")
+    report = check(table, args.segments, fix=args.fix)
+    for user_id, differences in sorted(report.items()):
+        print(f"  {user_id}: {differences}")
+
+    unfixed = [user_id for user_id, differences in report.items() if not differences.get("fixed")]
+    if not report:
+        print("✅ Every home view matches its job records")
+    elif not unfixed:
+        print(f"✅ Rebuilt {len(report)} home view(s)")
+    else:
+        print(f"❌ {len(unfixed)} home view(s) differ from their job records")
+    sys.exit(1 if unfixed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
+import argparse
+import heapq
+import json
 import sys
 import time
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import UTC, datetime, timedelta, timezone
+from pathlib import Path
 
 import boto3
 from botocore.exceptions import ClientError
+from log_templates import Fingerprinter, fingerprint_id
 
 # === CONFIG ===
 REGION = "us-east-1"
@@ -15,124 +21,572 @@ SEARCH_TERMS = ["ERROR", "[ERROR]"]
 # For CloudWatch filter patterns, '?' provides OR logic.
 # Terms with non-alphanumeric characters must be quoted.
 FILTER_PATTERN = f'?{SEARCH_TERMS[0]} ?"[{SEARCH_TERMS[1]}]"'
+DEFAULT_WORKERS = 8  # Concurrent filter_log_events scans
+DEFAULT_SLICES = 1  # Time slices per log group
+TOP_PATTERNS = 5
+HOUR_MS = 60 * 60 * 1000
+# Events can show up in CloudWatch a few minutes after their timestamp, so incremental runs rescan this much before the cursor
+INGESTION_LAG_MS = 5 * 60 * 1000
+STATE_FILE = Path(__file__).with_name(".lambda_errors_state.json")
+STATE_VERSION = 2
+# Logs Insights queries accept at most 50 log groups each
+INSIGHTS_MAX_GROUPS = 50
+INSIGHTS_POLL_SECONDS = 1
+# Logs Insights returns at most 10,000 rows per query
+INSIGHTS_MAX_ROWS = 10000
+INSIGHTS_QUERY = f"""fields @timestamp, @message, @log
+| filter @message like /{SEARCH_TERMS[0]}/"""
+# Hourly error counts per log group
+INSIGHTS_COUNTS_QUERY = f"""{INSIGHTS_QUERY}
+| stats count(*) as errors by @log, bin(1h) as hour"""
+# Distinct error messages per log group with their counts, most frequent first; they are fingerprinted locally
+INSIGHTS_PATTERNS_QUERY = f"""{INSIGHTS_QUERY}
+| parse @message /(?<error>{SEARCH_TERMS[0]}.*)/
+| stats count(*) as errors, min(@timestamp) as first_seen, max(@timestamp) as last_seen by @log, error
+| sort errors desc
+| limit {INSIGHTS_MAX_ROWS}"""
 
 # === TIMEZONE ===
 IST = timezone(timedelta(hours=5, minutes=30))  # UTC+5:30
 
-# === INIT CLIENT ===
-logs_client = boto3.client("logs", region_name=REGION)
 
-# === TIME RANGE ===
-now_ms = int(time.time() * 1000)
-start_ms = now_ms - (HOURS_LOOKBACK * 60 * 60 * 1000)
+def format_ts(timestamp_ms: int, fmt: str = "%Y-%m-%d %H:%M:%S") -> str:
+    return datetime.fromtimestamp(timestamp_ms / 1000, IST).strftime(fmt)
 
-print(f"Searching logs for '{' or '.join(SEARCH_TERMS)}' in last {HOURS_LOOKBACK} hours...")
-print("=" * 50)
-print(
-    f"From: {datetime.fromtimestamp(start_ms/1000, IST).isoformat()}\n",
-    f"To: {datetime.fromtimestamp(now_ms/1000, IST).isoformat()}\n",
-)
-print("=" * 50)
 
-# === GET ALL LOG GROUPS ===
-print(f"Fetching all log groups with prefix: {LAMBDA_PREFIX}")
-paginator = logs_client.get_paginator("describe_log_groups")
-log_groups = []
+def extract_error_part(message: str) -> str:
+    """
+    Extracts just the error part of a log message to save on output.
 
-try:
-    for page in paginator.paginate(logGroupNamePrefix=LAMBDA_PREFIX):
+    Args:
+        message: The raw log message.
+
+    """
+    msg = message.strip()
+    error_part = msg[:MAX_MESSAGE_LENGTH]
+    for term in SEARCH_TERMS:
+        if term in msg:
+            start_pos = msg.find(term)
+            error_part = msg[start_pos : start_pos + MAX_MESSAGE_LENGTH]
+            break
+    return error_part
+
+
+class GroupStats:
+    """
+    Running error counts, error fingerprints and the most recent samples of a log group.
+
+    Events are added one at a time, so only MAX_EVENTS_PER_GROUP samples are kept in memory however many errors are scanned.
+    Counts and fingerprints are kept in hourly buckets so that incremental runs can roll the window forward.
+    """
+
+    def __init__(self, log_group: str, max_samples: int = MAX_EVENTS_PER_GROUP, recent_after: int | None = None) -> None:
+        self.log_group = log_group
+        self.max_samples = max_samples
+        self.recent_after = recent_after
+        self.buckets = {}  # hour start (ms) -> error count
+        self.fingerprints = Fingerprinter(bucket_ms=HOUR_MS)
+        self.recent_ids = {}  # eventId -> timestamp, for events the next incremental scan may return again
+        self._samples = []  # min-heap of (timestamp, event_id, error_part)
+
+    @property
+    def count(self) -> int:
+        return sum(self.buckets.values())
+
+    def add(self, event: dict) -> None:
+        self.add_count(event["timestamp"], 1)
+        self.add_sample(event)
+        if self.recent_after is not None and event["timestamp"] >= self.recent_after and event.get("eventId"):
+            self.recent_ids[event["eventId"]] = event["timestamp"]
+
+    def add_count(self, timestamp_ms: int, count: int) -> None:
+        hour = timestamp_ms - timestamp_ms % HOUR_MS
+        self.buckets[hour] = self.buckets.get(hour, 0) + count
+
+    def add_sample(self, event: dict) -> None:
+        error_part = extract_error_part(event["message"])
+        # Track error fingerprints for summary from all found errors
+        self.fingerprints.add(error_part, event["timestamp"])
+        self._push((event["timestamp"], event.get("eventId", ""), error_part))
+
+    def add_pattern(self, message: str, count: int, first_seen: int, last_seen: int) -> None:
+        """
+        Adds `count` occurrences of one error message, seen between `first_seen` and `last_seen`, as a single sample.
+
+        Args:
+            message: The raw log message.
+            count: How many errors the message stands for.
+            first_seen: The first occurrence in epoch milliseconds.
+            last_seen: The last occurrence in epoch milliseconds.
+
+        """
+        error_part = extract_error_part(message)
+        template = self.fingerprints.add(error_part, last_seen, count)
+        entry = self.fingerprints.fingerprints.get(template)
+        if entry:
+            entry["first_seen"] = min(entry["first_seen"], first_seen)
+        self._push((last_seen, "", error_part))
+
+    def merge(self, other: "GroupStats") -> None:
+        for hour, count in other.buckets.items():
+            self.buckets[hour] = self.buckets.get(hour, 0) + count
+        self.fingerprints.merge(other.fingerprints)
+        for sample in other._samples:  # noqa: SLF001
+            self._push(sample)
+        self.recent_ids.update(other.recent_ids)
+
+    def prune(self, start_ms: int) -> None:
+        """
+        Drops everything older than the window start. Counts are dropped a whole hour at a time.
+
+        Args:
+            start_ms: Window start in epoch milliseconds.
+
+        """
+        self.buckets = {hour: count for hour, count in self.buckets.items() if hour + HOUR_MS > start_ms}
+        self.fingerprints.prune(start_ms)
+        self._samples = [sample for sample in self._samples if sample[0] >= start_ms]
+        heapq.heapify(self._samples)
+
+    def samples(self) -> list[tuple]:
+        return sorted(self._samples)
+
+    def to_dict(self) -> dict:
+        return {
+            "buckets": {str(hour): count for hour, count in self.buckets.items()},
+            "fingerprints": self.fingerprints.to_dict(),
+            "samples": [list(sample) for sample in self._samples],
+        }
+
+    @classmethod
+    def from_dict(cls, log_group: str, data: dict) -> "GroupStats":
+        stats = cls(log_group)
+        stats.buckets = {int(hour): count for hour, count in data.get("buckets", {}).items()}
+        stats.fingerprints.load(data.get("fingerprints", {}))
+        for sample in data.get("samples", []):
+            stats._push(tuple(sample))
+        return stats
+
+    def _push(self, sample: tuple) -> None:
+        if len(self._samples) < self.max_samples:
+            heapq.heappush(self._samples, sample)
+        elif sample > self._samples[0]:
+            heapq.heapreplace(self._samples, sample)
+
+
+def get_log_groups(logs_client: boto3.client, prefix: str = LAMBDA_PREFIX) -> list[str]:
+    """
+    Lists the Lambda log groups to check.
+
+    Args:
+        logs_client: The boto3 client for CloudWatch Logs.
+        prefix: The log group name prefix.
+
+    """
+    paginator = logs_client.get_paginator("describe_log_groups")
+    log_groups = []
+    for page in paginator.paginate(logGroupNamePrefix=prefix):
         for lg in page["logGroups"]:
             # Include all log groups with the prefix, regardless of last event time
             if "BucketNotificationsHandler" not in lg["logGroupName"]:
                 log_groups.append(lg["logGroupName"])
-except ClientError as e:
-    print(f"❌ Error fetching log groups: {e}")
-    sys.exit(1)
+    return log_groups
+
+
+def time_slices(start_ms: int, end_ms: int, count: int) -> list[tuple[int, int]]:
+    """
+    Splits a time window into `count` contiguous, non-overlapping slices.
+
+    Args:
+        start_ms: Window start in epoch milliseconds (inclusive).
+        end_ms: Window end in epoch milliseconds (inclusive).
+        count: Number of slices.
+
+    """
+    count = max(1, min(count, end_ms - start_ms + 1))
+    bounds = [start_ms + (end_ms - start_ms + 1) * i // count for i in range(count + 1)]
+    return [(bounds[i], bounds[i + 1] - 1) for i in range(count)]
+
+
+def scan_slice(  # noqa: PLR0913
+    logs_client: boto3.client,
+    log_group: str,
+    start_ms: int,
+    end_ms: int,
+    *,
+    seen: dict | None = None,
+    recent_after: int | None = None,
+) -> GroupStats:
+    """
+    Streams the error events of one log group and time slice into a GroupStats.
+
+    Args:
+        logs_client: The boto3 client for CloudWatch Logs.
+        log_group: The log group name.
+        start_ms: Slice start in epoch milliseconds.
+        end_ms: Slice end in epoch milliseconds.
+        seen: Event IDs already counted by a previous run, which are skipped.
+        recent_after: Remember the IDs of events at or after this timestamp for the next run.
+
+    """
+    seen = seen or {}
+    stats = GroupStats(log_group, recent_after=recent_after)
+    paginator = logs_client.get_paginator("filter_log_events")
+    for page in paginator.paginate(
+        logGroupName=log_group,
+        filterPattern=FILTER_PATTERN,
+        startTime=start_ms,
+        endTime=end_ms,
+        limit=10000,  # Max limit to ensure we get everything in a large window
+    ):
+        for event in page.get("events", []):
+            if event.get("eventId") not in seen:
+                stats.add(event)
+    return stats
+
+
+def scan_log_groups(  # noqa: PLR0913
+    logs_client: boto3.client,
+    log_groups: list[str],
+    start_ms: int,
+    end_ms: int,
+    *,
+    workers: int = DEFAULT_WORKERS,
+    slices: int = DEFAULT_SLICES,
+    checkpoints: dict | None = None,
+) -> dict[str, GroupStats]:
+    """
+    Scans every log group and time slice concurrently from a bounded pool.
+
+    Args:
+        logs_client: The boto3 client for CloudWatch Logs.
+        log_groups: The log group names.
+        start_ms: Window start in epoch milliseconds.
+        end_ms: Window end in epoch milliseconds.
+        workers: Maximum number of concurrent scans.
+        slices: Number of time slices per log group.
+        checkpoints: Per log group cursors from a previous run. Only events after the cursor are scanned.
+
+    Returns:
+        A dictionary of log group name to GroupStats. Groups that could not be read are left out.
+    """
+    checkpoints = checkpoints or {}
+    results = {log_group: GroupStats(log_group) for log_group in log_groups}
+    tasks = []
+    for log_group in log_groups:
+        checkpoint = checkpoints.get(log_group, {})
+        # Rescan a little before the cursor for late-ingested events; the ones already counted are skipped by ID
+        group_start = max(start_ms, checkpoint.get("cursor", start_ms) - INGESTION_LAG_MS)
+        for slice_start, slice_end in time_slices(group_start, end_ms, slices):
+            tasks.append((log_group, slice_start, slice_end, checkpoint.get("seen", {})))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            executor.submit(
+                scan_slice,
+                logs_client,
+                log_group,
+                slice_start,
+                slice_end,
+                seen=seen,
+                recent_after=end_ms - INGESTION_LAG_MS,
+            ): log_group
+            for log_group, slice_start, slice_end, seen in tasks
+        }
+        for future in as_completed(futures):
+            log_group = futures[future]
+            try:
+                stats = future.result()
+                if log_group in results:
+                    results[log_group].merge(stats)
+            except logs_client.exceptions.ResourceNotFoundException:
+                if results.pop(log_group, None):
+                    print(f"⚠️  Log group not found. Skipping: {log_group}")
+            except ClientError as e:
+                if results.pop(log_group, None):
+                    print(f"⚠️  Error accessing log group {log_group}: {e}")
+
+    return results
+
+
+def run_insights_query(logs_client: boto3.client, log_groups: list[str], query: str, start_ms: int, end_ms: int) -> list[dict]:
+    """
+    Runs a CloudWatch Logs Insights query and waits for its results.
+
+    Args:
+        logs_client: The boto3 client for CloudWatch Logs.
+        log_groups: Up to 50 log group names.
+        query: The Logs Insights query string.
+        start_ms: Window start in epoch milliseconds.
+        end_ms: Window end in epoch milliseconds.
+
+    Returns:
+        The result rows as dictionaries of field name to value.
+    """
+    query_id = logs_client.start_query(
+        logGroupNames=log_groups,
+        startTime=start_ms // 1000,
+        endTime=end_ms // 1000,
+        queryString=query,
+    )["queryId"]
+
+    while True:
+        response = logs_client.get_query_results(queryId=query_id)
+        if response["status"] in ("Complete", "Failed", "Cancelled", "Timeout"):
+            break
+        time.sleep(INSIGHTS_POLL_SECONDS)
+
+    if response["status"] != "Complete":
+        print(f"⚠️  Insights query {query_id} ended with status {response['status']}")
+    return [{field["field"]: field["value"] for field in row} for row in response.get("results", [])]
+
 
-if not log_groups:
-    print(f"No log groups found with prefix {LAMBDA_PREFIX}")
-    sys.exit(0)
+def parse_insights_ts(value: str) -> int:
+    # Aggregated timestamps (min/max) can come back as epoch milliseconds
+    if value.isdigit():
+        return int(value)
+    return int(datetime.strptime(value, "%Y-%m-%d %H:%M:%S.%f").replace(tzinfo=UTC).timestamp() * 1000)
 
-print(f"Found {len(log_groups)} log group(s):")
-for lg in log_groups:
-    print(f"- {lg}")
 
-# === SEARCH EACH LOG GROUP ===
-total_errors = 0
-error_summary = {}
+def insights_scan(logs_client: boto3.client, log_groups: list[str], start_ms: int, end_ms: int) -> dict[str, GroupStats]:
+    """
+    Aggregates errors with Logs Insights, so large windows are counted server side.
 
-for log_group in log_groups:
-    print(f"\n🔍 Checking log group: {log_group}")
+    Error counts and fingerprint counts both come from stats queries. A noisy log group therefore cannot
+    crowd out the samples of the others, and each group keeps its newest MAX_EVENTS_PER_GROUP distinct errors.
 
+    Args:
+        logs_client: The boto3 client for CloudWatch Logs.
+        log_groups: The log group names.
+        start_ms: Window start in epoch milliseconds.
+        end_ms: Window end in epoch milliseconds.
+
+    """
+    results = {log_group: GroupStats(log_group) for log_group in log_groups}
+
+    for i in range(0, len(log_groups), INSIGHTS_MAX_GROUPS):
+        chunk = log_groups[i : i + INSIGHTS_MAX_GROUPS]
+        counts = run_insights_query(logs_client, chunk, INSIGHTS_COUNTS_QUERY, start_ms, end_ms)
+        patterns = run_insights_query(logs_client, chunk, INSIGHTS_PATTERNS_QUERY, start_ms, end_ms)
+
+        for row in patterns:
+            # @log is "<account id>:<log group name>"
+            stats = results.get(row.get("@log", "").split(":", 1)[-1])
+            if stats and row.get("error"):
+                stats.add_pattern(
+                    row["error"],
+                    int(row.get("errors", 0)),
+                    parse_insights_ts(row["first_seen"]),
+                    parse_insights_ts(row["last_seen"]),
+                )
+
+        for row in counts:
+            stats = results.get(row.get("@log", "").split(":", 1)[-1])
+            if stats:
+                stats.add_count(parse_insights_ts(row["hour"]), int(row.get("errors", 0)))
+
+    return results
+
+
+def load_state(path: Path) -> dict:
+    """
+    Loads the per log group cursors and rolling aggregates of previous incremental runs.
+
+    Args:
+        path: The state file path.
+
+    """
+    if not path.exists():
+        return {"version": STATE_VERSION, "groups": {}}
     try:
-        paginator = logs_client.get_paginator("filter_log_events")
-        all_events = []
-
-        # We'll collect all events up to the API limit to ensure we scan the whole range
-        for page in paginator.paginate(
-            logGroupName=log_group,
-            filterPattern=FILTER_PATTERN,
-            startTime=start_ms,
-            endTime=now_ms,
-            limit=10000,  # Max limit to ensure we get everything in a large window
-        ):
-            events = page.get("events", [])
-            if events:
-                all_events.extend(events)
-
-        group_error_count = len(all_events)
-        if group_error_count > 0:
-            total_errors += group_error_count
-            display_events = all_events[:MAX_EVENTS_PER_GROUP]
-
-            print(f"❌ Found {group_error_count} error log(s). Showing up to {MAX_EVENTS_PER_GROUP}:")
-
-            for event in display_events:
-                ts = datetime.fromtimestamp(event["timestamp"] / 1000, IST).strftime("%Y-%m-%d %H:%M:%S")
-                msg = event["message"].strip()
-
-                # Extract just the error part to save on output
-                error_part = msg[:MAX_MESSAGE_LENGTH]
-                for term in SEARCH_TERMS:
-                    if term in msg:
-                        start_pos = msg.find(term)
-                        error_part = msg[start_pos : start_pos + MAX_MESSAGE_LENGTH]
-                        break
-
-                print(f"  [{ts}] {error_part}")
-
-                # Track error patterns for summary from all found errors
-                error_key = error_part.split("\n")[0][:50]
-                error_summary[error_key] = error_summary.get(error_key, 0) + 1
-
-        if group_error_count == 0:
-            print("✅ No error logs found in this group.")
-        else:
-            print(f"📊 Total errors in this group: {group_error_count}")
-
-    except logs_client.exceptions.ResourceNotFoundException:
-        print("⚠️  Log group not found. Skipping.")
+        state = json.loads(path.read_text())
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️  Could not read state file {path}, starting a full scan: {e}")
+        return {"version": STATE_VERSION, "groups": {}}
+    if state.get("version") != STATE_VERSION:
+        print(f"⚠️  State file {path} has an unknown version, starting a full scan")
+        return {"version": STATE_VERSION, "groups": {}}
+    return state
+
+
+def save_state(path: Path, state: dict) -> None:
+    """
+    Writes the state file atomically, so an interrupted run never leaves a truncated file behind.
+
+    Args:
+        path: The state file path.
+        state: The state to persist.
+
+    """
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(state, separators=(",", ":")))
+    tmp_path.replace(path)
+
+
+def incremental_scan(  # noqa: PLR0913
+    logs_client: boto3.client,
+    log_groups: list[str],
+    start_ms: int,
+    end_ms: int,
+    state: dict,
+    *,
+    workers: int = DEFAULT_WORKERS,
+    slices: int = DEFAULT_SLICES,
+) -> dict[str, GroupStats]:
+    """
+    Scans only the events logged since the previous run and merges them into the rolling aggregates kept in the state.
+
+    Args:
+        logs_client: The boto3 client for CloudWatch Logs.
+        log_groups: The log group names.
+        start_ms: Window start in epoch milliseconds.
+        end_ms: Window end in epoch milliseconds.
+        state: The state loaded by load_state. It is updated in place with the new cursors and aggregates.
+        workers: Maximum number of concurrent scans.
+        slices: Number of time slices per log group.
+
+    """
+    checkpoints = state["groups"]
+    scanned = scan_log_groups(logs_client, log_groups, start_ms, end_ms, workers=workers, slices=slices, checkpoints=checkpoints)
+    results = {}
+
+    for log_group, new_stats in scanned.items():
+        checkpoint = checkpoints.get(log_group, {})
+        stats = GroupStats.from_dict(log_group, checkpoint.get("stats", {}))
+        stats.merge(new_stats)
+        stats.prune(start_ms)
+        results[log_group] = stats
+
+        seen = {**checkpoint.get("seen", {}), **new_stats.recent_ids}
+        checkpoints[log_group] = {
+            "cursor": end_ms,
+            "seen": {event_id: ts for event_id, ts in seen.items() if ts >= end_ms - INGESTION_LAG_MS},
+            "stats": stats.to_dict(),
+        }
+
+    # Forget log groups that no longer exist
+    for log_group in set(checkpoints) - set(log_groups):
+        del checkpoints[log_group]
+
+    return results
+
+
+def print_group(stats: GroupStats) -> None:
+    print(f"\n🔍 Checking log group: {stats.log_group}")
+    if stats.count == 0:
+        print("✅ No error logs found in this group.")
+        return
+
+    print(f"❌ Found {stats.count} error log(s). Showing up to {MAX_EVENTS_PER_GROUP}:")
+    for timestamp, _, error_part in stats.samples():
+        print(f"  [{format_ts(timestamp)}] {error_part}")
+    print(f"📊 Total errors in this group: {stats.count}")
+
+
+def print_summary(results: dict[str, GroupStats], log_groups: list[str], start_ms: int, now_ms: int) -> None:
+    total_errors = sum(stats.count for stats in results.values())
+    error_summary = Fingerprinter()
+    for stats in results.values():
+        error_summary.merge(stats.fingerprints)
+
+    print(f"\n{'='*50}")
+    print("📊 SUMMARY")
+    print(f"{'='*50}")
+    print(f"Total errors found: {total_errors}")
+    print(f"Log groups checked: {len(log_groups)}")
+
+    if error_summary.fingerprints:
+        print("\nTop error patterns:")
+        for template, entry in error_summary.top(TOP_PATTERNS):
+            print(f"  {entry['count']}x [{fingerprint_id(template)}]: {template}")
+            print(f"      First seen: {format_ts(entry['first_seen'])}, Last seen: {format_ts(entry['last_seen'])}")
+            for sample in entry["samples"]:
+                print(f"      e.g. {sample.splitlines()[0]}")
+
+    print("\n✅ Done checking logs.")
+    print(
+        f"From: {format_ts(start_ms)}\n",
+        f"To: {format_ts(now_ms)}\n",
+        f"Total errors: {total_errors}\n",
+        f"Log groups checked: {len(log_groups)}",
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check Lambda log groups for errors")
+    parser.add_argument("--hours", type=int, default=HOURS_LOOKBACK, help="Hours to look back")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent scans (log groups x time slices)")
+    parser.add_argument("--slices", type=int, default=DEFAULT_SLICES, help="Time slices per log group")
+    parser.add_argument(
+        "--backend",
+        choices=["filter", "insights"],
+        default="filter",
+        help="filter: stream filter_log_events; insights: aggregate with CloudWatch Logs Insights",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only scan events since the previous run and merge them into the aggregates kept in the state file",
+    )
+    parser.add_argument("--state-file", type=Path, default=STATE_FILE, help="State file used by --incremental")
+    args = parser.parse_args(argv)
+    # The incremental cursors and seen event IDs come from filter_log_events
+    if args.incremental and args.backend != "filter":
+        parser.error("--incremental only works with --backend filter")
+    return args
+
+
+def main() -> None:
+    args = parse_args()
+
+    # === INIT CLIENT ===
+    logs_client = boto3.client("logs", region_name=REGION)
+
+    # === TIME RANGE ===
+    now_ms = int(time.time() * 1000)
+    start_ms = now_ms - (args.hours * 60 * 60 * 1000)
+
+    print(f"Searching logs for '{' or '.join(SEARCH_TERMS)}' in last {args.hours} hours...")
+    print("=" * 50)
+    print(
+        f"From: {datetime.fromtimestamp(start_ms/1000, IST).isoformat()}\n",
+        f"To: {datetime.fromtimestamp(now_ms/1000, IST).isoformat()}\n",
+    )
+    print("=" * 50)
+
+    # === GET ALL LOG GROUPS ===
+    print(f"Fetching all log groups with prefix: {LAMBDA_PREFIX}")
+    try:
+        log_groups = get_log_groups(logs_client)
     except ClientError as e:
-        print(f"⚠️  Error accessing log group: {e}")
-        continue
-
-# === SUMMARY ===
-print(f"\n{'='*50}")
-print("📊 SUMMARY")
-print(f"{'='*50}")
-print(f"Total errors found: {total_errors}")
-print(f"Log groups checked: {len(log_groups)}")
-
-if error_summary:
-    print("\nTop error patterns:")
-    sorted_errors = sorted(error_summary.items(), key=lambda x: x[1], reverse=True)
-    for error, count in sorted_errors[:5]:  # Show top 5 error patterns
-        print(f"  {count}x: {error}")
-
-print("\n✅ Done checking logs.")
-print(
-    f"From: {datetime.fromtimestamp(start_ms/1000, IST).strftime('%Y-%m-%d %H:%M:%S')}\n",
-    f"To: {datetime.fromtimestamp(now_ms/1000, IST).strftime('%Y-%m-%d %H:%M:%S')}\n",
-    f"Total errors: {total_errors}\n",
-    f"Log groups checked: {len(log_groups)}",
-)
+        print(f"❌ Error fetching log groups: {e}")
+        sys.exit(1)
+
+    if not log_groups:
+        print(f"No log groups found with prefix {LAMBDA_PREFIX}")
+        sys.exit(0)
+
+    print(f"Found {len(log_groups)} log group(s):")
+    for lg in log_groups:
+        print(f"- {lg}")
+
+    # === SEARCH LOG GROUPS ===
+    if args.incremental:
+        state = load_state(args.state_file)
+        results = incremental_scan(logs_client, log_groups, start_ms, now_ms, state, workers=args.workers, slices=args.slices)
+        save_state(args.state_file, state)
+    elif args.backend == "insights":
+        results = insights_scan(logs_client, log_groups, start_ms, now_ms)
+    else:
+        results = scan_log_groups(logs_client, log_groups, start_ms, now_ms, workers=args.workers, slices=args.slices)
+
+    for log_group in log_groups:
+        if log_group in results:
+            print_group(results[log_group])
+
+    # === SUMMARY ===
+    print_summary(results, log_groups, start_ms, now_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import argparse
+import hashlib
+import random
+import re
+import time
+
+# === CONFIG ===
+MAX_FINGERPRINTS = 1000  # Fingerprints kept in memory; the rarest ones are evicted beyond this
+MAX_SAMPLES = 3  # Sample messages kept per fingerprint
+MAX_TEMPLATE_LENGTH = 200
+MAX_SAMPLE_LENGTH = 500
+
+# Variable tokens, replaced by <*> in a single regex pass: quoted strings, URLs, and any token containing a digit
+# (timestamps, request IDs, UUIDs, IPs, hex, counts, durations). Possessive quantifiers keep the scan linear.
+MASK_PATTERN = re.compile(r"'[^'\n]*+'|\"[^\"\n]*+\"|https?://[^\s'\"]++|(?<![\w.:+-])(?=[\w.:+-]*\d)[\w.:+-]++")
+PLACEHOLDER = "<*>"
+
+
+def mask(message: str) -> str:
+    """
+    Turns a log message into its template: the first line with variable tokens replaced by placeholders.
+
+    Args:
+        message: The raw log message.
+
+    """
+    first_line = message.strip().split("\n", 1)[0]
+    template = MASK_PATTERN.sub(PLACEHOLDER, first_line)
+    return " ".join(template.split())[:MAX_TEMPLATE_LENGTH]
+
+
+def fingerprint_id(template: str) -> str:
+    return hashlib.blake2b(template.encode("utf-8"), digest_size=6).hexdigest()
+
+
+class Fingerprinter:
+    """
+    Groups log messages into fingerprints (masked templates) in a single pass with bounded memory.
+
+    Each fingerprint keeps its count (optionally split into time buckets), first and last seen
+    timestamps and a few sample messages. When more than max_fingerprints are tracked, the rarest
+    ones are evicted and their counts added to `evicted`.
+    """
+
+    def __init__(self, max_fingerprints: int = MAX_FINGERPRINTS, max_samples: int = MAX_SAMPLES, bucket_ms: int | None = None) -> None:
+        self.max_fingerprints = max_fingerprints
+        self.max_samples = max_samples
+        self.bucket_ms = bucket_ms
+        self.fingerprints = {}  # template -> {"counts": {bucket: int}, "first_seen": ms, "last_seen": ms, "samples": [str]}
+        self.evicted = 0
+
+    def add(self, message: str, timestamp_ms: int, count: int = 1) -> str:
+        """
+        Adds a message and returns its template.
+
+        Args:
+            message: The raw log message.
+            timestamp_ms: The event timestamp in epoch milliseconds.
+            count: How many occurrences the message stands for.
+
+        """
+        template = mask(message)
+        entry = self.fingerprints.get(template)
+        if entry is None:
+            entry = self.fingerprints[template] = {"counts": {}, "first_seen": timestamp_ms, "last_seen": timestamp_ms, "samples": []}
+            if len(self.fingerprints) > self.max_fingerprints * 5 // 4:
+                self._evict()
+                entry = self.fingerprints.get(template)
+                if entry is None:
+                    self.evicted += count
+                    return template
+        else:
+            entry["first_seen"] = min(entry["first_seen"], timestamp_ms)
+            entry["last_seen"] = max(entry["last_seen"], timestamp_ms)
+
+        bucket = timestamp_ms - timestamp_ms % self.bucket_ms if self.bucket_ms else 0
+        entry["counts"][bucket] = entry["counts"].get(bucket, 0) + count
+        if len(entry["samples"]) < self.max_samples:
+            entry["samples"].append(message.strip()[:MAX_SAMPLE_LENGTH])
+        return template
+
+    def merge(self, other: "Fingerprinter") -> None:
+        for template, other_entry in other.fingerprints.items():
+            entry = self.fingerprints.get(template)
+            if entry is None:
+                self.fingerprints[template] = {
+                    "counts": dict(other_entry["counts"]),
+                    "first_seen": other_entry["first_seen"],
+                    "last_seen": other_entry["last_seen"],
+                    "samples": list(other_entry["samples"]),
+                }
+                continue
+            for bucket, count in other_entry["counts"].items():
+                entry["counts"][bucket] = entry["counts"].get(bucket, 0) + count
+            entry["first_seen"] = min(entry["first_seen"], other_entry["first_seen"])
+            entry["last_seen"] = max(entry["last_seen"], other_entry["last_seen"])
+            entry["samples"] = (entry["samples"] + other_entry["samples"])[: self.max_samples]
+        self.evicted += other.evicted
+        if len(self.fingerprints) > self.max_fingerprints:
+            self._evict()
+
+    def prune(self, start_ms: int) -> None:
+        """
+        Drops the buckets that ended before the window start, and fingerprints left without counts.
+
+        Args:
+            start_ms: Window start in epoch milliseconds.
+
+        """
+        bucket_ms = self.bucket_ms or 0
+        for template in list(self.fingerprints):
+            entry = self.fingerprints[template]
+            entry["counts"] = {bucket: count for bucket, count in entry["counts"].items() if bucket + bucket_ms > start_ms}
+            if not entry["counts"] or entry["last_seen"] < start_ms:
+                del self.fingerprints[template]
+
+    def top(self, limit: int) -> list[tuple[str, dict]]:
+        """
+        Returns the `limit` most frequent fingerprints as (template, entry) pairs, each entry with a total "count".
+        """
+        totals = [(sum(entry["counts"].values()), template) for template, entry in self.fingerprints.items()]
+        totals.sort(reverse=True)
+        return [(template, {**self.fingerprints[template], "count": count}) for count, template in totals[:limit]]
+
+    def to_dict(self) -> dict:
+        return {
+            "evicted": self.evicted,
+            "fingerprints": {
+                template: {**entry, "counts": {str(bucket): count for bucket, count in entry["counts"].items()}}
+                for template, entry in self.fingerprints.items()
+            },
+        }
+
+    def load(self, data: dict) -> None:
+        self.evicted = data.get("evicted", 0)
+        self.fingerprints = {
+            template: {**entry, "counts": {int(bucket): count for bucket, count in entry["counts"].items()}}
+            for template, entry in data.get("fingerprints", {}).items()
+        }
+
+    def _evict(self) -> None:
+        by_count = sorted(self.fingerprints, key=lambda template: sum(self.fingerprints[template]["counts"].values()), reverse=True)
+        for template in by_count[self.max_fingerprints :]:
+            self.evicted += sum(self.fingerprints.pop(template)["counts"].values())
+
+
+def synthetic_corpus(lines: int, seed: int = 42) -> list[str]:
+    """
+    Builds Lambda-style error lines from a handful of templates with random variable parts.
+
+    Args:
+        lines: Number of lines.
+        seed: Random seed.
+
+    """
+    rng = random.Random(seed)  # noqa: S311
+    templates = [
+        "[ERROR]\t{ts}\t{uuid}\tKeyError: '{word}'",
+        (
+            "[ERROR]\t{ts}\t{uuid}\tClientError: An error occurred (ProvisionedThroughputExceededException) when calling the "
+            "PutItem operation (reached max retries: {num}): Rate of requests exceeds the allowed throughput."
+        ),
+        "[ERROR]\t{ts}\t{uuid}\tHTTPSConnectionPool(host='www.google.com', port=443): Read timed out. (read timeout={num})",
+        "[ERROR]\t{ts}\t{uuid}\tTask timed out after {float} seconds",
+        "[ERROR] Runtime.ImportModuleError: Unable to import module 'app': No module named '{word}'",
+        "[ERROR]\t{ts}\t{uuid}\tUser {id} failed to publish post {uuid} to {ip}: status {num}",
+    ]
+    words = ["requests", "jwt", "orjson", "pk", "sk", "Item", "score"]
+    corpus = []
+    for _ in range(lines):
+        corpus.append(
+            rng.choice(templates).format(
+                ts=f"2025-01-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00.{rng.randint(0, 999):03d}Z",
+                uuid=f"{rng.getrandbits(128):032x}"[:8] + "-0000-4000-8000-" + f"{rng.getrandbits(48):012x}",
+                word=rng.choice(words),
+                num=rng.randint(0, 10000),
+                float=f"{rng.uniform(1, 30):.2f}",
+                id=f"user_{rng.getrandbits(32):x}9",
+                ip=".".join(str(rng.randint(0, 255)) for _ in range(4)),
+            ),
+        )
+    return corpus
+
+
+def benchmark(lines: int) -> None:
+    corpus = synthetic_corpus(lines)
+    fingerprinter = Fingerprinter()
+    prefixes = {}
+
+    started = time.perf_counter()
+    for index, line in enumerate(corpus):
+        fingerprinter.add(line, index)
+    elapsed = time.perf_counter() - started
+
+    for line in corpus:
+        key = line.split("\n")[0][:50]
+        prefixes[key] = prefixes.get(key, 0) + 1
+
+    print(f"Lines: {lines}, Elapsed: {elapsed:.2f}s, Throughput: {lines / elapsed:,.0f} lines/s")
+    print(f"Fingerprints: {len(fingerprinter.fingerprints)} (50-char prefix keys: {len(prefixes)}), Evicted: {fingerprinter.evicted}")
+    for template, entry in fingerprinter.top(10):
+        print(f"  {entry['count']}x [{fingerprint_id(template)}] {template}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark error fingerprinting on a synthetic corpus")
+    parser.add_argument("--lines", type=int, default=1_000_000, help="Number of synthetic log lines")
+    benchmark(parser.parse_args().lines)
@@ -1,15 +1,35 @@
+import argparse
+import hashlib
 import json
 import os
+import random
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 
 import boto3
 from botocore.exceptions import ClientError, NoCredentialsError, PartialCredentialsError
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "aws" / "src"))
+
+from shared.dynamodb import serialize_item
+
 # --- Configuration ---
 TABLE_NAME_SSM_PARAMETER = "/SnapNews/common/table-name"
 NEWS_SOURCES_FILE = "./NewsSources.json"
 # Optional: Specify region if not configured in your environment/AWS config
 AWS_REGION = "us-east-1"
+# BatchWriteItem accepts at most 25 put/delete requests per call
+BATCH_SIZE = 25
+DEFAULT_WORKERS = 8
+MAX_BATCH_RETRIES = 8
+BASE_BACKOFF_SECONDS = 0.05
+MAX_BACKOFF_SECONDS = 5.0
+# Item tracking the source catalogue (partitions written and the catalogue version)
+CATALOGUE_KEY = {"pk": {"S": "APP#DATA"}, "sk": {"S": "SOURCES"}}
+CONTENT_HASH_ATTRIBUTE = "ContentHash"
+RETRYABLE_ERROR_CODES = {"ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded", "InternalServerError"}
 
 
 def get_dynamodb_table_from_ssm(ssm_client: boto3.client) -> str:
@@ -56,91 +76,224 @@ def transform_source_to_dynamodb_item(source_data: dict) -> dict | None:
             print(f"Warning: Skipping source due to missing or empty 'Name.Short', 'Country', or 'Language'. Data: {source_data}")
             return None
 
-        pk_value = f"SOURCE#{country}#{language}"
-        sk_value = f"NAME#{short_name}"
-        dynamodb_item = {
-            "pk": {"S": pk_value},
-            "sk": {"S": sk_value},
-            "Language": {"S": language},
-            "Country": {"S": country},
-            "Name": {"M": {"Long": {"S": source_data.get("Name", {}).get("Long", "")}, "Short": {"S": short_name}}},
-        }
-
-        # Handle the 'FEEDS' object transformation - new structure
+        # FEEDS maps each category to a URL (like TECH, WORLD) or a list of URLs (like INDIA in NDTV)
         input_feeds = source_data.get("FEEDS", {})
-        dynamodb_feeds_map = {}
-
+        feeds = {}
         if isinstance(input_feeds, dict):
-            # FEEDS is now a single object with category keys
-            for category, feeds in input_feeds.items():
-                if isinstance(feeds, list):
-                    # Handle array of URLs (like INDIA category in NDTV)
-                    feeds_list = []
-                    for feed_url in feeds:
-                        feeds_list.append({"S": str(feed_url).strip('"')})
-                    dynamodb_feeds_map[category] = {"L": feeds_list}
-                elif isinstance(feeds, str):
-                    # Handle single URL string (like TECH, WORLD, etc.)
-                    dynamodb_feeds_map[category] = {"S": str(feeds).strip('"')}
+            for category, category_feeds in input_feeds.items():
+                if isinstance(category_feeds, list):
+                    feeds[category] = [str(feed_url).strip('"') for feed_url in category_feeds]
                 else:
-                    # Handle other types by converting to string
-                    dynamodb_feeds_map[category] = {"S": str(feeds).strip('"')}
-
-        # Assign the transformed map to the 'Feeds' key in the DynamoDB item
-        dynamodb_item["Feeds"] = {"M": dynamodb_feeds_map}
-
-        return dynamodb_item
+                    feeds[category] = str(category_feeds).strip('"')
+
+        return serialize_item(
+            {
+                "pk": f"SOURCE#{country}#{language}",
+                "sk": f"NAME#{short_name}",
+                "Language": language,
+                "Country": country,
+                "Name": {"Long": source_data.get("Name", {}).get("Long", ""), "Short": short_name},
+                "Feeds": feeds,
+            },
+        )
 
     except Exception as e:  # noqa: BLE001
         print(f"Error transforming source data: {e}. Data: {source_data}")
         return None
 
 
-def main() -> None:  # noqa: C901, PLR0915
-    print("Starting news source loading process...")
-
-    # --- Initialize Boto3 Clients ---
-    try:
-        # If region is specified: boto3.Session(region_name=AWS_REGION)
-        session = boto3.Session()
-        ssm_client = session.client("ssm")
-        dynamodb_client = session.client("dynamodb")
-        print("Boto3 clients initialized.")
-    except (NoCredentialsError, PartialCredentialsError) as e:
-        print(f"AWS Credentials Error: {e}. Please configure your AWS credentials.")
-        sys.exit(1)
-    except Exception as e:  # noqa: BLE001
-        print(f"Error initializing Boto3: {e}")
-        sys.exit(1)
+def load_sources_file(path: str = NEWS_SOURCES_FILE) -> list:
+    """
+    Reads the news sources JSON file and returns the list under the 'Sources' key.
 
-    # --- Get Table Name ---
-    table_name = get_dynamodb_table_from_ssm(ssm_client)
+    Args:
+        path: Path to the news sources JSON file.
 
-    # --- Read and Parse JSON File ---
-    if not os.path.exists(NEWS_SOURCES_FILE):  # noqa: PTH110
-        print(f"Error: News sources file not found at '{NEWS_SOURCES_FILE}'")
+    """
+    if not os.path.exists(path):  # noqa: PTH110
+        print(f"Error: News sources file not found at '{path}'")
         sys.exit(1)
 
-    print(f"Reading sources from: {NEWS_SOURCES_FILE}")
+    print(f"Reading sources from: {path}")
     try:
-        with open(NEWS_SOURCES_FILE) as f:  # noqa: PTH123
+        with open(path) as f:  # noqa: PTH123
             data = json.load(f)
     except json.JSONDecodeError as e:
-        print(f"Error decoding JSON from '{NEWS_SOURCES_FILE}': {e}")
+        print(f"Error decoding JSON from '{path}': {e}")
         sys.exit(1)
     except Exception as e:  # noqa: BLE001
-        print(f"Error reading file '{NEWS_SOURCES_FILE}': {e}")
+        print(f"Error reading file '{path}': {e}")
         sys.exit(1)
 
-    # --- Process and Load Sources ---
     sources_list = data.get("Sources")
     if not isinstance(sources_list, list):
-        print(f"Error: Expected a list under the 'Sources' key in '{NEWS_SOURCES_FILE}', but found type {type(sources_list)}.")
+        print(f"Error: Expected a list under the 'Sources' key in '{path}', but found type {type(sources_list)}.")
         sys.exit(1)
 
-    print(f"Found {len(sources_list)} source(s) to process.")
+    return sources_list
+
+
+def transform_sources(sources_list: list) -> tuple[list, int]:
+    """
+    Transforms all sources into DynamoDB items carrying their content hash, dropping duplicate keys (last one wins, as with put_item).
+
+    Args:
+        sources_list: The list of sources read from the JSON file.
+
+    Returns:
+        A tuple of (items, skipped) where skipped counts sources that failed to transform.
+    """
+    items_by_key = {}
+    skipped = 0
+    for source_data in sources_list:
+        dynamodb_item = transform_source_to_dynamodb_item(source_data)
+        if not dynamodb_item:
+            skipped += 1
+            continue
+        dynamodb_item[CONTENT_HASH_ATTRIBUTE] = {"S": content_hash(dynamodb_item)}
+        items_by_key[(dynamodb_item["pk"]["S"], dynamodb_item["sk"]["S"])] = dynamodb_item
+
+    return list(items_by_key.values()), skipped
+
+
+def chunk_requests(requests: list, size: int = BATCH_SIZE) -> list[list]:
+    """
+    Splits a list of write requests into BatchWriteItem sized chunks.
+
+    Args:
+        requests: The write requests (PutRequest / DeleteRequest dicts).
+        size: The maximum number of requests per chunk.
+
+    """
+    return [requests[i : i + size] for i in range(0, len(requests), size)]
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Returns the exponential backoff delay (with full jitter) for a retry attempt.
+
+    Args:
+        attempt: The retry attempt number, starting at 0.
+
+    """
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * (2**attempt)))  # noqa: S311
+
+
+def write_batch(dynamodb_client: boto3.client, table_name: str, batch: list) -> tuple[int, int, int]:
+    """
+    Sends a single chunk through BatchWriteItem, retrying unprocessed items and throttling errors under backoff.
+
+    Args:
+        dynamodb_client: The boto3 client for DynamoDB.
+        table_name: The DynamoDB table name.
+        batch: Up to 25 write requests.
+
+    Returns:
+        A tuple of (written, failed, retries).
+    """
+    pending = batch
+    retries = 0
+
+    for attempt in range(MAX_BATCH_RETRIES + 1):
+        if attempt:
+            retries += 1
+            time.sleep(backoff_delay(attempt - 1))
+        try:
+            response = dynamodb_client.batch_write_item(RequestItems={table_name: pending})
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in RETRYABLE_ERROR_CODES:
+                continue
+            print(f"AWS Error writing batch of {len(pending)} item(s): {e}")
+            return len(batch) - len(pending), len(pending), retries
+
+        pending = response.get("UnprocessedItems", {}).get(table_name, [])
+        if not pending:
+            return len(batch), 0, retries
+
+    print(f"Giving up on {len(pending)} unprocessed item(s) after {MAX_BATCH_RETRIES} retries")
+    return len(batch) - len(pending), len(pending), retries
+
+
+def batch_write(dynamodb_client: boto3.client, table_name: str, requests: list, workers: int = DEFAULT_WORKERS) -> dict:
+    """
+    Writes requests in chunks of 25 from a bounded worker pool.
+
+    Args:
+        dynamodb_client: The boto3 client for DynamoDB.
+        table_name: The DynamoDB table name.
+        requests: The write requests (PutRequest / DeleteRequest dicts).
+        workers: The maximum number of concurrent BatchWriteItem calls.
+
+    Returns:
+        A dictionary with written, failed, batches, retries and elapsed seconds.
+    """
+    stats = {"written": 0, "failed": 0, "batches": 0, "retries": 0, "elapsed": 0.0}
+    chunks = chunk_requests(requests)
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(write_batch, dynamodb_client, table_name, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            written, failed, retries = future.result()
+            stats["written"] += written
+            stats["failed"] += failed
+            stats["retries"] += retries
+            stats["batches"] += 1
+
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
+
+
+def print_batch_summary(stats: dict, skipped: int = 0) -> None:
+    """
+    Prints the throughput and failure summary of a batch run.
+
+    Args:
+        stats: The dictionary returned by batch_write.
+        skipped: Number of sources that failed to transform.
+
+    """
+    elapsed = stats["elapsed"]
+    throughput = stats["written"] / elapsed if elapsed else 0.0
+    print("-" * 20)
+    print(f"Batches sent: {stats['batches']}, Retries: {stats['retries']}, Elapsed: {elapsed:.2f}s")
+    print(f"Throughput: {throughput:.1f} items/s")
+    print(f"Summary: Written={stats['written']}, Failed={stats['failed']}, Skipped={skipped}")
+
+
+def bulk_load(dynamodb_client: boto3.client, table_name: str, sources_list: list, workers: int = DEFAULT_WORKERS) -> dict:
+    """
+    Loads all sources with BatchWriteItem from a bounded worker pool.
+
+    Args:
+        dynamodb_client: The boto3 client for DynamoDB.
+        table_name: The DynamoDB table name.
+        sources_list: The list of sources read from the JSON file.
+        workers: The maximum number of concurrent BatchWriteItem calls.
+
+    """
+    items, skipped = transform_sources(sources_list)
+    print(f"Writing {len(items)} item(s) in batches of {BATCH_SIZE} with {workers} worker(s)...")
+    stats = batch_write(dynamodb_client, table_name, [{"PutRequest": {"Item": item}} for item in items], workers)
+    print_batch_summary(stats, skipped)
+    if items:
+        update_catalogue(dynamodb_client, table_name, {item["pk"]["S"] for item in items}, time.time_ns())
+    return stats
+
+
+def put_sources(dynamodb_client: boto3.client, table_name: str, sources_list: list) -> None:
+    """
+    Loads sources one put_item call at a time.
+
+    Args:
+        dynamodb_client: The boto3 client for DynamoDB.
+        table_name: The DynamoDB table name.
+        sources_list: The list of sources read from the JSON file.
+
+    """
     items_added = 0
     items_failed = 0
+    partitions = set()
 
     for source_data in sources_list:
         print("-" * 20)
@@ -151,6 +304,7 @@ def main() -> None:  # noqa: C901, PLR0915
             items_failed += 1
             continue  # Skip to next source if transformation failed
 
+        dynamodb_item[CONTENT_HASH_ATTRIBUTE] = {"S": content_hash(dynamodb_item)}
         short_name = dynamodb_item["Name"]["M"]["Short"]["S"]  # Get name for logging
         print(f"Processing source: {short_name}")
         # print(f"DEBUG: DynamoDB Item JSON:\n{json.dumps(dynamodb_item, indent=2)}") # Uncomment for debugging
@@ -161,6 +315,7 @@ def main() -> None:  # noqa: C901, PLR0915
             dynamodb_client.put_item(TableName=table_name, Item=dynamodb_item)
             print(f"Successfully added source: {short_name}")
             items_added += 1
+            partitions.add(dynamodb_item["pk"]["S"])
         except ClientError as e:
             print(f"AWS Error putting item for '{short_name}': {e}")
             items_failed += 1
@@ -169,8 +324,261 @@ def main() -> None:  # noqa: C901, PLR0915
             items_failed += 1
 
     print("-" * 20)
-    print("Finished processing sources.")
     print(f"Summary: Added={items_added}, Failed/Skipped={items_failed}")
+    if items_added:
+        update_catalogue(dynamodb_client, table_name, partitions, time.time_ns())
+
+
+def content_hash(dynamodb_item: dict) -> str:
+    """
+    Returns a stable hash of a DynamoDB item's content, ignoring the stored hash attribute.
+
+    Args:
+        dynamodb_item: A DynamoDB item in the low-level typed format.
+
+    """
+    content = {k: v for k, v in dynamodb_item.items() if k != CONTENT_HASH_ATTRIBUTE}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def get_catalogue(dynamodb_client: boto3.client, table_name: str) -> dict:
+    """
+    Reads the catalogue item holding the source partitions written by previous syncs.
+
+    Args:
+        dynamodb_client: The boto3 client for DynamoDB.
+        table_name: The DynamoDB table name.
+
+    """
+    response = dynamodb_client.get_item(TableName=table_name, Key=CATALOGUE_KEY, ConsistentRead=True)
+    return response.get("Item", {})
+
+
+def update_catalogue(dynamodb_client: boto3.client, table_name: str, partitions: set, version: object) -> None:
+    """
+    Registers the partitions written and bumps the catalogue version, which readers use to invalidate their caches.
+
+    Args:
+        dynamodb_client: The boto3 client for DynamoDB.
+        table_name: The DynamoDB table name.
+        partitions: The partition keys written by this run.
+        version: The new catalogue version.
+
+    """
+    dynamodb_client.update_item(
+        TableName=table_name,
+        Key=CATALOGUE_KEY,
+        UpdateExpression="ADD #partitions :partitions SET #version = :version",
+        ExpressionAttributeNames={"#partitions": "Partitions", "#version": "Version"},
+        ExpressionAttributeValues={":partitions": {"SS": sorted(partitions)}, ":version": {"S": str(version)}},
+    )
+
+
+def query_partition(dynamodb_client: boto3.client, table_name: str, pk_value: str) -> dict:
+    """
+    Reads the keys and content hashes of all source items in a partition.
+
+    Args:
+        dynamodb_client: The boto3 client for DynamoDB.
+        table_name: The DynamoDB table name.
+        pk_value: The partition key, e.g. SOURCE#IN#en.
+
+    Returns:
+        A dictionary mapping (pk, sk) to the stored content hash ("" if the item has none).
+    """
+    existing = {}
+    paginator = dynamodb_client.get_paginator("query")
+    for page in paginator.paginate(
+        TableName=table_name,
+        KeyConditionExpression="pk = :pk AND begins_with(sk, :sk)",
+        ExpressionAttributeValues={":pk": {"S": pk_value}, ":sk": {"S": "NAME#"}},
+        ProjectionExpression="pk, sk, #hash",
+        ExpressionAttributeNames={"#hash": CONTENT_HASH_ATTRIBUTE},
+    ):
+        for item in page.get("Items", []):
+            existing[(item["pk"]["S"], item["sk"]["S"])] = item.get(CONTENT_HASH_ATTRIBUTE, {}).get("S", "")
+
+    return existing
+
+
+def query_partitions(dynamodb_client: boto3.client, table_name: str, partitions: set, workers: int = DEFAULT_WORKERS) -> dict:
+    """
+    Queries source partitions in parallel.
+
+    Args:
+        dynamodb_client: The boto3 client for DynamoDB.
+        table_name: The DynamoDB table name.
+        partitions: The partition keys to read.
+        workers: The maximum number of concurrent queries.
+
+    """
+    existing = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(query_partition, dynamodb_client, table_name, pk_value) for pk_value in sorted(partitions)]
+        for future in as_completed(futures):
+            existing.update(future.result())
+
+    return existing
+
+
+def diff_items(items: list, existing: dict) -> dict:
+    """
+    Works out the minimal set of puts and deletes to make the table match the desired items.
+
+    Args:
+        items: The desired DynamoDB items, each carrying its content hash.
+        existing: A dictionary mapping (pk, sk) to the stored content hash.
+
+    Returns:
+        A dictionary with "added" and "updated" items, "deleted" keys and an "unchanged" count.
+    """
+    diff = {"added": [], "updated": [], "deleted": [], "unchanged": 0}
+    desired_keys = set()
+
+    for item in items:
+        key = (item["pk"]["S"], item["sk"]["S"])
+        desired_keys.add(key)
+        if key not in existing:
+            diff["added"].append(item)
+        elif existing[key] != item[CONTENT_HASH_ATTRIBUTE]["S"]:
+            diff["updated"].append(item)
+        else:
+            diff["unchanged"] += 1
+
+    diff["deleted"] = sorted(key for key in existing if key not in desired_keys)
+    return diff
+
+
+def print_diff_report(diff: dict) -> None:
+    """
+    Prints the changes a sync would make.
+
+    Args:
+        diff: The dictionary returned by diff_items.
+
+    """
+    print("-" * 20)
+    for label, prefix in (("added", "+"), ("updated", "~")):
+        for item in diff[label]:
+            print(f"  {prefix} {item['pk']['S']} {item['sk']['S']}")
+    for pk_value, sk_value in diff["deleted"]:
+        print(f"  - {pk_value} {sk_value}")
+    print(
+        f"Diff: Added={len(diff['added'])}, Updated={len(diff['updated'])}, Deleted={len(diff['deleted'])}, Unchanged={diff['unchanged']}",
+    )
+
+
+def sync_sources(
+    dynamodb_client: boto3.client,
+    table_name: str,
+    sources_list: list,
+    workers: int = DEFAULT_WORKERS,
+    *,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Writes only the sources that changed and deletes the ones removed from the JSON file.
+
+    Args:
+        dynamodb_client: The boto3 client for DynamoDB.
+        table_name: The DynamoDB table name.
+        sources_list: The list of sources read from the JSON file.
+        workers: The maximum number of concurrent queries / BatchWriteItem calls.
+        dry_run: Only report the changes, without writing anything.
+
+    """
+    items, skipped = transform_sources(sources_list)
+    if not items:
+        print("Error: No valid sources to sync. Refusing to delete the existing catalogue.")
+        sys.exit(1)
+
+    # Partitions from previous syncs are read too, so that sources of a removed country/language are deleted
+    catalogue = get_catalogue(dynamodb_client, table_name)
+    known_partitions = set(catalogue.get("Partitions", {}).get("SS", []))
+    desired_partitions = {item["pk"]["S"] for item in items}
+
+    print(f"Reading {len(known_partitions | desired_partitions)} partition(s)...")
+    existing = query_partitions(dynamodb_client, table_name, known_partitions | desired_partitions, workers)
+    diff = diff_items(items, existing)
+    print_diff_report(diff)
+
+    if dry_run:
+        print("Dry run: no changes written.")
+        return diff
+
+    requests = [{"PutRequest": {"Item": item}} for item in diff["added"] + diff["updated"]]
+    requests += [{"DeleteRequest": {"Key": {"pk": {"S": pk_value}, "sk": {"S": sk_value}}}} for pk_value, sk_value in diff["deleted"]]
+    failed = 0
+    if requests:
+        stats = batch_write(dynamodb_client, table_name, requests, workers)
+        print_batch_summary(stats, skipped)
+        failed = stats["failed"]
+        if failed:
+            # Keep the old partitions registered so the next sync retries the failed deletes
+            desired_partitions |= known_partitions
+
+    if requests or desired_partitions != known_partitions:
+        # The version identifies the catalogue content, so it only changes when a source does. A partial
+        # sync gets a version of its own: the retry that completes it must not find its version published already
+        version = hashlib.sha256("".join(sorted(item[CONTENT_HASH_ATTRIBUTE]["S"] for item in items)).encode("utf-8")).hexdigest()
+        if failed:
+            version = f"{version}-partial-{time.time_ns()}"
+        dynamodb_client.put_item(
+            TableName=table_name,
+            Item={**CATALOGUE_KEY, "Partitions": {"SS": sorted(desired_partitions)}, "Version": {"S": version}},
+        )
+
+    return diff
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load news sources into DynamoDB")
+    parser.add_argument(
+        "--mode",
+        choices=["put", "bulk", "sync"],
+        default="put",
+        help="put: one put_item per source; bulk: BatchWriteItem chunks from a worker pool; sync: write only the differences",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes a sync would make without writing")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent BatchWriteItem calls in bulk mode")
+    parser.add_argument("--file", default=NEWS_SOURCES_FILE, help="Path to the news sources JSON file")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    print("Starting news source loading process...")
+
+    # --- Initialize Boto3 Clients ---
+    try:
+        # If region is specified: boto3.Session(region_name=AWS_REGION)
+        session = boto3.Session()
+        ssm_client = session.client("ssm")
+        dynamodb_client = session.client("dynamodb")
+        print("Boto3 clients initialized.")
+    except (NoCredentialsError, PartialCredentialsError) as e:
+        print(f"AWS Credentials Error: {e}. Please configure your AWS credentials.")
+        sys.exit(1)
+    except Exception as e:  # noqa: BLE001
+        print(f"Error initializing Boto3: {e}")
+        sys.exit(1)
+
+    # --- Get Table Name ---
+    table_name = get_dynamodb_table_from_ssm(ssm_client)
+
+    # --- Read and Parse JSON File ---
+    sources_list = load_sources_file(args.file)
+    print(f"Found {len(sources_list)} source(s) to process.")
+
+    # --- Process and Load Sources ---
+    if args.mode == "sync":
+        sync_sources(dynamodb_client, table_name, sources_list, args.workers, dry_run=args.dry_run)
+    elif args.mode == "bulk":
+        bulk_load(dynamodb_client, table_name, sources_list, args.workers)
+    else:
+        put_sources(dynamodb_client, table_name, sources_list)
+
+    print("Finished processing sources.")
 
 
 # --- Main Execution ---
@@ -0,0 +1,258 @@
+"""
+Benchmarks shared.dynamodb against the boto3 resource layer.
+
+    * (de)serialization of representative items (a home view of 200 jobs, a source, a job) with
+      boto3's TypeSerializer/TypeDeserializer against shared.dynamodb's
+    * on moto: reading a home view, writing 1,000 jobs, reading 300 of them by key and querying a
+      partition of 1,000, through a resource Table against a shared.dynamodb Table
+    * retries: a client that throttles once and leaves half of a batch unprocessed twice still gets
+      every key read and every item written
+
+Every result is compared with the resource layer's, so a wrong (de)serialization fails the run.
+
+Usage:
+    python .scripts/testing/bench_dynamodb.py [--rounds 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from decimal import Decimal
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "aws" / "src"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+from shared import dynamodb
+from shared.dynamodb import Table, deserialize_item, serialize_item
+from shared.views import build_home_view
+
+# === CONFIG ===
+DEFAULT_ROUNDS = 20
+TABLE_NAME = "dynamodb-bench"
+NOW = 1_760_000_000
+JOBS = 1000
+KEYS = 300
+
+
+def job(index: int) -> dict:
+    status = ("PENDING", "PUBLISHED", "FAILED")[index % 3]
+    return {
+        "pk": "SCHEDULE#2025-10-09T09:00",
+        "sk": f"JOB#{index:06d}",
+        "JobId": f"{index:06d}",
+        "UserId": "bench-user",
+        "ObjectKey": f"media/bench-user/{index:04d}.jpg",
+        "DueAt": NOW + 60 * index,
+        "FinishedAt": NOW + 60 * index + 5,
+        "Status": status,
+        "Platform": ("x", "linkedin", "facebook", "instagram")[index % 4],
+        "Error": "HTTP 403: token revoked" if status == "FAILED" else None,
+        "Score": Decimal("0.75"),
+        "Tags": {"news", f"tag-{index % 5}"},
+    }
+
+
+def source() -> dict:
+    feeds = {section: [f"https://news.example.com/{section}/{index}.xml" for index in range(3)] for section in ("TOP", "WORLD", "TECH")}
+    name = {"Long": "Bench", "Short": "Bench"}
+    return {"pk": "SOURCE#GB#en", "sk": "NAME#Bench", "Country": "GB", "Language": "en", "Name": name, "Feeds": feeds}
+
+
+ITEMS = {
+    "home view": lambda: build_home_view("bench-user", [job(index) for index in range(200)]),
+    "source": source,
+    "job": lambda: job(1),
+}
+
+
+def median_ms(function: Callable, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def boto3_serialize(serializer: TypeSerializer, item: dict) -> dict:
+    return {key: serializer.serialize(value) for key, value in item.items()}
+
+
+def boto3_deserialize(deserializer: TypeDeserializer, typed: dict) -> dict:
+    return {key: deserializer.deserialize(value) for key, value in typed.items()}
+
+
+def bench_serializer(rounds: int) -> bool:
+    serializer, deserializer = TypeSerializer(), TypeDeserializer()
+    ok = True
+    for name, build in ITEMS.items():
+        item = build()
+        typed = boto3_serialize(serializer, item)
+        ok = ok and serialize_item(item) == typed and deserialize_item(typed) == boto3_deserialize(deserializer, typed)
+        timings = {
+            "boto3 serialize": partial(boto3_serialize, serializer, item),
+            "shared serialize": partial(serialize_item, item),
+            "boto3 deserialize": partial(boto3_deserialize, deserializer, typed),
+            "shared deserialize": partial(deserialize_item, typed),
+        }
+        results = {label: median_ms(function, rounds * 50) * 1000 for label, function in timings.items()}
+        print(f"  {name:<10} serialize µs: boto3 {results['boto3 serialize']:8.1f}, shared {results['shared serialize']:7.1f}", end="")
+        print(f" | deserialize µs: boto3 {results['boto3 deserialize']:8.1f}, shared {results['shared deserialize']:7.1f}")
+    return ok
+
+
+def create_table() -> object:
+    import boto3  # noqa: PLC0415
+
+    table = boto3.resource("dynamodb").create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}, {"AttributeName": "sk", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}, {"AttributeName": "sk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+    return table
+
+
+def resource_batch_get(resource: object, keys: list[dict]) -> list[dict]:
+    items = []
+    for offset in range(0, len(keys), 100):
+        request = {TABLE_NAME: {"Keys": keys[offset : offset + 100]}}
+        while request:
+            response = resource.batch_get_item(RequestItems=request)
+            items.extend(response["Responses"].get(TABLE_NAME, []))
+            request = response.get("UnprocessedKeys")
+    return items
+
+
+def resource_query(table: object, partition: str) -> list[dict]:
+    kwargs = {"KeyConditionExpression": "pk = :pk", "ExpressionAttributeValues": {":pk": partition}}
+    items = []
+    while True:
+        response = table.query(**kwargs)
+        items.extend(response["Items"])
+        if "LastEvaluatedKey" not in response:
+            return items
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def write_resource(table: object, jobs: list[dict]) -> None:
+    with table.batch_writer() as batch:
+        for item in jobs:
+            batch.put_item(Item=item)
+
+
+def same(left: list[dict], right: list[dict]) -> bool:
+    return sorted(left, key=lambda item: item["sk"]) == sorted(right, key=lambda item: item["sk"])
+
+
+def bench_table(rounds: int) -> bool:
+    resource_table = create_table()
+    table = Table(TABLE_NAME)
+    view = ITEMS["home view"]()
+    jobs = [{key: value for key, value in job(index).items() if value is not None} for index in range(JOBS)]
+    keys = [{"pk": item["pk"], "sk": item["sk"]} for item in jobs[:KEYS]]
+    partition = jobs[0]["pk"]
+    table.put(view)
+
+    view_key = {"pk": view["pk"], "sk": view["sk"]}
+    query = {"KeyConditionExpression": "pk = :pk", "ExpressionAttributeValues": {":pk": partition}}
+    cases = {
+        "get home view": (lambda: resource_table.get_item(Key=view_key)["Item"], lambda: table.get(view_key)),
+        f"write {JOBS} jobs": (lambda: write_resource(resource_table, jobs), lambda: table.batch_write(jobs)),
+        f"batch get {KEYS}": (lambda: resource_batch_get(resource_table.meta.client, keys), lambda: table.batch_get(keys)),
+        f"query {JOBS}": (lambda: resource_query(resource_table, partition), lambda: list(table.query(**query))),
+    }
+    ok = True
+    for name, (resource_call, shared_call) in cases.items():
+        expected, actual = resource_call(), shared_call()
+        if isinstance(expected, list) and expected and isinstance(expected[0], dict):
+            ok = ok and same(expected, actual)
+        elif isinstance(expected, dict):
+            ok = ok and expected == actual
+        else:
+            ok = ok and not actual  # writes: nothing left unprocessed
+        case_rounds = max(1, rounds // 4 if "write" in name else rounds)
+        resource_ms, shared_ms = median_ms(resource_call, case_rounds), median_ms(shared_call, case_rounds)
+        print(f"  {name:<16} resource {resource_ms:7.1f} ms, shared {shared_ms:7.1f} ms ({shared_ms / resource_ms:5.0%})")
+    return ok
+
+
+class FlakyClient:
+    """
+    A client that throttles the first request and leaves half of the batch unprocessed on the next two
+    """
+
+    exceptions = type("Exceptions", (), {"ClientError": ClientError})
+
+    def __init__(self, client: object) -> None:
+        self.client = client
+        self.requests = 0
+
+    def _flaky(self) -> bool:
+        self.requests += 1
+        if self.requests == 1:
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Slow down"}}, "Batch")
+        return self.requests <= 3  # noqa: PLR2004
+
+    def batch_get_item(self, RequestItems: dict) -> dict:  # noqa: N803
+        request = RequestItems[TABLE_NAME]
+        half = max(1, len(request["Keys"]) // 2) if self._flaky() else len(request["Keys"])
+        response = self.client.batch_get_item(RequestItems={TABLE_NAME: {**request, "Keys": request["Keys"][:half]}})
+        if request["Keys"][half:]:
+            response["UnprocessedKeys"] = {TABLE_NAME: {**request, "Keys": request["Keys"][half:]}}
+        return response
+
+    def batch_write_item(self, RequestItems: dict) -> dict:  # noqa: N803
+        requests = RequestItems[TABLE_NAME]
+        half = max(1, len(requests) // 2) if self._flaky() else len(requests)
+        response = self.client.batch_write_item(RequestItems={TABLE_NAME: requests[:half]})
+        if requests[half:]:
+            response["UnprocessedItems"] = {TABLE_NAME: requests[half:]}
+        return response
+
+
+def check_retries() -> bool:
+    import boto3  # noqa: PLC0415
+
+    dynamodb.BASE_BACKOFF_SECONDS = 0
+    items = [{"pk": "RETRY", "sk": f"ITEM#{index:03d}", "Value": index} for index in range(40)]
+    writer = FlakyClient(boto3.client("dynamodb"))
+    unprocessed = Table(TABLE_NAME, writer).batch_write(items)
+    reader = FlakyClient(boto3.client("dynamodb"))
+    read = Table(TABLE_NAME, reader).batch_get([{"pk": item["pk"], "sk": item["sk"]} for item in items] * 2)
+    print(f"  flaky client: wrote 40 items in {writer.requests} requests, read {len(read)} back in {reader.requests}", end="")
+    print(f", {len(unprocessed)} unprocessed")
+    return not unprocessed and same(read, items)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark shared.dynamodb against the boto3 resource layer")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="Timed rounds per measurement")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    print(f"(De)serializing items ({args.rounds * 50} rounds, medians)...")
+    passed = bench_serializer(args.rounds)
+    # moto's request handling dominates these timings: they mostly check that results match
+    print(f"Reading and writing on moto ({args.rounds} rounds, medians)...")
+
+    from moto import mock_aws  # noqa: PLC0415
+
+    with mock_aws():
+        passed = bench_table(args.rounds) and check_retries() and passed
+    print("✅ DynamoDB layer OK" if passed else "❌ The DynamoDB layer disagreed with the resource layer")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+"""
+Benchmarks the api, admin and pre_signup handlers end to end on local stand-ins.
+
+Starts moto's server as the DynamoDB and S3 stand-in and a small HTTP server standing in for the
+user pool's signing keys (JWKS) and reCaptcha's siteverify, then seeds a table and bucket. Each
+route is invoked with synthetic API Gateway or Cognito events in fresh interpreters:
+    * cold: import of the handler plus its first invocation, in --cold separate processes
+    * warm: --warm further invocations in the first process, reported as p50/p95/p99
+    * allocations: peak memory allocated by a warm invocation (tracemalloc)
+    * calls: Python function calls of a warm invocation, and the AWS and HTTP requests the
+      stand-ins receive on the cold and warm invocations
+
+Results are compared with the baselines in handler_baselines.json and regressions are flagged
+(exit code 1). --save records the current results as the new baselines. Timings depend on the
+machine, so save baselines on the machine that checks against them.
+
+Usage:
+    python .scripts/testing/bench_handlers.py [--warm 200] [--cold 3] [--route home ...] [--save]
+"""
+
+import argparse
+import base64
+import hashlib
+import importlib
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.request
+import uuid
+from collections import Counter
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+SHARED_DIR = ROOT / "aws" / "src"
+
+# === CONFIG ===
+BASELINES_FILE = Path(__file__).with_name("handler_baselines.json")
+TABLE_NAME = "handler-bench"
+BUCKET_NAME = "handler-bench-media"
+USER_ID = "bench-user"
+ISSUER = "https://cognito-idp.us-east-1.amazonaws.com/us-east-1_bench"
+CLIENT_ID = "bench-client"
+KEY_ID = "bench-key"
+DEFAULT_WARM = 200
+DEFAULT_COLD = 3
+RESULT_MARKER = "BENCH_RESULT "
+# A timing regresses when it is this much slower than its baseline, and by more than the noise floor
+TIME_TOLERANCE = 0.25
+WARM_NOISE_MS = 0.5
+COLD_NOISE_MS = 25.0
+ALLOCATION_TOLERANCE = 0.25
+CALLS_TOLERANCE = 0.10
+
+HANDLERS = {
+    "api": {"path": SHARED_DIR / "fn" / "api", "module": "app", "function": "main"},
+    "admin": {"path": SHARED_DIR / "fn" / "admin", "module": "app", "function": "main"},
+    "pre_signup": {"path": SHARED_DIR / "fn" / "cognito", "module": "pre_signup", "function": "trigger"},
+}
+
+
+# ==================================================================================================
+# Events
+
+
+def api_event(method: str, path: str, body: dict | None = None, headers: dict | None = None, query: dict | None = None) -> dict:
+    """
+    A REST API proxy event as API Gateway sends it; with binary media types on, bodies arrive base64 encoded
+    """
+    token = os.environ.get("BENCH_TOKEN", "")
+    return {
+        "resource": path,
+        "path": path,
+        "httpMethod": method,
+        "headers": {
+            "Authorization": f"Bearer {token}",
+            "Accept-Encoding": "gzip, deflate, br",
+            "Content-Type": "application/json",
+            **(headers or {}),
+        },
+        "multiValueHeaders": {},
+        "queryStringParameters": query,
+        "requestContext": {"httpMethod": method, "resourcePath": path, "stage": "api", "requestId": str(uuid.uuid4())},
+        "body": base64.b64encode(json.dumps(body).encode()).decode() if body is not None else None,
+        "isBase64Encoded": body is not None,
+    }
+
+
+def job(index: int) -> dict:
+    # Unique per invocation, so idempotency never replays a stored response
+    return {
+        "objectKey": f"media/{USER_ID}/{index}.jpg",
+        "dueAt": int(time.time()) + 3600 + index,
+        "platform": "x",
+        "text": str(uuid.uuid4()),
+    }
+
+
+def pre_signup_event(_index: int) -> dict:
+    return {
+        "version": "1",
+        "triggerSource": "PreSignUp_SignUp",
+        "userName": str(uuid.uuid4()),
+        "request": {"userAttributes": {"email": "bench@example.com"}, "validationData": {"recaptchaToken": "bench-token"}},
+        "response": {"autoConfirmUser": False},
+    }
+
+
+# route: (handler, event for invocation i, accepted status codes)
+ROUTES: dict[str, tuple[str, Callable[[int], dict], set[int]]] = {
+    "home": ("api", lambda _index: api_event("GET", "/v1/home"), {200}),
+    "schedule": ("api", lambda index: api_event("POST", "/v1/schedule", job(index)), {200}),
+    "schedule-bulk": (
+        "api",
+        lambda index: api_event("POST", "/v1/schedule/bulk", {"jobs": [job(index * 25 + n) for n in range(25)]}),
+        {200},
+    ),
+    "upload": (
+        "api",
+        lambda _index: api_event(
+            "POST",
+            "/v1/upload",
+            {"contentHash": hashlib.sha256(uuid.uuid4().bytes).hexdigest(), "size": 20 * 1024 * 1024, "contentType": "image/jpeg"},
+        ),
+        {200},
+    ),
+    "sources": ("admin", lambda _index: api_event("GET", "/sources", query={"country": "GB", "fields": "Name,Feeds"}), {200}),
+    "sources-304": ("admin", lambda _index: api_event("GET", "/sources", headers={"If-None-Match": "*"}, query={"country": "GB"}), {304}),
+    "add-source": ("admin", lambda index: api_event("POST", "/add-source", {"name": f"source-{index}-{uuid.uuid4()}"}), {200}),
+    "pre-signup": ("pre_signup", pre_signup_event, set()),
+}
+
+
+class Context:
+    """
+    The parts of the Lambda context the handlers use
+    """
+
+    function_name = "bench"
+    memory_limit_in_mb = 512
+    invoked_function_arn = "arn:aws:lambda:us-east-1:000000000000:function:bench"
+    aws_request_id = "bench"
+
+    @staticmethod
+    def get_remaining_time_in_millis() -> int:
+        return 10_000
+
+
+# ==================================================================================================
+# Stand-ins (parent process)
+
+
+class StandIns:
+    """
+    moto's server for DynamoDB and S3, and an HTTP server for the JWKS, siteverify and request counts
+    """
+
+    def __init__(self) -> None:
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._servers = []
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    def start(self, jwks: dict) -> dict:
+        from moto.moto_server.werkzeug_app import DomainDispatcherApplication, create_backend_app  # noqa: PLC0415
+        from werkzeug.serving import make_server  # noqa: PLC0415
+
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        moto_app = DomainDispatcherApplication(create_backend_app)
+
+        def counting_app(environ: dict, start_response: Callable) -> object:
+            target = environ.get("HTTP_X_AMZ_TARGET", "")
+            self.count(f"aws:dynamodb:{target.rpartition('.')[2]}" if target else f"aws:s3:{environ['REQUEST_METHOD']}")
+            return moto_app(environ, start_response)
+
+        aws = make_server("127.0.0.1", 0, counting_app, threaded=True)
+        stand_ins = self
+
+        class HTTPHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path == "/stats":
+                    with stand_ins._lock:
+                        self.reply(dict(stand_ins.counts))
+                    return
+                stand_ins.count(f"http:{self.path}")
+                self.reply(jwks)
+
+            def do_POST(self) -> None:
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stand_ins.count(f"http:{self.path}")
+                self.reply({"success": True, "score": 0.9})
+
+            def reply(self, body: dict) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *_args: object) -> None:
+                pass
+
+        http = ThreadingHTTPServer(("127.0.0.1", 0), HTTPHandler)
+        for server in (aws, http):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self._servers.append(server)
+        return {"aws": f"http://127.0.0.1:{aws.server_port}", "http": f"http://127.0.0.1:{http.server_port}"}
+
+    def stop(self) -> None:
+        for server in self._servers:
+            server.shutdown()
+
+
+def make_token() -> tuple[str, dict]:
+    """
+    Get a signed ID token for the bench user and the key set that verifies it
+    """
+    import jwt  # noqa: PLC0415
+    from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: PLC0415
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public = jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key(), as_dict=True)
+    claims = {
+        "sub": USER_ID,
+        "cognito:username": USER_ID,
+        "iss": ISSUER,
+        "aud": CLIENT_ID,
+        "token_use": "id",
+        "exp": int(time.time()) + 86400,
+    }
+    token = jwt.encode(claims, key, algorithm="RS256", headers={"kid": KEY_ID})
+    return token, {"keys": [{**public, "kid": KEY_ID, "alg": "RS256", "use": "sig"}]}
+
+
+def seed() -> None:
+    """
+    Create the table and bucket, with a source catalogue, the reCaptcha secret and a home view
+    """
+    import boto3  # noqa: PLC0415
+
+    sys.path.insert(0, str(SHARED_DIR))
+    from shared.views import build_home_view  # noqa: PLC0415
+
+    boto3.client("s3").create_bucket(Bucket=BUCKET_NAME)
+    table = boto3.resource("dynamodb").create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}, {"AttributeName": "sk", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}, {"AttributeName": "sk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+
+    partitions = [f"SOURCE#{country}#{language}" for country in ("GB", "US", "IN") for language in ("en", "hi")]
+    now = int(time.time())
+    with table.batch_writer() as batch:
+        batch.put_item(Item={"pk": "APP#DATA", "sk": "SOURCES", "Partitions": partitions, "Version": "bench-1"})
+        batch.put_item(Item={"pk": "APP#DATA", "sk": "SECRETS", "RECAPTCHA_SECRET_KEY": "bench-secret"})
+        for partition in partitions:
+            for index in range(30):
+                country = partition.split("#")[1]
+                feeds = [f"https://news.example.com/{country}/{index}/{section}.xml" for section in ("top", "world")]
+                batch.put_item(
+                    Item={"pk": partition, "sk": f"NAME#source-{index:02d}", "Name": f"Source {index}", "Country": country, "Feeds": feeds},
+                )
+        jobs = [
+            {
+                "JobId": f"job-{index:03d}",
+                "UserId": USER_ID,
+                "Status": "PENDING",
+                "DueAt": now + 900 * index,
+                "ObjectKey": f"media/{index}.jpg",
+                "Platform": "x",
+            }
+            for index in range(40)
+        ]
+        batch.put_item(Item=build_home_view(USER_ID, jobs))
+
+
+# ==================================================================================================
+# Measurements (child process)
+
+
+def fetch_stats() -> Counter:
+    with urllib.request.urlopen(f"{os.environ['BENCH_HTTP_URL']}/stats", timeout=5) as response:  # noqa: S310
+        return Counter(json.loads(response.read()))
+
+
+def request_counts(before: Counter, after: Counter, invocations: int = 1) -> dict[str, float]:
+    difference = after - before
+    return {
+        kind: round(sum(count for name, count in difference.items() if name.startswith(f"{kind}:")) / invocations, 2)
+        for kind in ("aws", "http")
+    }
+
+
+def invoke(function: Callable, event: dict, accepted: set[int]) -> None:
+    response = function(event, Context())
+    status = response.get("statusCode") if accepted else None
+    if accepted and status not in accepted:
+        msg = f"Unexpected status {status}: {response.get('body')}"
+        raise RuntimeError(msg)
+
+
+def measure(route: str, warm: int) -> dict:
+    """
+    Import the route's handler, invoke it cold, then warm, and collect timings, allocations and calls
+    """
+    handler_name, make_event, accepted = ROUTES[route]
+    handler = HANDLERS[handler_name]
+    sys.path[:0] = [str(handler["path"]), str(SHARED_DIR)]
+
+    before = fetch_stats()
+    start = time.perf_counter()
+    module = importlib.import_module(handler["module"])
+    import_ms = (time.perf_counter() - start) * 1000
+    function = getattr(module, handler["function"])
+    event = make_event(0)
+    start = time.perf_counter()
+    invoke(function, event, accepted)
+    first_ms = (time.perf_counter() - start) * 1000
+    result = {"import_ms": import_ms, "first_ms": first_ms, "cold": request_counts(before, fetch_stats())}
+    if not warm:
+        return result
+
+    timings = []
+    before = fetch_stats()
+    for index in range(1, warm + 1):
+        event = make_event(index)
+        start = time.perf_counter()
+        invoke(function, event, accepted)
+        timings.append((time.perf_counter() - start) * 1000)
+    result["warm"] = request_counts(before, fetch_stats(), warm)
+    result["timings"] = timings
+
+    peaks = []
+    tracemalloc.start()
+    for index in range(warm + 1, warm + 6):
+        event = make_event(index)
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        invoke(function, event, accepted)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+    result["peak_kib"] = statistics.median(peaks) / 1024
+
+    calls = Counter()
+    event = make_event(warm + 6)
+    sys.setprofile(lambda _frame, kind, _arg: calls.update((kind,)) if kind in ("call", "c_call") else None)
+    try:
+        invoke(function, event, accepted)
+    finally:
+        sys.setprofile(None)
+    result["calls"] = calls["call"] + calls["c_call"]
+    return result
+
+
+# ==================================================================================================
+# Report (parent process)
+
+
+def run_child(route: str, warm: int, env: dict) -> dict:
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, __file__, "--child", route, "--warm", str(warm)],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER) :])
+    msg = f"{route} failed:\n{result.stderr.strip()[-2000:]}"
+    raise RuntimeError(msg)
+
+
+def percentile(values: list[float], point: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[point - 1] if len(values) > 1 else values[0]
+
+
+def summarize(samples: list[dict]) -> dict:
+    cold = [sample["import_ms"] + sample["first_ms"] for sample in samples]
+    warm = samples[0]
+    return {
+        "cold_p50_ms": round(statistics.median(cold), 2),
+        "import_p50_ms": round(statistics.median(sample["import_ms"] for sample in samples), 2),
+        "warm_p50_ms": round(percentile(warm["timings"], 50), 3),
+        "warm_p95_ms": round(percentile(warm["timings"], 95), 3),
+        "warm_p99_ms": round(percentile(warm["timings"], 99), 3),
+        "peak_kib": round(warm["peak_kib"], 1),
+        "calls": warm["calls"],
+        "aws_cold": warm["cold"]["aws"],
+        "aws_warm": warm["warm"]["aws"],
+        "http_cold": warm["cold"]["http"],
+        "http_warm": warm["warm"]["http"],
+    }
+
+
+def regressions(current: dict, baseline: dict) -> list[str]:
+    """
+    Get the ways a route got worse than its baseline
+    """
+    found = []
+    for metric, noise in (("cold_p50_ms", COLD_NOISE_MS), ("warm_p50_ms", WARM_NOISE_MS), ("warm_p95_ms", WARM_NOISE_MS)):
+        if current[metric] > baseline[metric] * (1 + TIME_TOLERANCE) and current[metric] - baseline[metric] > noise:
+            found.append(f"{metric} {baseline[metric]} -> {current[metric]}")
+    if current["peak_kib"] > baseline["peak_kib"] * (1 + ALLOCATION_TOLERANCE):
+        found.append(f"peak_kib {baseline['peak_kib']} -> {current['peak_kib']}")
+    if current["calls"] > baseline["calls"] * (1 + CALLS_TOLERANCE):
+        found.append(f"calls {baseline['calls']} -> {current['calls']}")
+    # Requests to AWS and HTTP services are deterministic, so any increase counts
+    found.extend(
+        f"{metric} {baseline[metric]} -> {current[metric]}"
+        for metric in ("aws_cold", "aws_warm", "http_cold", "http_warm")
+        if current[metric] > baseline[metric]
+    )
+    return found
+
+
+def print_row(route: str, row: dict, flagged: list[str] | None) -> None:
+    status = "❌" if flagged else "✅" if flagged is not None else "  "
+    print(
+        f"{status} {route:<14} {row['cold_p50_ms']:>8.1f} {row['import_p50_ms']:>8.1f}"
+        f" {row['warm_p50_ms']:>7.2f} {row['warm_p95_ms']:>7.2f} {row['warm_p99_ms']:>7.2f}"
+        f" {row['peak_kib']:>8.1f} {row['calls']:>7}"
+        f" {row['aws_cold']:>4g}/{row['aws_warm']:<4g} {row['http_cold']:>4g}/{row['http_warm']:<4g}",
+    )
+    for regression in flagged or []:
+        print(f"     regressed: {regression}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the Lambda handlers on local stand-ins")
+    parser.add_argument("--warm", type=int, default=DEFAULT_WARM, help="Warm invocations per route")
+    parser.add_argument("--cold", type=int, default=DEFAULT_COLD, help="Cold starts (fresh processes) per route")
+    parser.add_argument("--route", action="append", choices=sorted(ROUTES), help="Routes to run (default: all)")
+    parser.add_argument("--save", action="store_true", help="Save the results as the new baselines")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.child:
+        print(RESULT_MARKER + json.dumps(measure(args.child, args.warm)))
+        return
+
+    token, jwks = make_token()
+    stand_ins = StandIns()
+    urls = stand_ins.start(jwks)
+    env = {
+        **os.environ,
+        "AWS_ENDPOINT_URL": urls["aws"],
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_DEFAULT_REGION": "us-east-1",
+        "AWS_REGION": "us-east-1",
+        "TABLE_NAME": TABLE_NAME,
+        "BUCKET_NAME": BUCKET_NAME,
+        "POWERTOOLS_SERVICE_NAME": "bench-handlers",
+        "TOKEN_ISSUER": ISSUER,
+        "USER_POOL_CLIENT_ID": CLIENT_ID,
+        "JWKS_URL": f"{urls['http']}/jwks.json",
+        "SITE_VERIFICATION_URL": f"{urls['http']}/siteverify",
+        "BENCH_HTTP_URL": urls["http"],
+        "BENCH_TOKEN": token,
+    }
+    os.environ.update(
+        {name: env[name] for name in ("AWS_ENDPOINT_URL", "AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_DEFAULT_REGION")},
+    )
+    seed()
+
+    baselines = json.loads(BASELINES_FILE.read_text()) if BASELINES_FILE.exists() else {}
+    routes = args.route or list(ROUTES)
+    print(f"Benchmarking {len(routes)} routes ({args.cold} cold starts, {args.warm} warm invocations each)...")
+    header = f"   {'route':<14} {'cold':>8} {'import':>8} {'p50':>7} {'p95':>7} {'p99':>7}"
+    print(f"{header} {'peak KiB':>8} {'calls':>7} {'aws c/w':>9} {'http c/w':>9}")
+    results, failed = {}, []
+    try:
+        for route in routes:
+            samples = [run_child(route, args.warm if index == 0 else 0, env) for index in range(args.cold)]
+            results[route] = summarize(samples)
+            flagged = regressions(results[route], baselines[route]) if route in baselines and not args.save else None
+            if flagged:
+                failed.append(route)
+            print_row(route, results[route], flagged)
+    finally:
+        stand_ins.stop()
+    print("   (ms; cold = import + first invocation, p50 over cold starts; aws/http = requests per cold/warm invocation)")
+
+    if args.save:
+        BASELINES_FILE.write_text(json.dumps({**baselines, **results}, indent=4) + "\n")
+        print(f"✅ Saved baselines for {len(results)} routes to {BASELINES_FILE.name}")
+    elif failed:
+        print(f"❌ {len(failed)} route(s) regressed: {', '.join(failed)}")
+        sys.exit(1)
+    else:
+        print("✅ No regressions against the baselines")
+
+
+if __name__ == "__main__":
+    main()
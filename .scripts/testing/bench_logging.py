@@ -0,0 +1,158 @@
+"""
+Benchmarks per-invocation logging on large events.
+
+For each event (an API request with a bulk scheduling body, a Cognito pre-signup trigger, an SQS
+batch and a DynamoDB stream batch) it times and measures what the handlers wrote before, an
+f-string of the event and one of the context, at INFO and with the level raised to WARNING (the
+strings are built either way), against shared.logger's one record per invocation, unsampled and
+sampled.
+
+The records are checked too: one per invocation, and no secret of the event in the output.
+
+Usage:
+    python .scripts/testing/bench_logging.py [--rounds 300]
+"""
+
+import argparse
+import io
+import json
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "aws" / "src"))
+
+from aws_lambda_powertools import Logger
+from shared.logger import InvocationLog
+
+# === CONFIG ===
+DEFAULT_ROUNDS = 300
+SECRET = "secret-value-that-must-not-be-logged"  # noqa: S105
+CONTEXT = SimpleNamespace(aws_request_id="0b5e4f1c-6a2d-4d8e-9f7a-3c1b2a4d5e6f", function_name="bench", memory_limit_in_mb=512)
+
+
+def api_event() -> dict:
+    posts = [{"objectKey": f"media/alice/{index:04d}.jpg", "dueAt": 1_760_000_000 + index, "text": "A" * 280} for index in range(500)]
+    return {
+        "resource": "/v1/schedule/bulk",
+        "path": "/v1/schedule/bulk",
+        "httpMethod": "POST",
+        "headers": {"Authorization": f"Bearer {SECRET}", "Content-Type": "application/json", "User-Agent": "bench/1.0"},
+        "multiValueHeaders": {"Authorization": [f"Bearer {SECRET}"]},
+        "queryStringParameters": None,
+        "requestContext": {"httpMethod": "POST", "resourcePath": "/v1/schedule/bulk", "stage": "prod", "requestId": "bench"},
+        "body": json.dumps({"posts": posts}),
+        "isBase64Encoded": False,
+    }
+
+
+def cognito_event() -> dict:
+    return {
+        "version": "1",
+        "triggerSource": "PreSignUp_SignUp",
+        "userPoolId": "us-east-1_bench",
+        "userName": "alice",
+        "request": {
+            "userAttributes": {"email": "alice@example.com", "phone_number": "+15550100"},
+            "validationData": {"recaptchaToken": SECRET * 40},
+        },
+        "response": {"autoConfirmUser": False},
+    }
+
+
+def sqs_event() -> dict:
+    job = {"JobId": "job", "UserId": "alice", "Text": "B" * 3000, "AccessToken": SECRET}
+    return {"Records": [{"messageId": f"message-{index}", "eventSource": "aws:sqs", "body": json.dumps(job)} for index in range(10)]}
+
+
+def stream_event() -> dict:
+    image = {"pk": {"S": "USER#alice"}, "sk": {"S": "JOB#job"}, "Text": {"S": "C" * 500}, "Status": {"S": "SCHEDULED"}}
+    records = [{"eventName": "MODIFY", "eventSource": "aws:dynamodb", "dynamodb": {"NewImage": image, "OldImage": image}}] * 100
+    return {"Records": records}
+
+
+EVENTS = {"api-bulk": api_event, "pre-signup": cognito_event, "sqs-batch": sqs_event, "stream-batch": stream_event}
+
+
+def median_us(function: Callable, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def make_logger(name: str, level: str) -> tuple[Logger, io.StringIO]:
+    stream = io.StringIO()
+    return Logger(service=f"bench-{name}", level=level, stream=stream), stream
+
+
+def previous(level: str) -> tuple[Callable, io.StringIO]:
+    logger, stream = make_logger(f"previous-{level}", level)
+
+    def handler(event: dict, context: object) -> None:
+        logger.info(f"Event: {event}")
+        logger.info(f"Context: {context}")
+
+    return handler, stream
+
+
+def invocation_log(sample_rate: float) -> tuple[Callable, io.StringIO]:
+    logger, stream = make_logger(f"invocation-{sample_rate}", "INFO")
+    log = InvocationLog(logger, sample_rate=sample_rate)
+
+    @log.log_invocation
+    def handler(_event: dict, _context: object) -> dict:
+        log.append(scheduled=500)
+        log.debug("Parsed the body")
+        return {"statusCode": 200}
+
+    return handler, stream
+
+
+WAYS = {
+    "previous": lambda: previous("INFO"),
+    "previous, WARNING": lambda: previous("WARNING"),
+    "unsampled": lambda: invocation_log(0),
+    "sampled": lambda: invocation_log(1),
+}
+
+
+def bench(name: str, event: dict, ways: dict[str, tuple[Callable, io.StringIO]], rounds: int) -> bool:
+    ok = True
+    print(f"  {name} ({len(json.dumps(event)):,} B event)")
+    for way, (handler, stream) in ways.items():
+        stream.seek(0)
+        stream.truncate()
+        handler(event, CONTEXT)
+        output = stream.getvalue()
+        timing = median_us(lambda handler=handler: handler(event, CONTEXT), rounds)
+        if way in ("unsampled", "sampled"):
+            ok = ok and len(output.splitlines()) == 1 and SECRET not in output
+        print(f"    {way:<18} {timing:8.1f} µs, {len(output.encode()):>9,} B written per invocation")
+    return ok
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark per-invocation logging on large events")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="Timed rounds per measurement")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    print(f"Logging representative events ({args.rounds} rounds, medians)...")
+    # Loggers are created once: Powertools keeps the stream of the first logger of a service
+    ways = {way: make() for way, make in WAYS.items()}
+    results = [bench(name, build(), ways, args.rounds) for name, build in EVENTS.items()]
+    passed = all(results)
+    print("✅ Logging OK" if passed else "❌ A record was not written once or leaked a secret")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
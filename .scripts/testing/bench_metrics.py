@@ -0,0 +1,247 @@
+"""
+Benchmarks the overhead of shared.metrics on the request path.
+
+Times each piece an invocation pays for:
+    * add() and timer(): one value recorded
+    * the botocore hooks: a DynamoDB GetItem on moto with an instrumented client against a plain one
+    * flush(): the EMF records of a typical invocation (a route, a few DynamoDB calls) and of a
+      large one (a bulk request), written to a discarded stream
+    * a typical invocation in all: log_metrics and route_middleware around an empty handler, five
+      DynamoDB calls' hooks and the flush
+
+The records are checked as they would be extracted: valid JSON, within the EMF value and metric
+limits, and with every value buffered published once, so a broken record fails the run. So are the
+records flushed while worker threads record values, as a handler's pooled boto3 calls do.
+
+Usage:
+    python .scripts/testing/bench_metrics.py [--rounds 2000]
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections.abc import Callable
+from contextlib import redirect_stdout
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "aws" / "src"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from shared import metrics as metrics_module
+from shared.metrics import MAX_METRICS, MAX_VALUES, Metrics
+
+# === CONFIG ===
+DEFAULT_ROUNDS = 2000
+TABLE_NAME = "metrics-bench"
+# DynamoDB calls of a typical api request
+TYPICAL_CALLS = 5
+THREADS = 8
+VALUES_PER_THREAD = 5000
+
+
+def median_us(function: Callable, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def fake_call(metrics: Metrics, operation: str) -> None:
+    """
+    What botocore calls the hooks with around one request
+    """
+    model = SimpleNamespace(name=operation, service_model=SimpleNamespace(service_name="dynamodb"))
+    context = {}
+    metrics._before_call(context=context)  # noqa: SLF001
+    metrics._after_call(model=model, context=context, http_response=SimpleNamespace(status_code=200))  # noqa: SLF001
+
+
+def fill(metrics: Metrics, calls: int, operations: int) -> int:
+    """
+    Buffer an invocation's values: the route, its DynamoDB calls spread over a few operations
+    """
+    metrics.set_dimension("Route", "POST /v1/schedule")
+    metrics.set_property("RequestId", "bench-request")
+    metrics.add("ColdStart", 0, "Count")
+    metrics.add("RouteLatency", 12.5)
+    for index in range(calls):
+        fake_call(metrics, f"Operation{index % operations}")
+    return 2 + calls
+
+
+def check_records(metrics: Metrics, buffered: int) -> bool:
+    return published_values(metrics_output(metrics)) == buffered
+
+
+def published_values(output: str) -> int | None:
+    """
+    Count the values of EMF records, or None when a record breaks the limits
+    """
+    records = [json.loads(line) for line in output.splitlines()]
+    published = 0
+    for record in records:
+        names = [metric["Name"] for metric in record["_aws"]["CloudWatchMetrics"][0]["Metrics"]]
+        values = [record[name] if isinstance(record[name], list) else [record[name]] for name in names]
+        if len(names) > MAX_METRICS or any(len(value) > MAX_VALUES for value in values):
+            return None
+        published += sum(len(value) for value in values)
+    return published
+
+
+def metrics_output(metrics: Metrics) -> str:
+    with redirect_stdout(io.StringIO()) as output:
+        metrics.flush()
+    return output.getvalue()
+
+
+def bench_recording(rounds: int) -> None:
+    metrics = Metrics("Bench", "bench")
+
+    def add() -> None:
+        metrics.add("Value", 1.0)
+
+    def timer() -> None:
+        with metrics.timer("Block"):
+            pass
+
+    def hooks() -> None:
+        fake_call(metrics, "GetItem")
+
+    for name, function in (("add()", add), ("timer()", timer), ("botocore hooks", hooks)):
+        print(f"  {name:<22} {median_us(function, rounds):7.2f} µs")
+        # Start each measurement on an empty buffer, below its bound
+        metrics_output(metrics)
+
+
+def bench_flush(rounds: int) -> bool:
+    ok = True
+    for label, calls, operations in (("typical", TYPICAL_CALLS, 3), ("bulk", 600, 4)):
+        metrics = Metrics("Bench", "bench")
+        ok = check_records(metrics, fill(metrics, calls, operations)) and ok
+        fill(metrics, calls, operations)
+        size = len(metrics_output(metrics))
+
+        def flush(metrics: Metrics = metrics, calls: int = calls, operations: int = operations) -> None:
+            fill(metrics, calls, operations)
+            with redirect_stdout(io.StringIO()):
+                metrics.flush()
+
+        print(f"  fill + flush, {label:<8} {median_us(flush, rounds // 10 or 1):7.1f} µs for {calls} call(s), {size:,} B of records")
+    return ok
+
+
+def check_threads() -> bool:
+    """
+    Flush over and over while THREADS threads record VALUES_PER_THREAD values each: none may be lost or
+    published twice
+    """
+    metrics = Metrics("Bench", "bench")
+    done = threading.Event()
+    # However far the flushes fall behind, no value may be dropped for the buffer's bound
+    bound = metrics_module.MAX_BUFFERED_VALUES
+    metrics_module.MAX_BUFFERED_VALUES = THREADS * VALUES_PER_THREAD
+
+    def record() -> None:
+        for _ in range(VALUES_PER_THREAD):
+            fake_call(metrics, "GetItem")
+
+    threads = [threading.Thread(target=record) for _ in range(THREADS)]
+
+    def wait() -> None:
+        for thread in threads:
+            thread.join()
+        done.set()
+
+    outputs = []
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads:
+            thread.start()
+        threading.Thread(target=wait).start()
+        while not done.is_set():
+            outputs.append(metrics_output(metrics))
+        outputs.append(metrics_output(metrics))
+    finally:
+        sys.setswitchinterval(interval)
+        metrics_module.MAX_BUFFERED_VALUES = bound
+    counts = [published_values(output) for output in outputs]
+    published = None if None in counts else sum(counts)
+    print(f"  {THREADS} threads recording: {published}/{THREADS * VALUES_PER_THREAD} values published over {len(outputs)} flushes")
+    return published == THREADS * VALUES_PER_THREAD
+
+
+def bench_invocation(rounds: int) -> None:
+    metrics = Metrics("Bench", "bench")
+    app = SimpleNamespace(current_event=SimpleNamespace(http_method="POST", path="/v1/schedule"), context={"_path": "/v1/schedule"})
+    lambda_context = SimpleNamespace(aws_request_id="bench-request")
+
+    def route(_app: object) -> None:
+        for index in range(TYPICAL_CALLS):
+            fake_call(metrics, f"Operation{index % 3}")
+
+    @metrics.log_metrics
+    def handler(_event: dict, _context: object) -> None:
+        metrics.route_middleware(app, route)
+
+    def invoke() -> None:
+        with redirect_stdout(io.StringIO()):
+            handler({}, lambda_context)
+
+    print(f"  typical invocation     {median_us(invoke, rounds):7.1f} µs all told")
+
+
+def bench_client(rounds: int) -> None:
+    import boto3  # noqa: PLC0415
+
+    boto3.client("dynamodb").create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    metrics = Metrics("Bench", "bench")
+    plain = boto3.client("dynamodb")
+    instrumented = metrics.instrument(boto3.client("dynamodb"))
+    key = {"pk": {"S": "bench"}}
+    timings = {}
+    for name, client in (("plain", plain), ("instrumented", instrumented)):
+        client.get_item(TableName=TABLE_NAME, Key=key)
+        timings[name] = median_us(lambda client=client: client.get_item(TableName=TABLE_NAME, Key=key), rounds // 10 or 1)
+    recorded = len(metrics._values.get("dynamodb.GetItem", []))  # noqa: SLF001
+    print(f"  GetItem on moto        {timings['plain']:7.1f} µs plain, {timings['instrumented']:7.1f} µs instrumented", end="")
+    print(f" ({timings['instrumented'] - timings['plain']:+.1f} µs, {recorded} value(s) recorded)")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the overhead of the metrics instrumentation")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="Timed rounds per measurement")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    print(f"Timing the metrics instrumentation ({args.rounds} rounds, medians)...")
+    bench_recording(args.rounds)
+    passed = bench_flush(args.rounds)
+    passed = check_threads() and passed
+    bench_invocation(args.rounds)
+
+    from moto import mock_aws  # noqa: PLC0415
+
+    with mock_aws():
+        bench_client(args.rounds)
+    print("✅ Metrics OK" if passed else "❌ A record broke the EMF limits or lost values")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
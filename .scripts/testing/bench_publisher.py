@@ -0,0 +1,207 @@
+"""
+Benchmarks the rate-limited publisher against a local mock of a platform API.
+
+The mock enforces per-account and per-app token bucket limits and answers 429 with Retry-After
+when they are exceeded, like the platforms do. Jobs are drained from a simulated queue (batches
+of 10, several concurrent invocations, requeued jobs come back after their delay) by:
+
+- naive: one call per job, requeued after Retry-After when throttled
+- buckets: lib.publisher.Publisher, taking tokens from the shared DynamoDB buckets (moto) first
+
+and the wall time, calls made, 429s received and invocations used are compared.
+
+Usage:
+    python .scripts/testing/bench_publisher.py [--accounts 10] [--jobs-per-account 8]
+"""
+
+import argparse
+import asyncio
+import heapq
+import math
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import aiohttp
+import boto3
+from aiohttp import web
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(ROOT / "aws" / "src" / "fn" / "publisher"), str(ROOT / "aws" / "src")]
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+# === CONFIG ===
+TABLE_NAME = "publisher-bench"
+PLATFORM = "mock"
+ACCOUNT_CAPACITY, ACCOUNT_RATE = 3, 1.0
+APP_CAPACITY, APP_RATE = 15, 8.0
+LATENCY_SECONDS = 0.03
+BATCH_SIZE = 10
+CONCURRENT_INVOCATIONS = 4
+
+
+class MockBucket:
+    def __init__(self, capacity: float, rate: float) -> None:
+        self.capacity, self.rate = capacity, rate
+        self.tokens, self.updated_at = capacity, time.monotonic()
+
+    def take(self) -> float:
+        """
+        Take a token; returns 0 when granted, else the seconds until one is available
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class MockPlatform:
+    """
+    A platform API that enforces per-account (by bearer token) and per-app limits
+    """
+
+    def __init__(self) -> None:
+        self.app = MockBucket(APP_CAPACITY, APP_RATE)
+        self.accounts: dict[str, MockBucket] = {}
+        self.calls = 0
+        self.throttled = 0
+        self.published: set[str] = set()
+
+    async def post(self, request: web.Request) -> web.Response:
+        self.calls += 1
+        await asyncio.sleep(LATENCY_SECONDS)
+        account = self.accounts.setdefault(request.headers["Authorization"], MockBucket(ACCOUNT_CAPACITY, ACCOUNT_RATE))
+        wait = account.take() or self.app.take()
+        if wait:
+            self.throttled += 1
+            return web.json_response({"error": "rate limited"}, status=429, headers={"Retry-After": str(math.ceil(wait))})
+        self.published.add(request.headers["Idempotency-Key"])
+        return web.json_response({"id": request.headers["Idempotency-Key"]}, status=201)
+
+
+def start_server(platform: MockPlatform) -> str:
+    loop = asyncio.new_event_loop()
+    application = web.Application()
+    application.router.add_post(f"/{PLATFORM}", platform.post)
+    runner = web.AppRunner(application)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]  # noqa: SLF001
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+
+def make_jobs(accounts: int, per_account: int) -> list[dict]:
+    return [
+        {"JobId": f"job-{account}-{index}", "UserId": "bench", "Platform": PLATFORM, "AccountId": f"account-{account}", "Text": "hi"}
+        for index in range(per_account)
+        for account in range(accounts)
+    ]
+
+
+async def drain(jobs: list[dict], publish_batch) -> dict:  # noqa: ANN001
+    """
+    Run batches of ready jobs until every job is done, requeueing the ones returned with a delay
+    """
+    started = time.monotonic()
+    queue = [(started, index, job) for index, job in enumerate(jobs)]
+    heapq.heapify(queue)
+    invocations = 0
+    while queue:
+        now = time.monotonic()
+        if queue[0][0] > now:
+            await asyncio.sleep(queue[0][0] - now)
+            continue
+        batches = []
+        while queue and queue[0][0] <= now and len(batches) < CONCURRENT_INVOCATIONS:
+            batch = []
+            while queue and queue[0][0] <= now and len(batch) < BATCH_SIZE:
+                batch.append(heapq.heappop(queue)[2])
+            batches.append(batch)
+        invocations += len(batches)
+        for requeued in await asyncio.gather(*(publish_batch(batch) for batch in batches)):
+            for job, delay in requeued:
+                # SQS delays are whole seconds
+                heapq.heappush(queue, (time.monotonic() + math.ceil(delay), id(job), job))
+    return {"seconds": time.monotonic() - started, "invocations": invocations}
+
+
+async def run_naive(base_url: str, jobs: list[dict]) -> dict:
+    async with aiohttp.ClientSession() as session:
+
+        async def publish_batch(batch: list[dict]) -> list[tuple[dict, float]]:
+            requeued = []
+            for job in batch:
+                headers = {"Authorization": f"Bearer {job['AccountId']}", "Idempotency-Key": job["JobId"]}
+                async with session.post(f"{base_url}/{PLATFORM}", json={"text": job["Text"]}, headers=headers) as response:
+                    if response.status == 429:  # noqa: PLR2004
+                        requeued.append((job, float(response.headers["Retry-After"])))
+            return requeued
+
+        return await drain(jobs, publish_batch)
+
+
+async def run_buckets(base_url: str, jobs: list[dict], table: object) -> dict:
+    from lib.platforms import Platform  # noqa: PLC0415
+    from lib.publisher import PUBLISHED, Publisher  # noqa: PLC0415
+    from shared.ratelimit import TokenBucketStore  # noqa: PLC0415
+
+    platforms = {PLATFORM: Platform(PLATFORM, f"{base_url}/{PLATFORM}", ACCOUNT_CAPACITY, ACCOUNT_RATE, APP_CAPACITY, APP_RATE)}
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=64)) as session:
+        publisher = Publisher(TokenBucketStore(table), platforms, session, lambda job: job["AccountId"])
+
+        async def publish_batch(batch: list[dict]) -> list[tuple[dict, float]]:
+            return [(outcome.job, outcome.delay) for outcome in await publisher.publish(batch) if outcome.status != PUBLISHED]
+
+        return await drain(jobs, publish_batch)
+
+
+def create_table() -> object:
+    table = boto3.resource("dynamodb").create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}, {"AttributeName": "sk", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}, {"AttributeName": "sk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+    return table
+
+
+def run(accounts: int, per_account: int) -> bool:
+    jobs = make_jobs(accounts, per_account)
+    print(f"{len(jobs)} jobs over {accounts} accounts; limits: account {ACCOUNT_CAPACITY} burst at {ACCOUNT_RATE}/s, ", end="")
+    print(f"app {APP_CAPACITY} burst at {APP_RATE}/s; {CONCURRENT_INVOCATIONS} concurrent invocations of {BATCH_SIZE}")
+
+    ok = True
+    table = create_table()
+    for name, runner in (("naive", lambda url: run_naive(url, jobs)), ("buckets", lambda url: run_buckets(url, jobs, table))):
+        platform = MockPlatform()
+        stats = asyncio.run(runner(start_server(platform)))
+        ok &= len(platform.published) == len(jobs)
+        print(
+            f"  {name:8} {stats['seconds']:6.2f}s  calls {platform.calls:5}  429s {platform.throttled:5}  "
+            f"invocations {stats['invocations']:4}  published {len(platform.published)}/{len(jobs)}",
+        )
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the rate-limited publisher against a mock platform")
+    parser.add_argument("--accounts", type=int, default=10)
+    parser.add_argument("--jobs-per-account", type=int, default=8)
+    args = parser.parse_args()
+
+    from moto import mock_aws
+
+    with mock_aws():
+        passed = run(args.accounts, args.jobs_per_account)
+
+    print("✅ Publisher benchmark OK" if passed else "❌ Some jobs were not published")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,115 @@
+"""
+Checks the recurrence engine against zoneinfo around DST changes and benchmarks bulk window expansion.
+
+Usage:
+    python .scripts/testing/bench_recurrence.py [--users 100000] [--days 7]
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "aws" / "src"))
+
+from shared.recurrence import Recurrence, expand_all
+
+# === CONFIG ===
+# Zones with forward and backward changes on different dates and at different local times, and one without DST
+TIMEZONES = ["Europe/London", "America/New_York", "Australia/Sydney", "America/Sao_Paulo", "Asia/Kolkata", "Pacific/Chatham"]
+# Windows around the 2025 changes, plus a year boundary
+DST_EDGES = [
+    ("2025-03-08", "2025-03-11"),  # US spring forward
+    ("2025-03-29", "2025-04-07"),  # EU spring forward, AU fall back
+    ("2025-09-26", "2025-10-07"),  # AU spring forward, Chatham
+    ("2025-10-25", "2025-11-04"),  # EU and US fall back
+    ("2025-12-29", "2026-01-05"),  # Year boundary
+]
+PRESET_SPECS = ["MO,WE,FR 09:00", "TU,TH 12:30", "MO,TU,WE,TH,FR 08:15; SA,SU 10:00", "SU 01:30; SU 02:30", "SA 23:45"]
+
+
+def brute_force(rule: Recurrence, start: int, end: int) -> list[int]:
+    """
+    Resolves every slot of every local day in the window through zoneinfo (fold=0)
+    """
+    zone = ZoneInfo(rule.timezone)
+    day = datetime.fromtimestamp(start, zone).date() - timedelta(days=1)
+    last_day = datetime.fromtimestamp(end, zone).date() + timedelta(days=1)
+    result = set()
+    while day <= last_day:
+        for minute, mask in rule.masks.items():
+            for hour in range(24):
+                if mask >> (day.weekday() * 24 + hour) & 1:
+                    occurrence = int(datetime(day.year, day.month, day.day, hour, minute, tzinfo=zone).timestamp())
+                    if start <= occurrence < end:
+                        result.add(occurrence)
+        day += timedelta(days=1)
+    return sorted(result)
+
+
+def check_dst_edges() -> bool:
+    failures = 0
+    checks = 0
+    for timezone in TIMEZONES:
+        for spec in PRESET_SPECS:
+            rule = Recurrence.parse(timezone, spec)
+            for first, last in DST_EDGES:
+                start = int(datetime.fromisoformat(first).replace(tzinfo=UTC).timestamp())
+                end = int(datetime.fromisoformat(last).replace(tzinfo=UTC).timestamp())
+                checks += 1
+                expected = brute_force(rule, start, end)
+                actual = rule.occurrences(start, end)
+                if actual != expected:
+                    failures += 1
+                    print(f"  MISMATCH {timezone} {spec!r} {first}..{last}: {len(actual)} vs {len(expected)}")
+            after = int(datetime(2025, 3, 1, tzinfo=UTC).timestamp())
+            checks += 1
+            if rule.next(after, 50) != brute_force(rule, after + 1, after + 400 * 86400)[:50]:
+                failures += 1
+                print(f"  MISMATCH next() {timezone} {spec!r}")
+    print(f"DST edge checks: {checks - failures}/{checks} match zoneinfo")
+    return failures == 0
+
+
+def benchmark(users: int, days: int) -> None:
+    rng = random.Random(7)  # noqa: S311
+    rules = {}
+    for index in range(users):
+        timezone = rng.choice(TIMEZONES)
+        if rng.random() < 0.8:  # noqa: PLR2004
+            # Most users pick a preset slot plan
+            rules[f"user{index}"] = Recurrence.parse(timezone, rng.choice(PRESET_SPECS))
+        else:
+            slots = [(rng.randrange(7), rng.randrange(24), rng.choice((0, 15, 30, 45))) for _ in range(rng.randint(1, 10))]
+            rules[f"user{index}"] = Recurrence.from_slots(timezone, slots)
+
+    start = int(datetime(2025, 10, 24, tzinfo=UTC).timestamp())
+    end = start + days * 86400
+
+    started = time.perf_counter()
+    expanded = expand_all(rules, start, end)
+    elapsed = time.perf_counter() - started
+    total = sum(len(occurrences) for occurrences in expanded.values())
+    print(f"Users: {users}, Window: {days} day(s) across the EU/US fall-back, Occurrences: {total}")
+    print(f"Elapsed: {elapsed:.2f}s, Throughput: {users / elapsed:,.0f} users/s")
+
+    sample = rng.sample(list(rules), min(users, 200))
+    started = time.perf_counter()
+    for user_id in sample:
+        brute_force(rules[user_id], start, end)
+    per_user = (time.perf_counter() - started) / len(sample)
+    print(f"Per-day brute force (zoneinfo) estimate for all users: {per_user * users:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and benchmark the recurrence engine")
+    parser.add_argument("--users", type=int, default=100_000, help="Number of users with a recurring schedule")
+    parser.add_argument("--days", type=int, default=7, help="Window length in days")
+    args = parser.parse_args()
+
+    ok = check_dst_edges()
+    benchmark(args.users, args.days)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,149 @@
+"""
+Benchmarks response serialization and compression on representative API responses.
+
+For each response (a scheduled job id, a home screen, a page of sources with their feeds and a
+bulk scheduling report) it times the resolver's previous path (stdlib json through Powertools'
+encoder, with RESPONSE's wrapper dict) against shared.lambda_response with the stdlib and orjson
+encoders, then compresses the body with gzip and brotli as compress_response would. Every
+compressed body is decompressed and compared, so a broken encoding fails the run.
+
+Usage:
+    python .scripts/testing/bench_response.py [--rounds 200]
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from decimal import Decimal
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "aws" / "src"))
+
+from aws_lambda_powertools.shared.json_encoder import Encoder
+from shared import lambda_response
+from shared.lambda_response import HEADERS, compress_response, json_encoder
+from shared.uuid import uuid7
+from shared.views import build_home_view, render_home
+
+# === CONFIG ===
+DEFAULT_ROUNDS = 200
+NOW = 1_760_000_000
+
+
+def home_response() -> dict:
+    jobs = []
+    for index in range(80):
+        status = ("SCHEDULED", "PUBLISHED", "FAILED")[index % 3]
+        jobs.append(
+            {
+                "JobId": uuid7(),
+                "UserId": "bench-user",
+                "Status": status,
+                "DueAt": Decimal(NOW + 900 * index),
+                "ObjectKey": f"media/bench-user/{index:04d}.jpg",
+                "Platform": ("x", "linkedin", "facebook", "instagram")[index % 4],
+                "AccountId": f"account-{index % 3}",
+                "FinishedAt": Decimal(NOW - 60 * index),
+                "Error": "HTTP 403: token revoked" if status == "FAILED" else None,
+            },
+        )
+    return render_home(build_home_view("bench-user", jobs), NOW, "Europe/London")
+
+
+def sources_response() -> dict:
+    data = [
+        {
+            "id": f"source-{index:03d}",
+            "Name": f"The Daily Source {index}",
+            "Country": ("GB", "US", "IN", "DE")[index % 4],
+            "Language": ("en", "de")[index % 2],
+            "Feeds": [f"https://news.example.com/{index}/{section}/rss.xml" for section in ("top", "world", "business")],
+        }
+        for index in range(100)
+    ]
+    return {"data": data, "next": base64.urlsafe_b64encode(b"v1|GB#en|NAME#source-099").decode()}
+
+
+def bulk_response() -> dict:
+    results = [{"index": index, "status": "scheduled", "jobId": uuid7()} for index in range(500)]
+    return {"results": results, "scheduled": 500, "invalid": 0}
+
+
+RESPONSES = {
+    "schedule": lambda: {"jobId": uuid7()},
+    "home": home_response,
+    "sources": sources_response,
+    "bulk": bulk_response,
+}
+
+
+def median_us(function: Callable, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def previous_body(body: dict) -> str:
+    """
+    The body as the resolver built it before: RESPONSE's whole dict through Powertools' stdlib encoder
+    """
+    serializer = partial(json.dumps, separators=(",", ":"), cls=Encoder)
+    return serializer({"statusCode": 200, "headers": dict(HEADERS), "body": body})
+
+
+def bench(name: str, body: dict, rounds: int) -> bool:
+    encoders = {
+        "previous": lambda: previous_body(body),
+        "json": lambda: json_encoder("json")(body),
+        "orjson": lambda: json_encoder("orjson")(body),
+    }
+    timings = {encoder: median_us(function, rounds) for encoder, function in encoders.items()}
+    text = json_encoder("orjson")(body)
+    ok = json.loads(text) == json.loads(json_encoder("json")(body))
+    print(f"  {name:<9} {len(previous_body(body)):>7,} B previous, {len(text.encode()):>7,} B now", end="")
+    print(f" | serialize µs: previous {timings['previous']:7.1f}, json {timings['json']:7.1f}, orjson {timings['orjson']:6.1f}")
+
+    proxy = {"statusCode": 200, "headers": dict(HEADERS), "body": text, "isBase64Encoded": False}
+    decompressors = {"gzip": gzip.decompress, "br": getattr(lambda_response.brotli, "decompress", None)}
+    for encoding, decompress in decompressors.items():
+        if encoding not in lambda_response.ENCODINGS:
+            print(f"            {encoding}: not available")
+            continue
+        compress = partial(compress_response, proxy, {"Accept-Encoding": encoding})
+        compressed = compress()
+        if not compressed["isBase64Encoded"]:
+            print(f"            {encoding}: below the {lambda_response.COMPRESSION_MIN_BYTES:,} B threshold, sent as is")
+            continue
+        data = base64.b64decode(compressed["body"])
+        ok = ok and decompress(data).decode() == text and compressed["headers"]["Content-Encoding"] == encoding
+        ratio = len(data) / len(text.encode())
+        print(f"            {encoding:<4} {len(data):>7,} B ({ratio:5.1%}) in {median_us(compress, rounds):7.1f} µs")
+    return ok
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark response serialization and compression")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="Timed rounds per measurement")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    print(f"Serializing and compressing representative responses ({args.rounds} rounds, medians)...")
+    results = [bench(name, build(), args.rounds) for name, build in RESPONSES.items()]
+    passed = all(results)
+    print("✅ Responses OK" if passed else "❌ A response did not round-trip")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Checks the bulk scheduling path against a local DynamoDB stand-in and compares its latency with the single-item path.
+
+Runs against DynamoDB Local (or any compatible endpoint) when --endpoint-url is given, otherwise
+against moto's in-process mock. Both paths write through shared.schedule.ScheduleStore. A bulk add
+whose every request for one chunk is throttled must report that chunk's jobs as unwritten, not raise.
+
+Usage:
+    python .scripts/testing/bench_schedule.py [--jobs 500] [--endpoint-url http://localhost:8000]
+"""
+
+import argparse
+import contextlib
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import boto3
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "aws" / "src"))
+
+from botocore.awsrequest import AWSResponse
+from shared import dynamodb
+from shared.dynamodb import Table
+from shared.schedule import ScheduleStore
+
+# === CONFIG ===
+TABLE_NAME = "schedule-bench"
+REGION = "us-east-1"
+USER_ID = "bench-user"
+ROUNDS = 3
+
+
+def create_table(dynamodb: boto3.resource) -> boto3.resource:
+    with contextlib.suppress(dynamodb.meta.client.exceptions.ResourceNotFoundException):
+        dynamodb.Table(TABLE_NAME).delete()
+    table = dynamodb.create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}, {"AttributeName": "sk", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}, {"AttributeName": "sk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+    return table
+
+
+def data_table(dynamodb_resource: boto3.resource) -> Table:
+    # The resource's client (de)serializes values itself; bulk adds need a plain client of the same endpoint
+    client = dynamodb_resource.meta.client
+    return Table(TABLE_NAME, boto3.client("dynamodb", endpoint_url=client.meta.endpoint_url, region_name=client.meta.region_name))
+
+
+def count_jobs(table: boto3.resource) -> int:
+    count = 0
+    kwargs = {"Select": "COUNT"}
+    while True:
+        response = table.scan(**kwargs)
+        count += response["Count"]
+        if "LastEvaluatedKey" not in response:
+            return count
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def run(dynamodb_resource: boto3.resource, jobs: int) -> bool:
+    table = create_table(dynamodb_resource)
+    store = ScheduleStore(table, data_table=data_table(dynamodb_resource))
+    now = time.time()
+    entries = [(f"uploads/{USER_ID}/{index}.jpg", now + 3600 + index * 600, None) for index in range(jobs)]
+
+    single_times = []
+    bulk_times = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        for object_key, due_at, _ in entries:
+            store.add(USER_ID, object_key, due_at)
+        single_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        written, failed_ids = store.add_many(USER_ID, entries)
+        bulk_times.append(time.perf_counter() - started)
+
+    expected = 2 * ROUNDS * jobs
+    stored = count_jobs(table)
+    ids = [job["JobId"] for job in written]
+    ok = stored == expected and not failed_ids and ids == sorted(ids) and len(set(ids)) == jobs
+    single, bulk = statistics.median(single_times), statistics.median(bulk_times)
+    print(f"Jobs: {jobs}, Rounds: {ROUNDS}")
+    print(f"Single-item puts: {single * 1000:.0f} ms ({single / jobs * 1000:.2f} ms/job)")
+    print(f"BatchWriteItem:   {bulk * 1000:.0f} ms ({bulk / jobs * 1000:.2f} ms/job), {single / bulk:.1f}x faster")
+    print(f"Stored: {stored}/{expected}, Failed: {len(failed_ids)}, Ids unique and ordered: {ids == sorted(ids) and len(set(ids)) == jobs}")
+    return ok
+
+
+def check_throttled(dynamodb_resource: boto3.resource, jobs: int) -> bool:
+    """
+    Throttle every BatchWriteItem that holds the first job of a bulk add: only its chunk is unwritten
+    """
+    table = create_table(dynamodb_resource)
+    store = ScheduleStore(table, data_table=data_table(dynamodb_resource))
+    dynamodb.BASE_BACKOFF_SECONDS = 0
+    throttled = {"calls": 0, "first": None}
+
+    def throttle(params: dict, **_kwargs: object) -> tuple | None:
+        requests = json.loads(params["body"])["RequestItems"][TABLE_NAME]
+        first = requests[0]["PutRequest"]["Item"]["JobId"]["S"]
+        throttled["first"] = throttled["first"] or first
+        if first != throttled["first"]:
+            return None
+        throttled["calls"] += 1
+        error = {"Error": {"Code": "ThrottlingException", "Message": "Rate of requests exceeds the allowed throughput"}}
+        return AWSResponse("", 400, {}, None), error
+
+    events = store.data_table.client.meta.events
+    events.register("before-call.dynamodb.BatchWriteItem", throttle)
+    try:
+        entries = [(f"uploads/{USER_ID}/{index}.jpg", time.time() + 3600 + index * 600, None) for index in range(jobs)]
+        written, failed_ids = store.add_many(USER_ID, entries)
+    finally:
+        events.unregister("before-call.dynamodb.BatchWriteItem", throttle)
+
+    expected_failed = {job["JobId"] for job in written[:25]}
+    stored = count_jobs(table)
+    print(f"Throttled chunk: {len(failed_ids)} job(s) reported unwritten after {throttled['calls']} attempts, {stored} stored")
+    return failed_ids == expected_failed and stored == jobs - len(expected_failed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and benchmark bulk scheduling")
+    parser.add_argument("--jobs", type=int, default=500, help="Jobs per request")
+    parser.add_argument("--endpoint-url", help="DynamoDB Local endpoint; moto is used when omitted")
+    args = parser.parse_args()
+
+    if args.endpoint_url:
+        # DynamoDB Local accepts any credentials
+        resource = boto3.resource(
+            "dynamodb",
+            endpoint_url=args.endpoint_url,
+            region_name=REGION,
+            aws_access_key_id="local",
+            aws_secret_access_key="local",  # noqa: S106
+        )
+        passed = run(resource, args.jobs) and check_throttled(resource, args.jobs)
+    else:
+        from moto import mock_aws
+
+        with mock_aws():
+            resource = boto3.resource("dynamodb", region_name=REGION)
+            passed = run(resource, args.jobs) and check_throttled(resource, args.jobs)
+
+    sys.exit(0 if passed else 1)
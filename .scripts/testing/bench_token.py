@@ -0,0 +1,175 @@
+"""
+Micro-benchmarks token verification cold and warm.
+
+Against a local HTTP server serving the user pool's JWKS, it times:
+    * fetching the signing keys (a cold JWKSCache) against getting a cached key
+    * verify_token with cold keys (fetch + decode + signature check) and with cached keys
+    * parse_token on a ClaimsCache hit, and the ClaimsCache lookup alone
+
+and checks the results: every path gives the same claims, a token signed with an unknown key is
+refused without re-fetching the keys within the refresh interval, an access token of the same client
+is refused, and expired claims are not served.
+
+Usage:
+    python .scripts/testing/bench_token.py [--rounds 200]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(ROOT / "aws" / "src" / "fn" / "api"), str(ROOT / "aws" / "src")]
+
+# === CONFIG ===
+DEFAULT_ROUNDS = 200
+ISSUER = "https://cognito-idp.us-east-1.amazonaws.com/us-east-1_bench"
+CLIENT_ID = "bench-client"
+KEY_ID = "bench-key"
+
+
+class JWKSServer:
+    """
+    Serves a key set at /jwks.json and counts the requests
+    """
+
+    def __init__(self, jwks: dict) -> None:
+        self.body = json.dumps(jwks).encode()
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                server.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(server.body)))
+                self.end_headers()
+                self.wfile.write(server.body)
+
+            def log_message(self, *_args: object) -> None:
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/jwks.json"
+
+
+def make_key(kid: str) -> tuple[object, dict]:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public = jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key(), as_dict=True)
+    return key, {**public, "kid": kid, "alg": "RS256", "use": "sig"}
+
+
+def make_token(key: object, kid: str, expires_in: int = 3600, use: str = "id") -> str:
+    claims = {"sub": "bench", "cognito:username": "bench", "iss": ISSUER, "token_use": use}
+    # Cognito names the app client `aud` in ID tokens and `client_id` in access tokens
+    claims["aud" if use == "id" else "client_id"] = CLIENT_ID
+    return jwt.encode({**claims, "exp": int(time.time()) + expires_in}, key, algorithm="RS256", headers={"kid": kid})
+
+
+def median_us(function: Callable, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def bench(token_module: object, token: str, url: str, rounds: int) -> None:
+    jwks_cache, claims_cache = token_module.JWKSCache, token_module.ClaimsCache
+    warm_keys = jwks_cache(url)
+    warm_keys.get(KEY_ID)
+    hit_cache = claims_cache()
+    hit_cache.put(token, token_module.verify_token(token))
+    token_module.parse_token(f"Bearer {token}")
+
+    def verify_cold() -> None:
+        token_module.jwks = jwks_cache(url)
+        token_module.verify_token(token)
+
+    cases = {
+        "JWKS fetch (cold keys)": lambda: jwks_cache(url).get(KEY_ID),
+        "cached key": lambda: warm_keys.get(KEY_ID),
+        "verify_token, cold keys": verify_cold,
+        "verify_token, cached key": lambda: token_module.verify_token(token),
+        "parse_token, claims hit": lambda: token_module.parse_token(f"Bearer {token}"),
+        "ClaimsCache.get hit": lambda: hit_cache.get(token),
+    }
+    results = {name: median_us(function, rounds) for name, function in cases.items()}
+    token_module.jwks = warm_keys
+    slowest = results["verify_token, cold keys"]
+    for name, timing in results.items():
+        print(f"  {name:<26} {timing:10.1f} µs ({slowest / timing:8.1f}x faster than a cold verify)")
+
+
+def check(token_module: object, token: str, server: JWKSServer, key: object) -> bool:
+    expected = jwt.decode(token, options={"verify_signature": False})
+    token_module.claims_cache.clear()
+    same = token_module.verify_token(token) == token_module.parse_token(token) == token_module.parse_token(f"Bearer {token}") == expected
+
+    forged_key, _ = make_key("forged-key")
+    before = server.requests
+    refused = 0
+    for _ in range(5):
+        try:
+            token_module.parse_token(make_token(forged_key, "forged-key"))
+        except token_module.TokenError:
+            refused += 1
+    # The warm cache was fetched moments ago, so no forged kid may trigger another fetch
+    fetches = server.requests - before
+
+    try:
+        token_module.parse_token(make_token(key, KEY_ID, use="access"))
+        access_refused = False
+    except token_module.TokenError:
+        access_refused = True
+
+    signing_key = token_module.jwks.get(KEY_ID)
+    expired = {**expected, "exp": int(time.time()) - 1}
+    token_module.claims_cache.put("expired-token", expired)
+    expired_served = token_module.claims_cache.get("expired-token") is not None
+    print(f"  same claims on every path: {same}, forged tokens refused: {refused}/5 with {fetches} JWKS fetch(es)", end="")
+    print(f", access token refused: {access_refused}, expired claims served: {expired_served}")
+    return same and refused == 5 and fetches == 0 and access_refused and not expired_served and signing_key is not None  # noqa: PLR2004
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Micro-benchmark token verification cold and warm")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="Timed rounds per measurement")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    key, public = make_key(KEY_ID)
+    server = JWKSServer({"keys": [public]})
+    os.environ.update({"JWKS_URL": server.url, "TOKEN_ISSUER": ISSUER, "USER_POOL_CLIENT_ID": CLIENT_ID})
+
+    from lib import token as token_module  # noqa: PLC0415
+
+    token = make_token(key, KEY_ID)
+    print(f"Verifying an RS256 ID token ({args.rounds} rounds, medians)...")
+    bench(token_module, token, server.url, args.rounds)
+    print("Checking the caches...")
+    passed = check(token_module, token, server, key)
+    print("✅ Token verification OK" if passed else "❌ Token verification check failed")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmarks bulk UUIDv7 generation against one uuid7() call per ID.
+
+Compares IDs per second for:
+    * uuid7(timestamp): the random, per-call path that took a timestamp (the original uuid7)
+    * uuid7(): one monotonic ID per call
+    * uuid7_batch(n): n monotonic IDs per call, as strings and as raw 16-byte values
+
+and checks the IDs: version 7 and RFC variant bits set, unique, and strictly increasing within a
+batch, across consecutive batches and across threads generating concurrently.
+
+Usage:
+    python .scripts/testing/bench_uuid.py [--count 100000] [--batch 500]
+"""
+
+import argparse
+import sys
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from uuid import UUID
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "aws" / "src"))
+
+from shared.uuid import UUID7Generator, uuid7, uuid7_batch
+
+# === CONFIG ===
+DEFAULT_COUNT = 100_000
+DEFAULT_BATCH = 500
+THREADS = 8
+
+
+def rate(generate: Callable[[], list], count: int) -> float:
+    """
+    IDs per second of a function that generates a list of IDs, over at least `count` IDs
+    """
+    generated = 0
+    started = time.perf_counter()
+    while generated < count:
+        generated += len(generate())
+    return generated / (time.perf_counter() - started)
+
+
+def bench(count: int, batch: int) -> None:
+    now = int(time.time())
+    ways = {
+        "uuid7(timestamp)": lambda: [uuid7(now)],
+        "uuid7()": lambda: [uuid7()],
+        f"uuid7_batch({batch})": lambda: uuid7_batch(batch),
+        f"uuid7_batch({batch}, bytes)": lambda: uuid7_batch(batch, as_bytes=True),
+    }
+    baseline = None
+    for name, generate in ways.items():
+        ids_per_second = rate(generate, count)
+        baseline = baseline or ids_per_second
+        print(f"  {name:<26} {ids_per_second:>12,.0f} IDs/s ({ids_per_second / baseline:5.1f}x)")
+
+
+def well_formed(ids: list[str]) -> bool:
+    parsed = [UUID(value) for value in ids]
+    return all(value.version == 7 and value.variant == "specified in RFC 4122" for value in parsed)  # noqa: PLR2004
+
+
+def check_batches(batch: int) -> bool:
+    strings = [value for _ in range(20) for value in uuid7_batch(batch)]
+    raw = [value for _ in range(20) for value in uuid7_batch(batch, as_bytes=True)]
+    # A batch larger than the counter holds in one millisecond carries over into the next ones
+    large = UUID7Generator().generate(20_000)
+    ok = (
+        strings == sorted(strings)
+        and len(set(strings)) == len(strings)
+        and raw == sorted(raw)
+        and len(set(raw)) == len(raw)
+        and all(len(value) == 16 for value in raw)  # noqa: PLR2004
+        and large == sorted(large)
+        and len(set(large)) == len(large)
+        and well_formed(strings)
+        and well_formed(large)
+    )
+    print(f"  {len(strings):,} IDs in batches, {len(raw):,} raw, 20,000 in one batch: ordered, unique and version 7: {ok}")
+    return ok
+
+
+def check_threads(batch: int) -> bool:
+    """
+    Threads sharing the generator get disjoint batches; each thread's own IDs stay in order
+    """
+    results: list[list[str]] = [[] for _ in range(THREADS)]
+
+    def work(index: int) -> None:
+        for _ in range(50):
+            results[index].extend(uuid7_batch(batch))
+
+    threads = [threading.Thread(target=work, args=(index,)) for index in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    every = [value for result in results for value in result]
+    ok = len(set(every)) == len(every) and all(result == sorted(result) for result in results)
+    print(f"  {THREADS} threads, {len(every):,} IDs: unique and ordered per thread: {ok}")
+    return ok
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark bulk UUIDv7 generation against uuid7()")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help="IDs generated per measurement")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="IDs per uuid7_batch call")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    print(f"Generating {args.count:,} IDs per way...")
+    bench(args.count, args.batch)
+    print("Checking the IDs...")
+    passed = check_batches(args.batch) and check_threads(args.batch)
+    print("✅ UUIDv7 generation OK" if passed else "❌ UUIDv7s were out of order, duplicated or malformed")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
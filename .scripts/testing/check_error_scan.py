@@ -0,0 +1,250 @@
+"""
+Checks the scans of check_lambda_errors.py against a fake CloudWatch Logs client.
+
+The fake holds generated error events for a few log groups and answers filter_log_events pages and
+Logs Insights queries from them, so no AWS account is needed:
+    * filter backend: every error of every group is counted across time slices and workers, each
+      group keeps at most MAX_EVENTS_PER_GROUP samples, and a group that disappears is skipped
+    * insights backend: counts and fingerprint counts are exact for a noisy group and a quiet one,
+      and the noisy group does not crowd out the quiet group's samples (one per distinct message)
+    * incremental: a second run, with the state saved and loaded in between, only scans from the
+      cursor (less the ingestion lag), skips the events it rescans there by ID, counts a late event,
+      prunes what left the window and forgets a deleted log group; it matches a full scan
+    * --incremental is refused with --backend insights
+
+Usage:
+    python .scripts/testing/check_error_scan.py
+"""
+
+import re
+import sys
+import tempfile
+import threading
+from collections import Counter
+from datetime import UTC, datetime
+from itertools import count
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "aws"))
+
+import check_lambda_errors as scanner
+
+# === CONFIG ===
+ACCOUNT_ID = "123456789012"
+PREFIX = "/aws/lambda/SnapNews-"
+NOW_MS = 1_760_000_000_000
+HOUR_MS = 60 * 60 * 1000
+PAGE_SIZE = 50
+
+
+class ResourceNotFoundError(Exception):
+    pass
+
+
+class FakeLogs:
+    """
+    A CloudWatch Logs client over in-memory events: filter_log_events pages and Logs Insights queries
+    """
+
+    exceptions = type("Exceptions", (), {"ResourceNotFoundException": ResourceNotFoundError})
+
+    def __init__(self, events: dict[str, list[dict]]) -> None:
+        self.events = events
+        self.filter_calls: list[tuple[str, int, int]] = []
+        self.queries: dict[str, tuple[list[str], int, int, str]] = {}
+        self.polls = Counter()
+        self._ids = count()
+        self._lock = threading.Lock()
+
+    def get_paginator(self, operation: str) -> "FakeLogs":
+        assert operation == "filter_log_events"  # noqa: S101
+        return self
+
+    def paginate(self, logGroupName: str, startTime: int, endTime: int, **_kwargs: object) -> list[dict]:  # noqa: N803
+        with self._lock:
+            self.filter_calls.append((logGroupName, startTime, endTime))
+        if logGroupName not in self.events:
+            raise ResourceNotFoundError(logGroupName)
+        matches = [
+            event for event in self.events[logGroupName] if startTime <= event["timestamp"] <= endTime and "ERROR" in event["message"]
+        ]
+        return [{"events": matches[offset : offset + PAGE_SIZE]} for offset in range(0, len(matches), PAGE_SIZE)]
+
+    def start_query(self, logGroupNames: list[str], startTime: int, endTime: int, queryString: str) -> dict:  # noqa: N803
+        query_id = f"query-{next(self._ids)}"
+        self.queries[query_id] = (logGroupNames, startTime * 1000, endTime * 1000 + 999, queryString)
+        return {"queryId": query_id}
+
+    def get_query_results(self, queryId: str) -> dict:  # noqa: N803
+        # The first poll finds the query still running
+        self.polls[queryId] += 1
+        if self.polls[queryId] == 1:
+            return {"status": "Running"}
+        groups, start_ms, end_ms, query = self.queries[queryId]
+        matches = [
+            (group, event)
+            for group in groups
+            for event in self.events.get(group, [])
+            if start_ms <= event["timestamp"] <= end_ms and re.search(scanner.SEARCH_TERMS[0], event["message"])
+        ]
+        rows = self._counts(matches) if "bin(1h)" in query else self._patterns(matches)
+        return {"status": "Complete", "results": [[{"field": name, "value": str(value)} for name, value in row.items()] for row in rows]}
+
+    @staticmethod
+    def _counts(matches: list[tuple[str, dict]]) -> list[dict]:
+        counts = Counter((group, event["timestamp"] - event["timestamp"] % HOUR_MS) for group, event in matches)
+        return [{"@log": f"{ACCOUNT_ID}:{group}", "hour": insights_ts(hour), "errors": errors} for (group, hour), errors in counts.items()]
+
+    @staticmethod
+    def _patterns(matches: list[tuple[str, dict]]) -> list[dict]:
+        patterns: dict[tuple[str, str], list[int]] = {}
+        for group, event in matches:
+            error = event["message"][event["message"].index(scanner.SEARCH_TERMS[0]) :]
+            patterns.setdefault((group, error), []).append(event["timestamp"])
+        rows = [
+            {
+                "@log": f"{ACCOUNT_ID}:{group}",
+                "error": error,
+                "errors": len(timestamps),
+                "first_seen": insights_ts(min(timestamps)),
+                "last_seen": insights_ts(max(timestamps)),
+            }
+            for (group, error), timestamps in patterns.items()
+        ]
+        return sorted(rows, key=lambda row: -row["errors"])[: scanner.INSIGHTS_MAX_ROWS]
+
+
+def insights_ts(timestamp_ms: int) -> str:
+    return datetime.fromtimestamp(timestamp_ms / 1000, UTC).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def make_events(group: str, errors: int, start_ms: int, end_ms: int, template: str) -> list[dict]:
+    """
+    `errors` error events spread over the window, with an INFO line between each, which must not be counted
+    """
+    step = (end_ms - start_ms) // (2 * errors + 1)
+    events = []
+    for index in range(errors):
+        timestamp = start_ms + step * (2 * index + 1)
+        events.append({"eventId": f"{group}-{index}", "timestamp": timestamp, "message": template.format(index=index)})
+        events.append({"eventId": f"{group}-info-{index}", "timestamp": timestamp + step, "message": f"INFO request {index} done"})
+    return events
+
+
+def fingerprint_counts(results: dict[str, scanner.GroupStats]) -> dict[str, int]:
+    return {group: sum(entry["count"] for _, entry in stats.fingerprints.top(100)) for group, stats in results.items()}
+
+
+def check_filter_scan() -> bool:
+    start_ms = NOW_MS - 24 * HOUR_MS
+    events = {
+        f"{PREFIX}Api": make_events(f"{PREFIX}Api", 240, start_ms, NOW_MS, "[ERROR] Timeout after {index} ms calling DynamoDB"),
+        f"{PREFIX}Media": make_events(f"{PREFIX}Media", 7, start_ms, NOW_MS, "ERROR Invalid media {index}.jpg"),
+    }
+    logs = FakeLogs(events)
+    groups = [*events, f"{PREFIX}Deleted"]
+    results = scanner.scan_log_groups(logs, groups, start_ms, NOW_MS, workers=4, slices=6)
+    counts = {group: stats.count for group, stats in results.items()}
+    samples = {group: len(stats.samples()) for group, stats in results.items()}
+    expected = {group: len(group_events) // 2 for group, group_events in events.items()}
+    print(f"  filter: counts {counts}, samples {samples}, {len(logs.filter_calls)} filter calls")
+    return (
+        counts == expected
+        and fingerprint_counts(results) == expected
+        and samples == {group: min(errors, scanner.MAX_EVENTS_PER_GROUP) for group, errors in expected.items()}
+        and len(logs.filter_calls) == 3 * 6
+    )
+
+
+def check_insights_scan() -> bool:
+    start_ms = NOW_MS - 24 * HOUR_MS
+    noisy, quiet = f"{PREFIX}Api", f"{PREFIX}Publisher"
+    events = {
+        noisy: make_events(noisy, 500, start_ms, NOW_MS, "[ERROR] Timeout after {index} ms calling DynamoDB"),
+        quiet: make_events(quiet, 3, start_ms, NOW_MS, "ERROR Token revoked for account {index}")
+        + make_events(quiet, 2, start_ms, NOW_MS, "ERROR Unsupported platform"),
+    }
+    scanner.INSIGHTS_POLL_SECONDS = 0
+    logs = FakeLogs(events)
+    results = scanner.insights_scan(logs, list(events), start_ms, NOW_MS)
+    counts = {group: stats.count for group, stats in results.items()}
+    patterns = {group: {template: entry["count"] for template, entry in stats.fingerprints.top(10)} for group, stats in results.items()}
+    samples = {group: len(stats.samples()) for group, stats in results.items()}
+    print(f"  insights: counts {counts}, samples {samples}, patterns {patterns[quiet]}")
+    return (
+        counts == {noisy: 500, quiet: 5}
+        and fingerprint_counts(results) == counts
+        and sorted(patterns[quiet].values()) == [2, 3]
+        # One sample per distinct message: the quiet group's four all show
+        and samples[quiet] == 4  # noqa: PLR2004
+        and samples[noisy] == scanner.MAX_EVENTS_PER_GROUP
+    )
+
+
+def check_incremental() -> bool:
+    api, media = f"{PREFIX}Api", f"{PREFIX}Media"
+    first_end = NOW_MS
+    second_end = first_end + 2 * HOUR_MS
+    window = 24 * HOUR_MS
+    events = {
+        api: make_events(api, 240, first_end - window, first_end, "[ERROR] Timeout after {index} ms calling DynamoDB"),
+        media: make_events(media, 7, first_end - window, first_end, "ERROR Invalid media {index}.jpg"),
+    }
+    # Within the ingestion lag of the first run's end: the second run scans it again and must skip it
+    events[api].append({"eventId": "boundary", "timestamp": first_end - 30_000, "message": "[ERROR] Connection reset"})
+    logs = FakeLogs(events)
+    state_file = Path(tempfile.mkdtemp()) / "state.json"
+
+    state = scanner.load_state(state_file)
+    first = scanner.incremental_scan(logs, [api, media], first_end - window, first_end, state, workers=4, slices=3)
+    scanner.save_state(state_file, state)
+    first_count = first[api].count
+
+    # New errors after the first run, and one logged before its end but only ingested since
+    events[api] += make_events(api, 30, first_end, second_end, "[ERROR] Throttled {index} times")
+    events[api].append({"eventId": "late", "timestamp": first_end - 60_000, "message": "[ERROR] Late event"})
+    logs.filter_calls.clear()
+
+    state = scanner.load_state(state_file)
+    second = scanner.incremental_scan(logs, [api], second_end - window, second_end, state, workers=4, slices=3)
+    scanner.save_state(state_file, state)
+
+    scanned_from = min(start for group, start, _ in logs.filter_calls if group == api)
+    seen = scanner.load_state(state_file)["groups"][api]["seen"]
+    # Counts are kept per hour, so the second run keeps the whole hour the window starts in
+    first_hour = second_end - window - (second_end - window) % HOUR_MS
+    kept = [event for event in events[api] if "ERROR" in event["message"] and event["timestamp"] >= first_hour]
+    full = scanner.scan_log_groups(logs, [api], first_hour, second_end)
+    print(f"  incremental: {first_count} then {second[api].count} errors (full scan {full[api].count}), ", end="")
+    print(f"rescanned from cursor - lag: {scanned_from == first_end - scanner.INGESTION_LAG_MS}, ", end="")
+    print(f"{len(seen)} seen ID(s) kept, groups {sorted(state['groups'])}")
+    return (
+        first_count == 241  # noqa: PLR2004
+        and second[api].count == len(kept) == full[api].count
+        and scanned_from == first_end - scanner.INGESTION_LAG_MS
+        and all(timestamp >= second_end - scanner.INGESTION_LAG_MS for timestamp in seen.values())
+        and set(state["groups"]) == {api}
+    )
+
+
+def check_arguments() -> bool:
+    try:
+        scanner.parse_args(["--incremental", "--backend", "insights"])
+    except SystemExit as e:
+        refused = e.code == 2  # noqa: PLR2004
+    else:
+        refused = False
+    print(f"  --incremental with --backend insights refused: {refused}")
+    return refused and scanner.parse_args(["--incremental"]).incremental
+
+
+def main() -> None:
+    print("Scanning fake log groups...")
+    results = [check_filter_scan(), check_insights_scan(), check_incremental(), check_arguments()]
+    passed = all(results)
+    print("✅ Error scans OK" if passed else "❌ An error scan miscounted")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Checks that the incrementally maintained home views match a rebuild from the job records.
+
+Runs against moto's DynamoDB with a stream: schedules jobs (single and bulk), moves some through
+dispatch to published or failed and deletes one as the TTL would, then feeds the stream records
+to the views handler twice (as a redelivered batch would be) and compares every view with
+check_home_views.check. The views keep only the next UPCOMING_LIMIT upcoming jobs here, so bob's
+view drops some and has to refill itself as its kept jobs are published, and still counts them all.
+Batches only adding jobs past the kept ones must not refill it: they move its Later count, once per
+record even when the batch is retried.
+Finally corrupts a view and checks that the checker finds and fixes it.
+
+Usage:
+    python .scripts/testing/check_home_view.py
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import boto3
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(ROOT / "aws" / "src" / "fn" / "views"), str(ROOT / "aws" / "src"), str(ROOT / ".scripts" / "aws")]
+
+# === CONFIG ===
+TABLE_NAME = "views-check"
+STREAM_BATCH_SIZE = 25
+UPCOMING_LIMIT = 20
+
+os.environ.update({"TABLE_NAME": TABLE_NAME, "POWERTOOLS_SERVICE_NAME": "check-home-view"})
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+
+def create_table() -> object:
+    table = boto3.resource("dynamodb").create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}, {"AttributeName": "sk", "KeyType": "RANGE"}],
+        AttributeDefinitions=[
+            {"AttributeName": "pk", "AttributeType": "S"},
+            {"AttributeName": "sk", "AttributeType": "S"},
+            {"AttributeName": "UserId", "AttributeType": "S"},
+            {"AttributeName": "DueAt", "AttributeType": "N"},
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": "UserJobs",
+                "KeySchema": [{"AttributeName": "UserId", "KeyType": "HASH"}, {"AttributeName": "DueAt", "KeyType": "RANGE"}],
+                "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["JobId", "Status", "ObjectKey", "Platform", "AccountId"]},
+            },
+        ],
+        BillingMode="PAY_PER_REQUEST",
+        StreamSpecification={"StreamEnabled": True, "StreamViewType": "NEW_AND_OLD_IMAGES"},
+    )
+    table.wait_until_exists()
+    return table
+
+
+def stream_records(table: object) -> list[dict]:
+    streams = boto3.client("dynamodbstreams")
+    records = []
+    for shard in streams.describe_stream(StreamArn=table.latest_stream_arn)["StreamDescription"]["Shards"]:
+        iterator = streams.get_shard_iterator(StreamArn=table.latest_stream_arn, ShardId=shard["ShardId"], ShardIteratorType="TRIM_HORIZON")
+        response = streams.get_records(ShardIterator=iterator["ShardIterator"])
+        records.extend(response["Records"])
+    # The handler gets the records as JSON, like Lambda delivers them
+    return json.loads(json.dumps(records, default=str))
+
+
+def make_jobs(table: object) -> None:
+    from shared.schedule import FAILED, PUBLISHED, ScheduleStore  # noqa: PLC0415
+
+    store = ScheduleStore(table)
+    now = time.time()
+    for index in range(3):
+        store.add("alice", f"media/alice/{index}", now + 3600 * (index + 1), {"Platform": "x", "AccountId": "a1"})
+    jobs, _ = store.add_many("bob", [(f"media/bob/{index}", now + 600 * index, {"Platform": "linkedin"}) for index in range(60)])
+
+    for job in jobs[:12]:
+        store.claim(job, "check", now)
+        store.complete(job, "check", now)
+    for job in jobs[:8]:
+        store.finish(job, PUBLISHED, now)
+    for job in jobs[8:10]:
+        store.finish(job, FAILED, now, "HTTP 403: token revoked")
+    table.delete_item(Key={"pk": jobs[0]["pk"], "sk": jobs[0]["sk"]})
+
+
+def run() -> bool:
+    from check_home_views import check  # noqa: PLC0415
+    from shared import views  # noqa: PLC0415
+    from shared.views import home_view_key, render_home  # noqa: PLC0415
+
+    import app  # noqa: PLC0415
+
+    views.HOME_VIEW_UPCOMING_LIMIT = UPCOMING_LIMIT
+    refills = []
+    refill = views.HomeViewStore._refill  # noqa: SLF001
+
+    def counted_refill(store: object, user_id: str, *args: object) -> None:
+        refills.append(user_id)
+        refill(store, user_id, *args)
+
+    views.HomeViewStore._refill = counted_refill  # noqa: SLF001
+    table = create_table()
+    make_jobs(table)
+    records = stream_records(table)
+    print(f"Stream: {len(records)} records")
+
+    for delivery in ("first", "redelivered"):
+        refills.clear()
+        for start in range(0, len(records), STREAM_BATCH_SIZE):
+            result = app.main({"Records": records[start : start + STREAM_BATCH_SIZE]}, None)
+            if result["batchItemFailures"]:
+                print(f"  {delivery} delivery reported failures: {result['batchItemFailures'][:3]}")
+                return False
+        report = check(table, segments=4)
+        batches = -(-len(records) // STREAM_BATCH_SIZE)
+        print(f"  after {delivery} delivery: {report or 'consistent'}, {len(refills)} refill(s) over {batches} batches")
+        # One when bob's view outgrows its limit and one when its kept jobs are published, not one per batch
+        if report or len(refills) > 2:  # noqa: PLR2004
+            return False
+
+    # A retried batch of jobs added past bob's kept ones must not count them in his Later again
+    refills.clear()
+    app.main({"Records": records[STREAM_BATCH_SIZE : 2 * STREAM_BATCH_SIZE]}, None)
+    report = check(table, segments=4)
+    print(f"  after retrying a batch of added jobs: {report or 'consistent'}, {len(refills)} refill(s)")
+    if report or refills:
+        return False
+
+    bob = table.get_item(Key=home_view_key("bob"))["Item"]
+    home = render_home(bob, time.time())
+    print(f"  bob's home: scheduled {home['scheduled']}, published {home['published']}, failed {home['failed']}, days {home['days'][:2]}")
+    print(f"  bob's view: {len(bob['Upcoming'])} upcoming entries kept, {bob['Later']} later")
+    ok = (home["scheduled"], home["published"], home["failed"]) == (50, 7, 2) and (len(bob["Upcoming"]), bob["Later"]) == (20, 30)
+
+    view = table.get_item(Key=home_view_key("alice"))["Item"]
+    job_id = next(iter(view["Upcoming"]))
+    table.update_item(Key=home_view_key("alice"), UpdateExpression="REMOVE Upcoming.#job", ExpressionAttributeNames={"#job": job_id})
+    found = check(table, segments=4, fix=True)
+    print(f"  after corrupting alice's view: {found}, then {check(table, segments=4) or 'consistent'}")
+    return ok and found == {"alice": {"missing": 1, "extra": 0, "stale": 0, "fixed": True}} and not check(table, segments=4)
+
+
+if __name__ == "__main__":
+    from moto import mock_aws
+
+    with mock_aws():
+        passed = run()
+
+    print("✅ Home views OK" if passed else "❌ Home view check failed")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,154 @@
+"""
+Checks that the idempotency decorator runs each mutating request once, however often it is retried.
+
+Runs against moto's DynamoDB with a small resolver whose routes count their calls:
+    * parallel retries of one request run the route once; the others get its response (or a 409
+      if they gave up waiting for it)
+    * reusing an Idempotency-Key for a different body gets a 422
+    * a route that raised releases its key, so the retry runs it again
+    * retrying POST /v1/schedule on the api handler schedules a single job
+
+Usage:
+    python .scripts/testing/check_idempotency.py
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import boto3
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(ROOT / "aws" / "src" / "fn" / "api"), str(ROOT / "aws" / "src")]
+
+# === CONFIG ===
+TABLE_NAME = "idempotency-check"
+PARALLEL_RETRIES = 20
+
+os.environ.update({"TABLE_NAME": TABLE_NAME, "POWERTOOLS_SERVICE_NAME": "check-idempotency"})
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+
+def create_table() -> object:
+    table = boto3.resource("dynamodb").create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}, {"AttributeName": "sk", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}, {"AttributeName": "sk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+    return table
+
+
+def make_event(path: str, body: dict, key: str | None = None) -> dict:
+    headers = {"Authorization": "Bearer token", "Content-Type": "application/json"}
+    if key:
+        headers["Idempotency-Key"] = key
+    return {
+        "resource": path,
+        "path": path,
+        "httpMethod": "POST",
+        "headers": headers,
+        "multiValueHeaders": {},
+        "queryStringParameters": None,
+        "requestContext": {"httpMethod": "POST", "resourcePath": path, "stage": "test"},
+        "body": json.dumps(body),
+        "isBase64Encoded": False,
+    }
+
+
+def make_app() -> tuple[object, dict]:
+    """
+    A resolver with a slow route, so duplicates overlap, and a route that fails on its first call
+    """
+    from aws_lambda_powertools.event_handler import APIGatewayRestResolver  # noqa: PLC0415
+    from aws_lambda_powertools.event_handler.exceptions import ServiceError  # noqa: PLC0415
+    from shared.idempotency import idempotent  # noqa: PLC0415
+
+    app = APIGatewayRestResolver()
+    calls = {"slow": 0, "flaky": 0}
+    lock = threading.Lock()
+
+    @app.post("/slow")
+    @idempotent(app, TABLE_NAME)
+    def slow() -> dict:
+        with lock:
+            calls["slow"] += 1
+        time.sleep(0.5)
+        return {"call": calls["slow"], "body": app.current_event.json_body}
+
+    @app.post("/flaky")
+    @idempotent(app, TABLE_NAME)
+    def flaky() -> dict:
+        calls["flaky"] += 1
+        if calls["flaky"] == 1:
+            raise ServiceError(503, "Try again")
+        return {"call": calls["flaky"]}
+
+    return app, calls
+
+
+def check_parallel_retries(app: object, calls: dict) -> bool:
+    event = make_event("/slow", {"text": "hello", "at": 1})
+    # The same JSON body with its keys in another order is the same request
+    reordered = {**event, "body": json.dumps({"at": 1, "text": "hello"})}
+    barrier = threading.Barrier(PARALLEL_RETRIES)
+
+    def send(index: int) -> dict:
+        barrier.wait()
+        return app.resolve(reordered if index % 2 else event, None)
+
+    with ThreadPoolExecutor(max_workers=PARALLEL_RETRIES) as executor:
+        responses = list(executor.map(send, range(PARALLEL_RETRIES)))
+    statuses = sorted(response["statusCode"] for response in responses)
+    bodies = {response["body"] for response in responses if response["statusCode"] == 200}  # noqa: PLR2004
+    print(f"  {PARALLEL_RETRIES} parallel retries: route ran {calls['slow']} time(s), statuses {set(statuses)}, bodies {len(bodies)}")
+    return calls["slow"] == 1 and statuses.count(200) >= 1 and set(statuses) <= {200, 409} and len(bodies) == 1
+
+
+def check_key_reuse(app: object) -> bool:
+    first = app.resolve(make_event("/slow", {"text": "one"}, key="client-key"), None)
+    again = app.resolve(make_event("/slow", {"text": "one"}, key="client-key"), None)
+    other = app.resolve(make_event("/slow", {"text": "two"}, key="client-key"), None)
+    print(f"  Idempotency-Key reuse: {first['statusCode']}, repeat {again['statusCode']}, other body {other['statusCode']}")
+    return (first["statusCode"], again["statusCode"], other["statusCode"]) == (200, 200, 422) and first["body"] == again["body"]
+
+
+def check_failure_released(app: object, calls: dict) -> bool:
+    event = make_event("/flaky", {"text": "flaky"})
+    statuses = [app.resolve(event, None)["statusCode"] for _ in range(3)]
+    print(f"  failing route: statuses {statuses}, route ran {calls['flaky']} time(s)")
+    return statuses == [503, 200, 200] and calls["flaky"] == 2  # noqa: PLR2004
+
+
+def check_schedule(table: object) -> bool:
+    import app as api  # noqa: PLC0415
+
+    api.parse_token = lambda _header: {"cognito:username": "alice"}
+    event = make_event("/v1/schedule", {"objectKey": "media/alice/photo.jpg", "dueAt": int(time.time()) + 3600})
+    responses = [api.main(event, None) for _ in range(3)]
+    jobs = [item for item in table.scan()["Items"] if item["sk"].startswith("JOB#")]
+    job_ids = {json.loads(response["body"])["jobId"] for response in responses if response["statusCode"] == 200}  # noqa: PLR2004
+    print(f"  POST /v1/schedule retried 3 times: statuses {[response['statusCode'] for response in responses]}, {len(jobs)} job(s)")
+    return len(jobs) == 1 and job_ids == {jobs[0]["JobId"]}
+
+
+def run() -> bool:
+    table = create_table()
+    app, calls = make_app()
+    results = [check_parallel_retries(app, calls), check_key_reuse(app), check_failure_released(app, calls), check_schedule(table)]
+    return all(results)
+
+
+if __name__ == "__main__":
+    from moto import mock_aws
+
+    with mock_aws():
+        passed = run()
+
+    print("✅ Idempotency OK" if passed else "❌ Idempotency check failed")
+    sys.exit(0 if passed else 1)
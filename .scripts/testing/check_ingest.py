@@ -0,0 +1,246 @@
+"""
+Checks the feed ingestion handler against a local server of fixture feeds.
+
+The server answers conditional GETs like a publisher's site does: an If-None-Match or
+If-Modified-Since that still matches gets a 304 and no body. Against moto's DynamoDB, the handler is
+run over five cycles:
+    * first: every feed is fetched, and each entry is written once, whether it is repeated within
+      a feed (same GUID) or shared by two feeds of a source, while entries of another source with the
+      same GUIDs are written as articles of their own
+    * second: nothing changed, so every feed that has validators costs a 304 and nothing is written
+    * third: two entries were added to one feed, so only that feed is read and only they are written
+    * fourth: two more entries are added to another feed while every write is throttled, so neither
+      they nor that feed's state are written
+    * fifth: writes go through again, and the feed whose state was kept is read and its two entries
+      written
+
+A feed that fails (HTTP 500) is reported every cycle without stopping the others.
+
+Usage:
+    python .scripts/testing/check_ingest.py [--entries 60]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import threading
+from email.utils import formatdate
+from pathlib import Path
+
+import boto3
+from aiohttp import web
+from botocore.awsrequest import AWSResponse
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(ROOT / "aws" / "src" / "fn" / "ingest"), str(ROOT / "aws" / "src")]
+
+# === CONFIG ===
+TABLE_NAME = "ingest-check"
+DEFAULT_ENTRIES = 60
+BRIEFS = 5
+NOW = 1_760_000_000
+
+os.environ.update({"TABLE_NAME": TABLE_NAME, "POWERTOOLS_SERVICE_NAME": "check-ingest"})
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+
+def rss(title: str, items: list[dict]) -> str:
+    entries = "".join(
+        f"<item><title>{item['title']}</title><link>{item['link']}</link>"
+        + (f"<guid>{item['guid']}</guid>" if item.get("guid") else "")
+        + f"<pubDate>{formatdate(item['at'])}</pubDate><description>{item['title']} in full</description></item>"
+        for item in items
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>{title}</title>{entries}</channel></rss>'
+
+
+def atom(title: str, items: list[dict]) -> str:
+    entries = "".join(
+        f"<entry><id>{item['guid']}</id><title>{item['title']}</title>"
+        f'<link rel="alternate" href="{item["link"]}"/><link rel="enclosure" href="{item["link"]}.jpg"/>'
+        f"<updated>2025-10-09T09:{index % 60:02d}:00Z</updated><summary>{item['title']} in full</summary></entry>"
+        for index, item in enumerate(items)
+    )
+    return f'<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom"><title>{title}</title>{entries}</feed>'
+
+
+def item(feed: str, index: int, guid: bool = True) -> dict:  # noqa: FBT001, FBT002
+    link = f"https://news.example.com/{feed}/{index}"
+    return {"title": f"{feed} story {index}", "link": link, "guid": f"urn:{feed}:{index}" if guid else None, "at": NOW - 60 * index}
+
+
+class FeedServer:
+    """
+    Serves the fixture feeds: /world (RSS, ETag) repeats an entry, /tech (RSS, ETag) shares one
+    with /world and has entries with a link and no GUID, /science (Atom) has a Last-Modified only,
+    /briefs (RSS, ETag) of another source reuses GUIDs of /tech, and /broken fails
+    """
+
+    def __init__(self, entries: int) -> None:
+        self.items = {
+            "world": [item("world", index) for index in range(entries)],
+            "tech": [item("tech", index, guid=index % 2 == 0) for index in range(entries)] + [item("world", 0)],
+            "science": [item("science", index) for index in range(entries)],
+            "briefs": [{**item("briefs", index), "guid": f"urn:tech:{2 * index}"} for index in range(BRIEFS)],
+        }
+        self.items["world"].insert(1, self.items["world"][0])
+        self.modified = dict.fromkeys(self.items, NOW)
+        self.statuses: list[int] = []
+        self.sent = 0
+        self.full_size = 0
+
+    def add(self, feed: str, count: int) -> None:
+        start = len(self.items[feed])
+        self.items[feed][:0] = [item(feed, start + index) for index in range(count)]
+        self.modified[feed] += 60
+
+    def body(self, feed: str) -> bytes:
+        build = atom if feed == "science" else rss
+        return build(feed.title(), self.items[feed]).encode()
+
+    async def get(self, request: web.Request) -> web.Response:
+        feed = request.match_info["feed"]
+        if feed not in self.items:
+            self.statuses.append(500)
+            return web.Response(status=500, text="Internal error")
+        body = self.body(feed)
+        self.full_size += len(body)
+        last_modified = formatdate(self.modified[feed], usegmt=True)
+        headers = {"Last-Modified": last_modified}
+        if feed != "science":
+            headers["ETag"] = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        unchanged = (
+            request.headers.get("If-None-Match") == headers["ETag"]
+            if "ETag" in headers and "If-None-Match" in request.headers
+            else request.headers.get("If-Modified-Since") == last_modified
+        )
+        if unchanged:
+            self.statuses.append(304)
+            return web.Response(status=304, headers=headers)
+        self.statuses.append(200)
+        self.sent += len(body)
+        return web.Response(body=body, headers=headers, content_type="application/rss+xml")
+
+    def reset(self) -> None:
+        self.statuses.clear()
+        self.sent = self.full_size = 0
+
+
+def start_server(server: FeedServer) -> str:
+    loop = asyncio.new_event_loop()
+    application = web.Application()
+    application.router.add_get("/{feed}.xml", server.get)
+    runner = web.AppRunner(application)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]  # noqa: SLF001
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+
+def create_table() -> object:
+    table = boto3.resource("dynamodb").create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}, {"AttributeName": "sk", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}, {"AttributeName": "sk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+    return table
+
+
+def seed(table: object, url: str) -> None:
+    table.put_item(Item={"pk": "APP#DATA", "sk": "SOURCES", "Partitions": {"SOURCE#GB#en", "SOURCE#US#en"}, "Version": 1})
+    table.put_item(
+        Item={
+            "pk": "SOURCE#GB#en",
+            "sk": "NAME#Daily",
+            "Feeds": {"WORLD": f"{url}/world.xml", "TECH": [f"{url}/tech.xml", f"{url}/broken.xml"]},
+        },
+    )
+    # The same world feed under another source is fetched once
+    table.put_item(
+        Item={
+            "pk": "SOURCE#US#en",
+            "sk": "NAME#Wire",
+            "Feeds": {"TOP": f"{url}/world.xml", "SCIENCE": f"{url}/science.xml", "BRIEFS": f"{url}/briefs.xml"},
+        },
+    )
+
+
+def articles(table: object) -> int:
+    return sum(1 for item in table.scan()["Items"] if item["pk"].startswith("ARTICLE#"))
+
+
+def throttle(**_kwargs: object) -> tuple:
+    error = {"Error": {"Code": "ThrottlingException", "Message": "Rate of requests exceeds the allowed throughput"}}
+    return AWSResponse("", 400, {}, None), error
+
+
+def cycle(  # noqa: PLR0913, PLR0917
+    name: str,
+    server: FeedServer,
+    table: object,
+    expected_articles: int,
+    expected_statuses: list[int],
+    expected_unwritten: int = 0,
+) -> bool:
+    import app as ingest  # noqa: PLC0415
+
+    server.reset()
+    stats = ingest.main({}, None)
+    statuses = sorted(server.statuses)
+    total = articles(table)
+    print(f"  {name:<8} statuses {statuses}, {stats.get('articles')} article(s) written ({total} stored), {stats}")
+    print(f"           {server.sent:,} B sent, {server.full_size:,} B without conditional GETs")
+    return total == expected_articles and statuses == expected_statuses and stats["unwritten"] == expected_unwritten
+
+
+def run(entries: int) -> bool:
+    server = FeedServer(entries)
+    table = create_table()
+    seed(table, start_server(server))
+    unique = 3 * entries + BRIEFS  # world, tech, science and briefs, less the repeated and the shared entries
+    added = 2
+    results = [
+        cycle("first", server, table, unique, [200, 200, 200, 200, 500]),
+        cycle("second", server, table, unique, [304, 304, 304, 304, 500]),
+    ]
+    server.add("tech", added)
+    results.append(cycle("third", server, table, unique + added, [200, 304, 304, 304, 500]))
+
+    from shared import dynamodb  # noqa: PLC0415
+
+    import app as ingest  # noqa: PLC0415
+
+    dynamodb.BASE_BACKOFF_SECONDS = 0
+    events = dynamodb.get_data_table(TABLE_NAME).client.meta.events
+    server.add("world", added)
+    events.register("before-call.dynamodb.BatchWriteItem", throttle)
+    results.append(cycle("fourth", server, table, unique + added, [200, 304, 304, 304, 500], expected_unwritten=added))
+    events.unregister("before-call.dynamodb.BatchWriteItem", throttle)
+    results.append(cycle("fifth", server, table, unique + 2 * added, [200, 304, 304, 304, 500]))
+
+    ingest._loop.run_until_complete(ingest.get_session().close())  # noqa: SLF001
+    return all(results)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check feed ingestion against a local server of fixture feeds")
+    parser.add_argument("--entries", type=int, default=DEFAULT_ENTRIES, help="Entries per fixture feed")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from moto import mock_aws
+
+    args = parse_args()
+    print(f"Ingesting fixture feeds of {args.entries} entries over five cycles...")
+    with mock_aws():
+        passed = run(args.entries)
+
+    print("✅ Feed ingestion OK" if passed else "❌ Feed ingestion check failed")
+    sys.exit(0 if passed else 1)
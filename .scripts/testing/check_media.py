@@ -0,0 +1,213 @@
+"""
+Runs the media pipeline locally on sample files against moto's S3 and DynamoDB.
+
+Generates a large JPEG with an EXIF rotation, a PNG with transparency and a small MP4 header
+(or takes real files with --files), uploads them under the media layout, invokes the handler
+with S3 events, then checks the renditions, the metadata, hash validation and that a repeated
+event is a no-op. A JPEG truncated past its header and an MP4 with a short movie header must be
+marked invalid, and a failing rendition must stop its siblings. Also times the parallel rendering
+against a serial run.
+
+Usage:
+    python .scripts/testing/check_media.py [--files photo.jpg clip.mp4 ...]
+"""
+
+import argparse
+import hashlib
+import mimetypes
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+import boto3
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(ROOT / "aws" / "src" / "fn" / "media"), str(ROOT / "aws" / "src")]
+
+# === CONFIG ===
+BUCKET_NAME = "media-check"
+TABLE_NAME = "media-check"
+USER_ID = "check-user"
+
+os.environ.update({"TABLE_NAME": TABLE_NAME, "POWERTOOLS_SERVICE_NAME": "check-media"})
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+
+def sample_jpeg() -> bytes:
+    image = Image.new("RGB", (4000, 3000))
+    image.paste((200, 40, 40), (0, 0, 2000, 3000))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90° clockwise to display, so it shows as 3000x4000
+    output = BytesIO()
+    image.save(output, "JPEG", quality=90, exif=exif)
+    return output.getvalue()
+
+
+def sample_png() -> bytes:
+    output = BytesIO()
+    Image.new("RGBA", (800, 600), (0, 128, 255, 128)).save(output, "PNG")
+    return output.getvalue()
+
+
+def box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def sample_mp4() -> bytes:
+    """
+    An MP4 with ftyp, a large mdat before the moov (as cameras write it) and a 1280x720 track of 12.5s
+    """
+    mvhd = box(b"mvhd", bytes(4) + struct.pack(">IIII", 0, 0, 1000, 12500) + bytes(80))
+    tkhd = box(b"tkhd", bytes(4) + struct.pack(">IIIII", 0, 0, 1, 0, 12500) + bytes(52) + struct.pack(">II", 1280 << 16, 720 << 16))
+    moov = box(b"moov", mvhd + box(b"trak", tkhd))
+    return box(b"ftyp", b"isom" + bytes(4) + b"isomavc1") + box(b"mdat", os.urandom(2 * 1024 * 1024)) + moov
+
+
+def malformed_mp4() -> bytes:
+    """
+    An MP4 whose movie header box is too short for its timescale and duration
+    """
+    return box(b"ftyp", b"isom" + bytes(4) + b"isomavc1") + box(b"moov", box(b"mvhd", bytes(8)))
+
+
+def slow_or_failing(index: int) -> int:
+    from lib.probe import ProbeError  # noqa: PLC0415
+
+    if index == 0:
+        msg = "Unreadable image: broken data stream"
+        raise ProbeError(msg)
+    time.sleep(30)
+    return index
+
+
+def create_resources() -> None:
+    boto3.client("s3").create_bucket(Bucket=BUCKET_NAME)
+    boto3.resource("dynamodb").create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}, {"AttributeName": "sk", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}, {"AttributeName": "sk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    ).wait_until_exists()
+
+
+def upload(name: str, data: bytes, content_type: str, content_hash: str | None = None) -> tuple[str, str]:
+    key = f"media/{USER_ID}/{content_hash or hashlib.sha256(data).hexdigest()}"
+    etag = boto3.client("s3").put_object(Bucket=BUCKET_NAME, Key=key, Body=data, ContentType=content_type)["ETag"].strip('"')
+    print(f"  {name}: {len(data) / 1024:.0f} KiB -> {key[:40]}...")
+    return key, etag
+
+
+def s3_event(key: str, etag: str) -> dict:
+    return {
+        "Records": [
+            {
+                "eventSource": "aws:s3",
+                "eventName": "ObjectCreated:CompleteMultipartUpload",
+                "s3": {"bucket": {"name": BUCKET_NAME}, "object": {"key": key, "eTag": etag, "size": 0}},
+            },
+        ],
+    }
+
+
+def run(files: list[Path]) -> bool:
+    from lib import renditions  # noqa: PLC0415
+
+    import app  # noqa: PLC0415
+
+    create_resources()
+    table = boto3.resource("dynamodb").Table(TABLE_NAME)
+    samples = [(path.name, path.read_bytes(), mimetypes.guess_type(path.name)[0] or "") for path in files] or [
+        ("photo.jpg", sample_jpeg(), "image/jpeg"),
+        ("overlay.png", sample_png(), "image/png"),
+        ("clip.mp4", sample_mp4(), "video/mp4"),
+    ]
+
+    print("Uploading:")
+    uploads = [(name, *upload(name, data, content_type)) for name, data, content_type in samples]
+    tampered = upload("tampered.jpg", samples[0][1], samples[0][2], content_hash=hashlib.sha256(b"other").hexdigest())
+
+    ok = True
+    print("Processing:")
+    for name, key, etag in uploads:
+        started = time.perf_counter()
+        result = app.main(s3_event(key, etag), None)[key]
+        elapsed = time.perf_counter() - started
+        again = app.main(s3_event(key, etag), None)[key]
+        _, user_id, content_hash = key.split("/")
+        record = table.get_item(Key={"pk": f"USER#{user_id}", "sk": f"MEDIA#{content_hash}"})["Item"]
+        sizes = {}
+        for rendition, rendition_key in record.get("Renditions", {}).items():
+            body = boto3.client("s3").get_object(Bucket=BUCKET_NAME, Key=rendition_key)["Body"].read()
+            sizes[rendition] = Image.open(BytesIO(body)).size
+        expected = dict(renditions.RENDITIONS) if record["Metadata"]["kind"] == "image" else {}
+        ok &= result == "processed" and again == "duplicate" and sizes == expected
+        print(f"  {name}: {result} in {elapsed:.2f}s, repeat: {again}, metadata: {dict(record['Metadata'])}")
+
+    key, etag = tampered
+    result = app.main(s3_event(key, etag), None)[key]
+    ok &= result == "invalid"
+    print(f"  tampered.jpg: {result}")
+    ok &= check_broken(app, table, samples[0][1]) and check_failing_rendition(renditions)
+
+    data = samples[0][1]
+    sizes = list(renditions.RENDITIONS.values())
+    started = time.perf_counter()
+    renditions.parallel_map(renditions.render, [(data, size) for size in sizes], workers=1)
+    serial = time.perf_counter() - started
+    started = time.perf_counter()
+    renditions.parallel_map(renditions.render, [(data, size) for size in sizes], workers=len(sizes))
+    parallel = time.perf_counter() - started
+    print(f"Rendering {len(sizes)} renditions: serial {serial:.2f}s, {len(sizes)} processes {parallel:.2f}s on {os.cpu_count()} CPU(s)")
+    return ok
+
+
+def check_broken(app: object, table: object, jpeg: bytes) -> bool:
+    """
+    Media whose header probes fine but whose content is corrupt must be marked invalid, not retried
+    """
+    ok = True
+    # The header (and so the probe) is intact, the image data is cut short
+    broken = [("truncated.jpg", jpeg[: len(jpeg) * 2 // 3], "image/jpeg"), ("malformed.mp4", malformed_mp4(), "video/mp4")]
+    for name, data, content_type in broken:
+        key, etag = upload(name, data, content_type)
+        result = app.main(s3_event(key, etag), None)[key]
+        _, user_id, content_hash = key.split("/")
+        record = table.get_item(Key={"pk": f"USER#{user_id}", "sk": f"MEDIA#{content_hash}"})["Item"]
+        ok &= result == "invalid"
+        print(f"  {name}: {result} ({record.get('Reason')})")
+    return ok
+
+
+def check_failing_rendition(renditions: object) -> bool:
+    """
+    The first failing child's error is raised at once, and its still running siblings are stopped
+    """
+    started = time.perf_counter()
+    try:
+        renditions.parallel_map(slow_or_failing, [(index,) for index in range(4)], workers=4)
+        raised = None
+    except renditions.ProbeError as e:
+        raised = e
+    elapsed = time.perf_counter() - started
+    left = multiprocessing.active_children()
+    print(f"  failing rendition: raised {raised!r} after {elapsed:.2f}s, {len(left)} child(ren) left running")
+    return raised is not None and not left and elapsed < 10  # noqa: PLR2004
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the media pipeline on sample files")
+    parser.add_argument("--files", nargs="*", type=Path, default=[], help="Sample images/videos; generated when omitted")
+    args = parser.parse_args()
+
+    from moto import mock_aws
+
+    with mock_aws():
+        passed = run(args.files)
+
+    print("✅ Media pipeline OK" if passed else "❌ Media pipeline check failed")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,147 @@
+"""
+Exercises multipart media uploads end to end against a local S3 and DynamoDB stand-in.
+
+Starts an upload through the API handler, PUTs half the parts in parallel, starts it again to
+check that it resumes with only the missing parts, finishes and completes it, then checks that a
+third start is deduplicated and that content the media pipeline marked INVALID can be uploaded
+again. Runs in-process on moto by default; set AWS_ENDPOINT_URL_S3 and AWS_ENDPOINT_URL_DYNAMODB
+(with --local) to use MinIO/LocalStack and DynamoDB Local instead.
+
+Usage:
+    python .scripts/testing/check_uploads.py [--size-mb 40] [--local]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import boto3
+import requests
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(ROOT / "aws" / "src" / "fn" / "api"), str(ROOT / "aws" / "src")]
+
+# === CONFIG ===
+BUCKET_NAME = "upload-check-media"
+TABLE_NAME = "upload-check"
+USER_ID = "check-user"
+UPLOAD_WORKERS = 8
+
+os.environ.update({"BUCKET_NAME": BUCKET_NAME, "TABLE_NAME": TABLE_NAME, "POWERTOOLS_SERVICE_NAME": "check-uploads"})
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+
+def create_resources() -> None:
+    boto3.client("s3").create_bucket(Bucket=BUCKET_NAME)
+    boto3.resource("dynamodb").create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}, {"AttributeName": "sk", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}, {"AttributeName": "sk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    ).wait_until_exists()
+
+
+def call(path: str, body: dict) -> dict:
+    import app  # noqa: PLC0415
+
+    # Token verification is not under test here
+    app.parse_token = lambda _token: {"cognito:username": USER_ID}
+    event = {"httpMethod": "POST", "path": path, "resource": path, "body": json.dumps(body), "headers": {"authorization": "x"}}
+    response = app.main({**event, "requestContext": {}}, None)
+    result = json.loads(response["body"])
+    return result.get("body", result)
+
+
+def put_parts(content: bytes, part_size: int, parts: list[dict]) -> float:
+    def put(part: dict) -> None:
+        start = (part["partNumber"] - 1) * part_size
+        requests.put(part["url"], data=content[start : start + part_size], timeout=60).raise_for_status()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+        list(executor.map(put, parts))
+    return time.perf_counter() - started
+
+
+def upload_after_invalid(content_hash: str, request: dict, previous_upload_id: str) -> tuple[bool, bool]:
+    """
+    Mark the media INVALID, as the pipeline does on a hash mismatch: completing it is refused and
+    starting it again starts a new upload
+    """
+    from shared.media import INVALID, media_record_key  # noqa: PLC0415
+
+    boto3.resource("dynamodb").Table(TABLE_NAME).update_item(
+        Key=media_record_key(USER_ID, content_hash),
+        UpdateExpression="SET #status = :invalid REMOVE UploadId",
+        ExpressionAttributeNames={"#status": "Status"},
+        ExpressionAttributeValues={":invalid": INVALID},
+    )
+    refused = call("/v1/upload/complete", {"contentHash": content_hash})
+    restarted = call("/v1/upload", request)
+    print(f"After INVALID: completing says {refused.get('message')!r}, starting again is {restarted['status']}")
+    return restarted["status"] == "pending" and restarted["uploadId"] != previous_upload_id, "message" in refused
+
+
+def run(size_mb: int) -> bool:
+    create_resources()
+    content = os.urandom(size_mb * 1024 * 1024)
+    content_hash = hashlib.sha256(content).hexdigest()
+    request = {"contentHash": content_hash, "size": len(content), "contentType": "video/mp4"}
+
+    first = call("/v1/upload", request)
+    print(f"Started: {first['partCount']} part(s) of {first['partSize'] // (1024 * 1024)} MiB")
+    half = first["parts"][: len(first["parts"]) // 2]
+    put_parts(content, first["partSize"], half)
+
+    resumed = call("/v1/upload", request)
+    resumed_ok = resumed["uploadId"] == first["uploadId"] and len(resumed["completedParts"]) == len(half)
+    print(f"Resumed: {len(resumed['completedParts'])} part(s) already uploaded, {len(resumed['parts'])} presigned")
+    elapsed = put_parts(content, resumed["partSize"], resumed["parts"])
+    print(f"Uploaded the rest in {elapsed:.2f}s with {UPLOAD_WORKERS} parallel PUTs")
+
+    completed = call("/v1/upload/complete", {"contentHash": content_hash})
+    stored = boto3.client("s3").get_object(Bucket=BUCKET_NAME, Key=completed["objectKey"])["Body"].read()
+    stored_ok = hashlib.sha256(stored).hexdigest() == content_hash
+    print(f"Completed: {completed['status']}, content matches: {stored_ok}")
+
+    again = call("/v1/upload", request)
+    print(f"Uploading the same file again: {again['status']}")
+
+    incomplete = call("/v1/upload", {**request, "contentHash": hashlib.sha256(b"other").hexdigest()})
+    rejected = call("/v1/upload/complete", {"contentHash": hashlib.sha256(b"other").hexdigest()})
+    print(f"Completing without parts: {rejected.get('message')}")
+
+    restarted, refused = upload_after_invalid(content_hash, request, first["uploadId"])
+
+    return (
+        resumed_ok
+        and stored_ok
+        and again["status"] == "exists"
+        and incomplete["status"] == "pending"
+        and "message" in rejected
+        and restarted
+        and refused
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check multipart media uploads against a local stand-in")
+    parser.add_argument("--size-mb", type=int, default=40, help="Size of the test file in MiB")
+    parser.add_argument("--local", action="store_true", help="Use the endpoints in AWS_ENDPOINT_URL_* instead of moto")
+    args = parser.parse_args()
+
+    if args.local:
+        passed = run(args.size_mb)
+    else:
+        from moto import mock_aws
+
+        with mock_aws():
+            passed = run(args.size_mb)
+
+    print("✅ Uploads OK" if passed else "❌ Upload check failed")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# === CONFIG ===
+ROOT_DIR = Path(__file__).resolve().parents[2]
+SHARED_DIR = ROOT_DIR / "aws" / "src"
+BUDGETS_FILE = Path(__file__).with_name("import_budgets.json")
+DEFAULT_RUNS = 5
+TOP_IMPORTS = 10
+# Handlers read these at import time; the values only need to be present
+HANDLER_ENV = {
+    "TABLE_NAME": "import-profile",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "POWERTOOLS_SERVICE_NAME": "import-profile",
+}
+
+
+def run_importtime(handler: dict) -> list[tuple[int, int, int, str]]:
+    """
+    Imports a handler module in a fresh interpreter with -X importtime.
+
+    Args:
+        handler: The handler config, with the "path" of its code and its "module" name.
+
+    Returns:
+        A list of (depth, self_us, cumulative_us, module) tuples in import order.
+    """
+    env = {**os.environ, **HANDLER_ENV, "PYTHONPATH": os.pathsep.join([str(ROOT_DIR / handler["path"]), str(SHARED_DIR)])}
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {handler['module']}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "Import failed")
+        sys.exit(1)
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((depth, int(self_us), int(cumulative_us), name.strip()))
+    return rows
+
+
+def profile_handler(handler: dict, runs: int) -> tuple[float, list[tuple[str, float]]]:
+    """
+    Profiles a handler import over several runs.
+
+    Args:
+        handler: The handler config.
+        runs: Number of fresh interpreter runs; the median is reported.
+
+    Returns:
+        The median total import time in ms, and the slowest top-level imports of the last run.
+    """
+    totals = []
+    for _ in range(runs):
+        rows = run_importtime(handler)
+        index = max(i for i, row in enumerate(rows) if row[3] == handler["module"])
+        totals.append(rows[index][2] / 1000)
+
+    # Children are printed before their parent, so the handler's direct imports are the rows one level
+    # deeper that precede it, back to the previous top-level import
+    handler_depth = rows[index][0]
+    direct = []
+    for depth, _, cumulative, name in reversed(rows[:index]):
+        if depth <= handler_depth:
+            break
+        if depth == handler_depth + 1:
+            direct.append((name, cumulative / 1000))
+    direct.sort(key=lambda row: row[1], reverse=True)
+    return statistics.median(totals), direct[:TOP_IMPORTS]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report the cold-start import cost of each Lambda handler")
+    parser.add_argument("--budgets", type=Path, default=BUDGETS_FILE, help="JSON file of handlers and their import budgets")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="Fresh interpreter runs per handler")
+    parser.add_argument("handlers", nargs="*", help="Handlers to profile (default: all)")
+    args = parser.parse_args()
+
+    handlers = json.loads(args.budgets.read_text())
+    failed = []
+
+    for name, handler in handlers.items():
+        if args.handlers and name not in args.handlers:
+            continue
+        total_ms, slowest = profile_handler(handler, args.runs)
+        within_budget = total_ms <= handler["budget_ms"]
+        print(f"\n{'✅' if within_budget else '❌'} {name}: {total_ms:.1f} ms (budget {handler['budget_ms']} ms)")
+        for module, cumulative_ms in slowest:
+            print(f"    {cumulative_ms:8.1f} ms  {module}")
+        if not within_budget:
+            failed.append(name)
+
+    if failed:
+        print(f"\nImport budget exceeded: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
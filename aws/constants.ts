@@ -20,6 +20,7 @@ export type ConstantsType = typeof CONSTANTS;
 
 export const PARAMS = {
     TABLE_NAME: `/${APP_NAME}/common/table-name`,
+    TABLE_STREAM_ARN: `/${APP_NAME}/common/table-stream-arn`,
     COMMON_LAYER_ARN: `/${APP_NAME}/common/common-layer-arn`,
     USER_POOL_ARN: `/${APP_NAME}/auth/user-pool-arn`,
 };
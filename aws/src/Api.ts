@@ -2,11 +2,17 @@ import {
     aws_apigateway as apigateway,
     aws_cognito as cognito,
     aws_dynamodb as dynamodb,
+    aws_events as events,
+    aws_events_targets as targets,
     aws_lambda as lambda,
+    aws_lambda_event_sources as lambdaEventSources,
     aws_logs as logs,
+    aws_s3 as s3,
+    aws_s3_notifications as s3n,
     RemovalPolicy,
-    Size,
+    aws_sqs as sqs,
     aws_ssm as ssm,
+    Duration,
     Stack,
     StackProps,
 } from "aws-cdk-lib";
@@ -36,6 +42,10 @@ export class ApiStack extends Stack {
             parameterName: props.params.TABLE_NAME,
         });
 
+        const tableStreamArn = ssm.StringParameter.fromStringParameterAttributes(this, `${props.constants.APP_NAME}-TableStreamArn`, {
+            parameterName: props.params.TABLE_STREAM_ARN,
+        });
+
         const commonLayerArn = ssm.StringParameter.fromStringParameterAttributes(this, `${props.constants.APP_NAME}-CommonLayerArn`, {
             parameterName: props.params.COMMON_LAYER_ARN,
         });
@@ -93,9 +103,31 @@ export class ApiStack extends Stack {
 
         const table = dynamodb.Table.fromTableAttributes(this, `${props.constants.APP_NAME}-Table`, {
             tableName: tableName.stringValue,
+            tableStreamArn: tableStreamArn.stringValue,
             grantIndexPermissions: true,
         });
 
+        ////////////////////////////////////////////////////////////////////////////////////////////////////////////
+        // Media bucket
+        ////////////////////////////////////////////////////////////////////////////////////////////////////////////
+        // The app uploads media parts straight to S3 through presigned URLs; the ETag header is exposed so web clients can read it
+        const mediaBucket = new s3.Bucket(this, `${props.constants.APP_NAME}-MediaBucket`, {
+            blockPublicAccess: s3.BlockPublicAccess.BLOCK_ALL,
+            encryption: s3.BucketEncryption.S3_MANAGED,
+            enforceSSL: true,
+            removalPolicy: RemovalPolicy.DESTROY,
+            autoDeleteObjects: true,
+            cors: [
+                {
+                    allowedMethods: [s3.HttpMethods.PUT],
+                    allowedOrigins: ["*"],
+                    allowedHeaders: ["*"],
+                    exposedHeaders: ["ETag"],
+                },
+            ],
+            lifecycleRules: [{ abortIncompleteMultipartUploadAfter: Duration.days(7) }],
+        });
+
         ////////////////////////////////////////////////////////////////////////////////////////////////////////////
         // Lambda handler
         ////////////////////////////////////////////////////////////////////////////////////////////////////////////
@@ -120,11 +152,15 @@ export class ApiStack extends Stack {
             layers: [commonLayer, powertoolsLayer],
             environment: {
                 TABLE_NAME: table.tableName,
+                BUCKET_NAME: mediaBucket.bucketName,
                 PROJECT_NAME: props.constants.APP_NAME,
+                USER_POOL_ID: userPool.userPoolId,
+                USER_POOL_CLIENT_ID: userPoolClient.userPoolClientId,
             },
         });
 
         table.grantReadWriteData(apiFn);
+        mediaBucket.grantReadWrite(apiFn);
 
         new logs.LogGroup(this, `${props.constants.APP_NAME}-ApiHandlerLogGroup`, {
             logGroupName: `/aws/lambda/${apiFn.functionName}`,
@@ -132,6 +168,174 @@ export class ApiStack extends Stack {
             retention: logs.RetentionDays.TWO_WEEKS,
         });
 
+        ////////////////////////////////////////////////////////////////////////////////////////////////////////////
+        // Media pipeline
+        ////////////////////////////////////////////////////////////////////////////////////////////////////////////
+        // Renders platform-sized renditions and records metadata as soon as media lands, off the publishing path.
+        // Renditions are rendered in parallel processes, so the memory size is set for 2 vCPUs
+        const mediaFn = new lambda.Function(this, `${props.constants.APP_NAME}-MediaHandler`, {
+            functionName: `${props.constants.APP_NAME}-MediaHandler`,
+            runtime: lambda.Runtime.PYTHON_3_12,
+            handler: "app.main",
+            code: lambda.Code.fromAsset(join(__dirname, "fn/media")),
+            layers: [commonLayer, powertoolsLayer],
+            memorySize: 3008,
+            timeout: Duration.minutes(5),
+            environment: {
+                TABLE_NAME: table.tableName,
+                PROJECT_NAME: props.constants.APP_NAME,
+            },
+        });
+
+        table.grantReadWriteData(mediaFn);
+        mediaBucket.grantReadWrite(mediaFn);
+        mediaBucket.addEventNotification(s3.EventType.OBJECT_CREATED, new s3n.LambdaDestination(mediaFn), { prefix: "media/" });
+
+        new logs.LogGroup(this, `${props.constants.APP_NAME}-MediaHandlerLogGroup`, {
+            logGroupName: `/aws/lambda/${mediaFn.functionName}`,
+            removalPolicy: RemovalPolicy.DESTROY,
+            retention: logs.RetentionDays.TWO_WEEKS,
+        });
+
+        ////////////////////////////////////////////////////////////////////////////////////////////////////////////
+        // Schedule dispatcher
+        ////////////////////////////////////////////////////////////////////////////////////////////////////////////
+        // Jobs are stored in minute buckets; the dispatcher claims the due ones every minute and queues them for publishing
+        const publishQueue = new sqs.Queue(this, `${props.constants.APP_NAME}-PublishQueue`, {
+            queueName: `${props.constants.APP_NAME}-PublishQueue`,
+            visibilityTimeout: Duration.minutes(5),
+            removalPolicy: RemovalPolicy.DESTROY,
+        });
+
+        const dispatcherFn = new lambda.Function(this, `${props.constants.APP_NAME}-DispatcherHandler`, {
+            functionName: `${props.constants.APP_NAME}-DispatcherHandler`,
+            runtime: lambda.Runtime.PYTHON_3_12,
+            handler: "app.main",
+            code: lambda.Code.fromAsset(join(__dirname, "fn/dispatcher")),
+            layers: [commonLayer, powertoolsLayer],
+            timeout: Duration.seconds(50),
+            environment: {
+                TABLE_NAME: table.tableName,
+                PROJECT_NAME: props.constants.APP_NAME,
+                PUBLISH_QUEUE_URL: publishQueue.queueUrl,
+            },
+        });
+
+        table.grantReadWriteData(dispatcherFn);
+        publishQueue.grantSendMessages(dispatcherFn);
+
+        new logs.LogGroup(this, `${props.constants.APP_NAME}-DispatcherHandlerLogGroup`, {
+            logGroupName: `/aws/lambda/${dispatcherFn.functionName}`,
+            removalPolicy: RemovalPolicy.DESTROY,
+            retention: logs.RetentionDays.TWO_WEEKS,
+        });
+
+        new events.Rule(this, `${props.constants.APP_NAME}-DispatcherSchedule`, {
+            schedule: events.Schedule.rate(Duration.minutes(1)),
+            targets: [new targets.LambdaFunction(dispatcherFn)],
+        });
+
+        ////////////////////////////////////////////////////////////////////////////////////////////////////////////
+        // Feed ingestion
+        ////////////////////////////////////////////////////////////////////////////////////////////////////////////
+        // Fetches the sources' feeds every 15 minutes with conditional GETs, so unchanged feeds cost a 304
+        const ingestFn = new lambda.Function(this, `${props.constants.APP_NAME}-IngestHandler`, {
+            functionName: `${props.constants.APP_NAME}-IngestHandler`,
+            runtime: lambda.Runtime.PYTHON_3_12,
+            handler: "app.main",
+            code: lambda.Code.fromAsset(join(__dirname, "fn/ingest")),
+            layers: [commonLayer, powertoolsLayer],
+            timeout: Duration.minutes(5),
+            memorySize: 512,
+            environment: {
+                TABLE_NAME: table.tableName,
+                PROJECT_NAME: props.constants.APP_NAME,
+            },
+        });
+
+        table.grantReadWriteData(ingestFn);
+
+        new logs.LogGroup(this, `${props.constants.APP_NAME}-IngestHandlerLogGroup`, {
+            logGroupName: `/aws/lambda/${ingestFn.functionName}`,
+            removalPolicy: RemovalPolicy.DESTROY,
+            retention: logs.RetentionDays.TWO_WEEKS,
+        });
+
+        new events.Rule(this, `${props.constants.APP_NAME}-IngestSchedule`, {
+            schedule: events.Schedule.rate(Duration.minutes(15)),
+            targets: [new targets.LambdaFunction(ingestFn)],
+        });
+
+        ////////////////////////////////////////////////////////////////////////////////////////////////////////////
+        // Publisher
+        ////////////////////////////////////////////////////////////////////////////////////////////////////////////
+        // Publishes queued jobs through the per-account and per-app token buckets; throttled jobs are requeued
+        // by the function itself with a delay, so only messages it could not requeue are reported as failures
+        const publisherFn = new lambda.Function(this, `${props.constants.APP_NAME}-PublisherHandler`, {
+            functionName: `${props.constants.APP_NAME}-PublisherHandler`,
+            runtime: lambda.Runtime.PYTHON_3_12,
+            handler: "app.main",
+            code: lambda.Code.fromAsset(join(__dirname, "fn/publisher")),
+            layers: [commonLayer, powertoolsLayer],
+            timeout: Duration.minutes(1),
+            environment: {
+                TABLE_NAME: table.tableName,
+                PROJECT_NAME: props.constants.APP_NAME,
+                PUBLISH_QUEUE_URL: publishQueue.queueUrl,
+            },
+        });
+
+        table.grantReadWriteData(publisherFn);
+        publishQueue.grantSendMessages(publisherFn);
+        publisherFn.addEventSource(
+            new lambdaEventSources.SqsEventSource(publishQueue, {
+                batchSize: 50,
+                maxBatchingWindow: Duration.seconds(5),
+                reportBatchItemFailures: true,
+            }),
+        );
+
+        new logs.LogGroup(this, `${props.constants.APP_NAME}-PublisherHandlerLogGroup`, {
+            logGroupName: `/aws/lambda/${publisherFn.functionName}`,
+            removalPolicy: RemovalPolicy.DESTROY,
+            retention: logs.RetentionDays.TWO_WEEKS,
+        });
+
+        ////////////////////////////////////////////////////////////////////////////////////////////////////////////
+        // Materialized views
+        ////////////////////////////////////////////////////////////////////////////////////////////////////////////
+        // Keeps each user's home view up to date from the stream of job changes, so GET /v1/home is a single GetItem
+        const viewsFn = new lambda.Function(this, `${props.constants.APP_NAME}-ViewsHandler`, {
+            functionName: `${props.constants.APP_NAME}-ViewsHandler`,
+            runtime: lambda.Runtime.PYTHON_3_12,
+            handler: "app.main",
+            code: lambda.Code.fromAsset(join(__dirname, "fn/views")),
+            layers: [commonLayer, powertoolsLayer],
+            timeout: Duration.minutes(1),
+            environment: {
+                TABLE_NAME: table.tableName,
+                PROJECT_NAME: props.constants.APP_NAME,
+            },
+        });
+
+        table.grantReadWriteData(viewsFn);
+        viewsFn.addEventSource(
+            new lambdaEventSources.DynamoEventSource(table, {
+                startingPosition: lambda.StartingPosition.TRIM_HORIZON,
+                batchSize: 500,
+                maxBatchingWindow: Duration.seconds(1),
+                retryAttempts: 10,
+                reportBatchItemFailures: true,
+                filters: [lambda.FilterCriteria.filter({ dynamodb: { Keys: { sk: { S: lambda.FilterRule.beginsWith("JOB#") } } } })],
+            }),
+        );
+
+        new logs.LogGroup(this, `${props.constants.APP_NAME}-ViewsHandlerLogGroup`, {
+            logGroupName: `/aws/lambda/${viewsFn.functionName}`,
+            removalPolicy: RemovalPolicy.DESTROY,
+            retention: logs.RetentionDays.TWO_WEEKS,
+        });
+
         ////////////////////////////////////////////////////////////////////////////////////////////////////////////
         // API Gateway
         ////////////////////////////////////////////////////////////////////////////////////////////////////////////
@@ -150,7 +354,9 @@ export class ApiStack extends Stack {
                 stageName: "api",
             },
             endpointTypes: [apigateway.EndpointType.REGIONAL],
-            minCompressionSize: Size.bytes(0),
+            // The handlers compress large bodies themselves (brotli or gzip) and return them base64 encoded;
+            // binary media types let API Gateway decode them. Request bodies then arrive base64 encoded too
+            binaryMediaTypes: ["*/*"],
             defaultCorsPreflightOptions: {
                 allowOrigins: ["*"],
                 allowMethods: apigateway.Cors.ALL_METHODS,
@@ -21,9 +21,21 @@ export class CommonStack extends Stack {
             partitionKey: { name: "pk", type: dynamodb.AttributeType.STRING },
             sortKey: { name: "sk", type: dynamodb.AttributeType.STRING },
             billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+            timeToLiveAttribute: "ExpiresAt",
+            // Job changes feed the materialized per-user views
+            stream: dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
             removalPolicy: RemovalPolicy.DESTROY,
         });
 
+        // A user's jobs by due time, used to refill the home views that keep only the next upcoming jobs
+        table.addGlobalSecondaryIndex({
+            indexName: "UserJobs",
+            partitionKey: { name: "UserId", type: dynamodb.AttributeType.STRING },
+            sortKey: { name: "DueAt", type: dynamodb.AttributeType.NUMBER },
+            projectionType: dynamodb.ProjectionType.INCLUDE,
+            nonKeyAttributes: ["JobId", "Status", "ObjectKey", "Platform", "AccountId"],
+        });
+
         ////////////////////////////////////////////////////////////
         // Common Layer for lambda functions
         ////////////////////////////////////////////////////////////
@@ -45,6 +57,13 @@ export class CommonStack extends Stack {
             description: `The name of the DynamoDB table for ${props.constants.APP_NAME}`,
         });
 
+        const tableStreamArnParameter = new ssm.StringParameter(this, `${props.constants.APP_NAME}-TableStreamArn`, {
+            parameterName: props.params.TABLE_STREAM_ARN,
+            stringValue: table.tableStreamArn!,
+            tier: ssm.ParameterTier.STANDARD,
+            description: `The ARN of the DynamoDB table stream for ${props.constants.APP_NAME}`,
+        });
+
         const commonLayerArnParameter = new ssm.StringParameter(this, `${props.constants.APP_NAME}-CommonLayerArn`, {
             parameterName: props.params.COMMON_LAYER_ARN,
             stringValue: commonLayer.layerVersionArn,
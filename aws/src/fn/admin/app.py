@@ -7,49 +7,53 @@
 # Python imports
 from os import environ
 
-import boto3
-
 # ==================================================================================================
 # Powertools imports
-from aws_lambda_powertools.event_handler import APIGatewayRestResolver, CORSConfig
+from aws_lambda_powertools.event_handler import APIGatewayRestResolver, CORSConfig, Response, content_types
+from aws_lambda_powertools.event_handler.exceptions import BadRequestError
 from aws_lambda_powertools.utilities.data_classes import APIGatewayProxyEvent, event_source
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
 # ==================================================================================================
 # Module-level imports
-from shared.lambda_response import RESPONSE
-from shared.logger import logger
+from lib.sources import SourcesQuery, SourcesQueryError, current_version, etag, etag_matches, list_sources
+from shared.idempotency import idempotent
+from shared.lambda_response import RESPONSE, compress_response, dumps
+from shared.logger import invocation
+from shared.metrics import metrics
 
 # ==================================================================================================
 # Global declarations
 TABLE_NAME = environ.get("TABLE_NAME")
+# Clients may reuse a listing for this long; after that they revalidate it with If-None-Match
+SOURCES_MAX_AGE = int(environ.get("SOURCES_MAX_AGE", "60"))
 
 # ==================================================================================================
 # Global initializations
-
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table(TABLE_NAME)
+# The DynamoDB table is created on first use through shared.dynamodb.get_data_table(TABLE_NAME), outside the cold-start path
 
 cors_config = CORSConfig(
     allow_origin="*",
     allow_headers=["*", 'Authorization'],  # noqa: Q000
 )
 
-app = APIGatewayRestResolver(cors=cors_config)
+app = APIGatewayRestResolver(cors=cors_config, serializer=dumps)
+app.use(middlewares=[metrics.route_middleware])
 
 
 # ==================================================================================================
 # Routes
 
 
-@event_source(APIGatewayProxyEvent)
+@metrics.log_metrics
+@invocation.log_invocation
+@event_source(data_class=APIGatewayProxyEvent)
 def main(event: APIGatewayProxyEvent, context: LambdaContext) -> dict:
     """
-    The lambda handler method: It resolves the proxy route and invokes the appropriate method
+    The lambda handler method: It resolves the proxy route and invokes the appropriate method, then
+    compresses large responses for clients that accept it
     """
-    logger.info(f"Event: {event}")
-    logger.info(f"Context: {context}")
-    return app.resolve(event, context)
+    return compress_response(app.resolve(event, context), event.headers)
 
 
 # ==================================================================================================
@@ -57,32 +61,46 @@ def main(event: APIGatewayProxyEvent, context: LambdaContext) -> dict:
 
 
 @app.get("/sources")
-def get_sources() -> dict:
+def get_sources() -> Response:
     """
-    Get all sources
+    Get a page of sources, filtered by country and language. Returns 304 when the client's copy is current
     """
-    return RESPONSE.success(data=[])
+    try:
+        query = SourcesQuery(app.current_event.query_string_parameters)
+        version = current_version()
+        tag = etag(version, query)
+        headers = {"ETag": tag, "Cache-Control": f"private, max-age={SOURCES_MAX_AGE}"}
+        if etag_matches(app.current_event.get_header_value("If-None-Match", case_sensitive=False), tag):
+            return Response(status_code=304, headers=headers)
+        page = list_sources(query, version)
+    except SourcesQueryError as e:
+        raise BadRequestError(str(e)) from e
+
+    return Response(status_code=200, content_type=content_types.APPLICATION_JSON, body=page, headers=headers)
 
 
 @app.post("/add-source")
-def add_source() -> dict:
+@idempotent(app, TABLE_NAME)
+def add_source() -> Response:
     """
     Add a new source
     """
-    return RESPONSE.success(data=[])
+    return RESPONSE(body={"data": []})
 
 
 @app.post("/update-source")
-def update_source() -> dict:
+@idempotent(app, TABLE_NAME)
+def update_source() -> Response:
     """
     Update a source
     """
-    return RESPONSE.success(data=[])
+    return RESPONSE(body={"data": []})
 
 
 @app.post("/delete-source")
-def delete_source() -> dict:
+@idempotent(app, TABLE_NAME)
+def delete_source() -> Response:
     """
     Delete a source
     """
-    return RESPONSE.success(data=[])
+    return RESPONSE(body={"data": []})
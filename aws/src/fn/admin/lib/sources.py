@@ -0,0 +1,248 @@
+"""
+Source catalogue module
+
+Sources live in one partition per country and language (`SOURCE#{country}#{language}`), listed in
+the catalogue item along with a version that changes whenever a source does. Listings Query only the
+partitions matching the filters, project only the requested attributes and page with opaque
+continuation tokens. Pages are cached per catalogue version, so a warm container serves repeat
+requests, and conditional requests for an unchanged catalogue, without reading the table.
+"""
+
+# ==================================================================================================
+# Python imports
+import base64
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from os import environ
+
+# ==================================================================================================
+# Module-level imports
+from shared.cache import TTLCache
+from shared.dynamodb import get_data_table
+
+# ==================================================================================================
+# Global declarations
+TABLE_NAME = environ.get("TABLE_NAME")
+CATALOGUE_KEY = {"pk": "APP#DATA", "sk": "SOURCES"}
+PARTITION_PREFIX = "SOURCE#"
+
+# How long the catalogue version is trusted before it is read again
+CATALOGUE_CACHE_TTL = int(environ.get("CATALOGUE_CACHE_TTL", "60"))
+PAGE_CACHE_SIZE = int(environ.get("SOURCES_PAGE_CACHE_SIZE", "256"))
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Attributes that can be requested through `fields`; the key attributes are always returned
+FIELDS = ("Name", "Country", "Language", "Feeds")
+DEFAULT_FIELDS = ("Name", "Country", "Language")
+
+
+class SourcesQueryError(Exception):
+    """
+    Raised when a listing request has invalid parameters or continuation token
+    """
+
+
+def load_catalogue(_key: str) -> dict:
+    """
+    Read the catalogue item: the source partitions and the catalogue version
+    """
+    names = {"#partitions": "Partitions", "#version": "Version"}
+    item = get_data_table(TABLE_NAME).get(CATALOGUE_KEY, ProjectionExpression="#partitions, #version", ExpressionAttributeNames=names) or {}
+    return {"partitions": sorted(item.get("Partitions", ())), "version": item.get("Version", "")}
+
+
+catalogue = TTLCache(load_catalogue, ttl=CATALOGUE_CACHE_TTL)
+
+
+class PageCache:
+    """
+    Bounded LRU of listing pages, dropped as a whole when the catalogue version changes
+    """
+
+    def __init__(self, max_size: int = PAGE_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self.version = None
+        self._entries: OrderedDict[tuple, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version: str, key: tuple) -> dict | None:
+        with self._lock:
+            if version != self.version:
+                return None
+            page = self._entries.get(key)
+            if page is not None:
+                self._entries.move_to_end(key)
+            return page
+
+    def put(self, version: str, key: tuple, page: dict) -> None:
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+            self._entries[key] = page
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+pages = PageCache()
+
+
+class SourcesQuery:
+    """
+    A validated listing request: partition filters, projected fields, page size and position
+    """
+
+    def __init__(self, params: dict | None) -> None:
+        params = params or {}
+        self.country = params.get("country") or None
+        self.language = params.get("language") or None
+        self.fields = self._parse_fields(params.get("fields"))
+        self.limit = self._parse_limit(params.get("limit"))
+        self.token = params.get("next") or None
+
+    def key(self) -> tuple:
+        return (self.country, self.language, self.fields, self.limit, self.token)
+
+    def partitions(self, all_partitions: list[str]) -> list[str]:
+        """
+        Get the catalogue partitions matching the country and language filters
+        """
+        matching = []
+        for partition in all_partitions:
+            _, _, rest = partition.partition(PARTITION_PREFIX)
+            country, _, language = rest.partition("#")
+            if self.country and country != self.country:
+                continue
+            if self.language and language != self.language:
+                continue
+            matching.append(partition)
+        return matching
+
+    @staticmethod
+    def _parse_fields(value: str | None) -> tuple[str, ...]:
+        if not value:
+            return DEFAULT_FIELDS
+        fields = tuple(sorted({field.strip() for field in value.split(",") if field.strip()}))
+        unknown = [field for field in fields if field not in FIELDS]
+        if unknown:
+            msg = f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(FIELDS)}"
+            raise SourcesQueryError(msg)
+        return fields
+
+    @staticmethod
+    def _parse_limit(value: str | None) -> int:
+        if not value:
+            return DEFAULT_LIMIT
+        try:
+            limit = int(value)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= MAX_LIMIT:
+            msg = f"limit must be an integer between 1 and {MAX_LIMIT}"
+            raise SourcesQueryError(msg)
+        return limit
+
+
+def encode_token(version: str, partition: str, last_key: dict | None) -> str:
+    data = json.dumps({"v": version, "p": partition, "k": last_key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_token(token: str, version: str) -> tuple[str, dict | None]:
+    """
+    Get the partition and start key a continuation token points to
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        partition, last_key = data["p"], data["k"]
+    except (ValueError, TypeError, KeyError) as e:
+        msg = "Invalid continuation token"
+        raise SourcesQueryError(msg) from e
+    if data.get("v") != version:
+        msg = "The source catalogue has changed, restart the listing"
+        raise SourcesQueryError(msg)
+    return partition, last_key
+
+
+def current_version() -> str:
+    return catalogue.get("catalogue")["version"]
+
+
+def etag(version: str, query: SourcesQuery) -> str:
+    """
+    Get the entity tag of a listing page: the catalogue version and the request parameters
+    """
+    digest = hashlib.sha256(json.dumps([version, *query.key()]).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, tag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return "*" in candidates or tag in candidates
+
+
+def query_partition(partition: str, fields: tuple[str, ...], limit: int, start_key: dict | None) -> tuple[list[dict], dict | None]:
+    """
+    Query up to `limit` sources of a partition, projected to the requested fields
+    """
+    names = {f"#{field.lower()}": field for field in fields}
+    kwargs = {
+        "KeyConditionExpression": "pk = :pk",
+        "ExpressionAttributeValues": {":pk": partition},
+        "ProjectionExpression": ", ".join(["pk", "sk", *names]),
+        "ExpressionAttributeNames": names,
+        "Limit": limit,
+    }
+    if start_key:
+        kwargs["ExclusiveStartKey"] = start_key
+    # One page: the caller resumes from its last key
+    return next(get_data_table(TABLE_NAME).pages(**kwargs))
+
+
+def list_sources(query: SourcesQuery, version: str) -> dict:
+    """
+    Get a page of sources, walking the matching partitions in order from the continuation token
+    """
+    cached = pages.get(version, query.key())
+    if cached is not None:
+        return cached
+
+    partitions = query.partitions(catalogue.get("catalogue")["partitions"])
+    index, start_key = 0, None
+    if query.token:
+        partition, start_key = decode_token(query.token, version)
+        if partition not in partitions:
+            msg = "Invalid continuation token"
+            raise SourcesQueryError(msg)
+        index = partitions.index(partition)
+
+    items = []
+    next_token = None
+    while index < len(partitions):
+        batch, start_key = query_partition(partitions[index], query.fields, query.limit - len(items), start_key)
+        items.extend(batch)
+        if start_key is None:
+            index += 1
+        if len(items) >= query.limit:
+            if start_key is not None:
+                next_token = encode_token(version, partitions[index], start_key)
+            elif index < len(partitions):
+                next_token = encode_token(version, partitions[index], None)
+            break
+
+    page = {"data": [to_source(item, query.fields) for item in items], "next": next_token}
+    pages.put(version, query.key(), page)
+    return page
+
+
+def to_source(item: dict, fields: tuple[str, ...]) -> dict:
+    source = {"id": item["sk"].removeprefix("NAME#")}
+    for field in fields:
+        if field in item:
+            source[field] = item[field]
+    return source
@@ -5,23 +5,38 @@
 
 # ==================================================================================================
 # Python imports
+import time
+from datetime import datetime
 from os import environ
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 # ==================================================================================================
 # Powertools imports
-from aws_lambda_powertools.event_handler import APIGatewayRestResolver, CORSConfig
+from aws_lambda_powertools.event_handler import APIGatewayRestResolver, CORSConfig, Response
+from aws_lambda_powertools.event_handler.exceptions import BadRequestError, UnauthorizedError
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
 # ==================================================================================================
 # Module-level imports
-from lib.token import parse_token
-from shared.lambda_response import RESPONSE
-from shared.logger import logger
+from lib.token import TokenError, parse_token
+from lib.upload import UploadError, complete_upload, start_upload
+from shared.aws import get_table
+from shared.dynamodb import get_data_table
+from shared.idempotency import idempotent
+from shared.lambda_response import RESPONSE, compress_response, dumps
+from shared.logger import invocation
+from shared.metrics import metrics
+from shared.schedule import ScheduleStore
+from shared.views import home_view_key, render_home
 
 # ==================================================================================================
 # Global declarations
 BUCKET_NAME = environ.get("BUCKET_NAME")
 DOMAIN_NAME = environ.get("DOMAIN_NAME")
+TABLE_NAME = environ.get("TABLE_NAME")
+MAX_BULK_JOBS = int(environ.get("MAX_BULK_JOBS", "500"))
+# Due times up to this far in the past are taken as now (client clocks drift); older ones are refused
+MAX_PAST_DUE_SECONDS = 60
 
 
 # ==================================================================================================
@@ -31,41 +46,155 @@ cors_config = CORSConfig(
     allow_headers=["*", "Authorization"],
 )
 
-app = APIGatewayRestResolver(cors=cors_config)
+app = APIGatewayRestResolver(cors=cors_config, serializer=dumps)
+app.use(middlewares=[metrics.route_middleware])
 
 # ==================================================================================================
 # Routes
 
 
-@app.get("/v1/home")
-def home() -> dict:
-    data: dict = app.current_event.json_body
-    user_id = parse_token(app.current_event.headers.get("authorization"))["cognito:username"]
-    logger.info(f"User ID: {user_id}")
-    logger.info(f"Home data: {data}")
-    return RESPONSE(body={"message": "Home page data"})
+def current_user_id() -> str:
+    """
+    Get the user id from the request's Authorization header
+    """
+    try:
+        return parse_token(app.current_event.headers.get("authorization"))["cognito:username"]
+    except TokenError as e:
+        raise UnauthorizedError(str(e)) from e
 
 
-@app.get("/v1/upload")
-def upload() -> dict:
+def parse_due_at(value: str | float | None) -> float:
+    """
+    Get the epoch seconds of a due time given as epoch seconds or an ISO 8601 timestamp with offset
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        due_at = datetime.fromisoformat(value)
+    except (TypeError, ValueError) as e:
+        msg = "dueAt must be epoch seconds or an ISO 8601 timestamp"
+        raise ValueError(msg) from e
+    if due_at.tzinfo is None:
+        msg = "dueAt must include a timezone offset"
+        raise ValueError(msg)
+    return due_at.timestamp()
+
+
+def parse_job(data: dict) -> tuple[str, float, dict]:
+    """
+    Get the (object key, due time, details) of a job in a request body
+    """
+    if not isinstance(data, dict):
+        msg = "A job must be an object"
+        raise ValueError(msg)
+    object_key = data.get("objectKey")
+    if not object_key or not isinstance(object_key, str):
+        msg = "objectKey is required"
+        raise ValueError(msg)
+    details = {}
+    for field, attribute in (("platform", "Platform"), ("accountId", "AccountId"), ("text", "Text")):
+        value = data.get(field)
+        if value is not None and not isinstance(value, str):
+            msg = f"{field} must be a string"
+            raise ValueError(msg)
+        if value:
+            details[attribute] = value
+    due_at = parse_due_at(data.get("dueAt"))
+    if due_at < time.time() - MAX_PAST_DUE_SECONDS:
+        msg = "dueAt is in the past"
+        raise ValueError(msg)
+    return object_key, due_at, details
 
-    ## Create an S3 signed URL
-    ## Send the S3 signed URL to the client
-    ## Default tag is "SCHEDULED=False"
 
-    return RESPONSE(body={"signedUrl": "s3://signed-url"})
+@app.get("/v1/home")
+def home() -> Response:
+    ## The home screen is read from the user's materialized view, which the views function keeps up to date
+    user_id = current_user_id()
+    timezone = app.current_event.get_query_string_value("timezone", "UTC")
+    try:
+        ZoneInfo(timezone)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        msg = f"Unknown timezone: {timezone}"
+        raise BadRequestError(msg) from e
+    view = get_data_table(TABLE_NAME).get(home_view_key(user_id))
+    return RESPONSE(body=render_home(view, time.time(), timezone))
+
+
+@app.post("/v1/upload")
+def upload() -> Response:
+    ## Start (or resume) a multipart upload keyed by the file's SHA-256 and return presigned URLs for the missing parts.
+    ## Files the user already uploaded come back as "exists" and are not sent again
+    data: dict = app.current_event.json_body or {}
+    user_id = current_user_id()
+    try:
+        result = start_upload(user_id, data.get("contentHash"), data.get("size"), data.get("contentType"))
+    except UploadError as e:
+        raise BadRequestError(str(e)) from e
+    return RESPONSE(body=result)
+
+
+@app.post("/v1/upload/complete")
+def upload_complete() -> Response:
+    data: dict = app.current_event.json_body or {}
+    user_id = current_user_id()
+    try:
+        result = complete_upload(user_id, data.get("contentHash"))
+    except UploadError as e:
+        raise BadRequestError(str(e)) from e
+    return RESPONSE(body=result)
 
 
 @app.post("/v1/schedule")
-def schedule() -> dict:
-    ## Get the s3 object key from request body
-    ## Schedule the job in eventbridge
-    ## Add the object key, and schedule id to the database along with details of the schedule
-    return RESPONSE(body={"jobId": "job-id"})
-
-
+@idempotent(app, TABLE_NAME, scope=current_user_id)
+def schedule() -> Response:
+    ## Jobs go into the minute bucket they are due in; the dispatcher picks them up from there
+    data: dict = app.current_event.json_body or {}
+    user_id = current_user_id()
+    try:
+        object_key, due_at, details = parse_job(data)
+    except ValueError as e:
+        raise BadRequestError(str(e)) from e
+
+    job = ScheduleStore(get_table(TABLE_NAME)).add(user_id, object_key, due_at, details)
+    return RESPONSE(body={"jobId": job["JobId"]})
+
+
+@app.post("/v1/schedule/bulk")
+@idempotent(app, TABLE_NAME, scope=current_user_id)
+def schedule_bulk() -> Response:
+    ## Validate every job first, then store the valid ones with BatchWriteItem and report on each by index
+    data: dict = app.current_event.json_body or {}
+    user_id = current_user_id()
+    entries = data.get("jobs")
+    if not isinstance(entries, list) or not entries:
+        msg = "jobs must be a non-empty list"
+        raise BadRequestError(msg)
+    if len(entries) > MAX_BULK_JOBS:
+        msg = f"At most {MAX_BULK_JOBS} jobs can be scheduled per request"
+        raise BadRequestError(msg)
+
+    results: list[dict] = [{}] * len(entries)
+    valid = []
+    for index, entry in enumerate(entries):
+        try:
+            valid.append((index, parse_job(entry)))
+        except ValueError as e:
+            results[index] = {"index": index, "status": "invalid", "error": str(e)}
+
+    jobs, failed_ids = ScheduleStore(get_table(TABLE_NAME)).add_many(user_id, [job for _, job in valid])
+    for (index, _), job in zip(valid, jobs, strict=True):
+        status = "failed" if job["JobId"] in failed_ids else "scheduled"
+        results[index] = {"index": index, "status": status, "jobId": job["JobId"]}
+
+    summary = {status: sum(1 for result in results if result["status"] == status) for status in ("scheduled", "failed", "invalid")}
+    return RESPONSE(body={"results": results, **summary})
+
+
+@metrics.log_metrics
+@invocation.log_invocation
 def main(event: dict, context: LambdaContext) -> dict:
     """
-    The lambda handler method: It resolves the proxy route and invokes the appropriate method
+    The lambda handler method: It resolves the proxy route and invokes the appropriate method, then
+    compresses large responses for clients that accept it
     """
-    return app.resolve(event, context)
+    return compress_response(app.resolve(event, context), event.get("headers"))
@@ -1,18 +1,168 @@
 """
 Token parsing module
+
+Tokens are verified against the Cognito user pool JWKS, which is cached in process and only
+re-fetched when a token is signed with an unknown key id. Verified claims are memoized until the
+token expires, so repeat requests from the same session skip decoding and signature checks.
 """
 
 # ==================================================================================================
 # Python imports
-import base64
-import json
+import threading
+import time
+from collections import OrderedDict
+from os import environ
+
+# ==================================================================================================
+# Third party imports
+import jwt
+
+# ==================================================================================================
+# Module-level imports
+from shared.lazy import lazy_import
+from shared.metrics import metrics
+
+# requests is only loaded when the signing keys are first fetched
+requests = lazy_import("requests")
+
+# ==================================================================================================
+# Global declarations
+REGION = environ.get("AWS_REGION", "us-east-1")
+USER_POOL_ID = environ.get("USER_POOL_ID", "")
+USER_POOL_CLIENT_ID = environ.get("USER_POOL_CLIENT_ID", "")
+ISSUER = environ.get("TOKEN_ISSUER", f"https://cognito-idp.{REGION}.amazonaws.com/{USER_POOL_ID}")
+JWKS_URL = environ.get("JWKS_URL", f"{ISSUER}/.well-known/jwks.json")
+# The routes read the user from ID token claims (cognito:username), so access tokens are refused
+TOKEN_USE = environ.get("TOKEN_USE", "id")
+# Cognito ID tokens carry the app client in `aud`, access tokens in `client_id`
+CLIENT_CLAIMS = {"id": "aud", "access": "client_id"}
+
+JWKS_TIMEOUT = 2
+# Unknown key ids trigger a refresh at most this often, so forged kids cannot hammer the JWKS endpoint
+JWKS_MIN_REFRESH_INTERVAL = 60
+CLAIMS_CACHE_SIZE = int(environ.get("CLAIMS_CACHE_SIZE", "1024"))
+ALGORITHMS = ["RS256"]
+
+
+class TokenError(Exception):
+    """
+    Raised when a token is malformed, expired or fails verification
+    """
+
+
+class JWKSCache:
+    """
+    In-process cache of the user pool signing keys, refreshed on key id miss
+    """
+
+    def __init__(self, url: str = JWKS_URL, min_refresh_interval: float = JWKS_MIN_REFRESH_INTERVAL) -> None:
+        self.url = url
+        self.min_refresh_interval = min_refresh_interval
+        self.keys: dict[str, jwt.PyJWK] = {}
+        self.fetched_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def get(self, kid: str) -> jwt.PyJWK:
+        key = self.keys.get(kid)
+        if key is None:
+            self.refresh()
+            key = self.keys.get(kid)
+        if key is None:
+            raise TokenError(f"Unknown signing key: {kid}")
+        return key
+
+    def refresh(self) -> None:
+        with self._lock:
+            if time.monotonic() - self.fetched_at < self.min_refresh_interval:
+                return
+            try:
+                with metrics.timer("http.jwks"):
+                    response = requests.get(self.url, timeout=JWKS_TIMEOUT)
+                response.raise_for_status()
+                key_set = jwt.PyJWKSet.from_dict(response.json())
+            except (requests.RequestException, ValueError, jwt.PyJWKSetError) as e:
+                raise TokenError(f"Could not fetch signing keys: {e}") from e
+            self.keys = {key.key_id: key for key in key_set.keys}
+            self.fetched_at = time.monotonic()
+
+
+class ClaimsCache:
+    """
+    Bounded LRU of verified claims keyed by token, each entry expiring at the token's `exp`
+    """
+
+    def __init__(self, max_size: int = CLAIMS_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> dict | None:
+        with self._lock:
+            claims = self._entries.get(token)
+            if claims is None:
+                return None
+            if claims["exp"] <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return claims
+
+    def put(self, token: str, claims: dict) -> None:
+        with self._lock:
+            self._entries[token] = claims
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+jwks = JWKSCache()
+claims_cache = ClaimsCache()
+
+
+def verify_token(token: str) -> dict:
+    """
+    Verify the token signature, issuer, expiry, use and audience and return its claims
+    """
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+        claims = jwt.decode(
+            token,
+            jwks.get(kid).key,
+            algorithms=ALGORITHMS,
+            issuer=ISSUER,
+            options={"require": ["exp", "iss"], "verify_aud": False},
+        )
+    except jwt.PyJWTError as e:
+        raise TokenError(str(e)) from e
+
+    if claims.get("token_use") != TOKEN_USE:
+        msg = f"Token is not an {TOKEN_USE} token"
+        raise TokenError(msg)
+
+    if USER_POOL_CLIENT_ID and claims.get(CLIENT_CLAIMS[TOKEN_USE]) != USER_POOL_CLIENT_ID:
+        msg = "Token was not issued for this client"
+        raise TokenError(msg)
+
+    return claims
 
 
 def parse_token(token: str) -> dict:
-    base64_token = token.split(".")[1]
-    # Replace URL-safe characters and add padding
-    base64_token = base64_token.replace("-", "+").replace("_", "/")
-    padding = len(base64_token) % 4
-    if padding:
-        base64_token += "=" * (4 - padding)
-    return json.loads(base64.b64decode(base64_token).decode("utf-8"))
+    """
+    Get the verified claims of an Authorization header value, memoized until the token expires
+    """
+    if not token:
+        msg = "Missing token"
+        raise TokenError(msg)
+    if token.startswith("Bearer "):
+        token = token[7:]
+
+    claims = claims_cache.get(token)
+    if claims is None:
+        claims = verify_token(token)
+        claims_cache.put(token, claims)
+
+    return claims
@@ -0,0 +1,227 @@
+"""
+Media upload module
+
+Uploads are S3 multipart uploads whose parts the app PUTs in parallel through presigned URLs.
+Media is keyed by the user and the SHA-256 the app computes over the file, so content the user
+already uploaded is reported as existing and never sent again, and an interrupted upload of the
+same content resumes where it stopped: starting it again lists the parts S3 already has and only
+presigns the missing ones. Content the media pipeline found INVALID can be uploaded again.
+"""
+
+# ==================================================================================================
+# Python imports
+import contextlib
+import math
+import time
+from os import environ
+
+# ==================================================================================================
+# Module-level imports
+from shared.aws import get_client, get_table
+from shared.media import CONTENT_HASH_PATTERN, INVALID, PROCESSED, UPLOADED, UPLOADING, media_key, media_record_key
+
+# ==================================================================================================
+# Global declarations
+BUCKET_NAME = environ.get("BUCKET_NAME")
+TABLE_NAME = environ.get("TABLE_NAME")
+
+MIB = 1024 * 1024
+MIN_PART_SIZE = 8 * MIB
+MAX_PARTS = 10_000
+MAX_UPLOAD_SIZE = int(environ.get("MAX_UPLOAD_SIZE", str(5 * 1024 * MIB)))
+URL_EXPIRY_SECONDS = int(environ.get("UPLOAD_URL_EXPIRY", "3600"))
+# Unfinished uploads are forgotten after this long; the bucket lifecycle aborts their parts
+UPLOAD_RECORD_TTL = 7 * 24 * 3600
+CONTENT_TYPE_PREFIXES = ("image/", "video/")
+# The content is stored: uploading it again is never needed
+STORED_STATUSES = (UPLOADED, PROCESSED)
+
+
+class UploadError(Exception):
+    """
+    Raised when an upload request is invalid or cannot be completed
+    """
+
+
+def part_size_for(size: int) -> int:
+    """
+    Get the part size for an upload: at least 8 MiB, in whole MiB, and never more than 10,000 parts
+    """
+    return max(MIN_PART_SIZE, math.ceil(size / MAX_PARTS / MIB) * MIB)
+
+
+def validate_hash(content_hash: str) -> None:
+    if not isinstance(content_hash, str) or not CONTENT_HASH_PATTERN.fullmatch(content_hash):
+        msg = "contentHash must be the lowercase hex SHA-256 of the file"
+        raise UploadError(msg)
+
+
+def validate(content_hash: str, size: int, content_type: str) -> None:
+    validate_hash(content_hash)
+    if not isinstance(size, int) or isinstance(size, bool) or not 0 < size <= MAX_UPLOAD_SIZE:
+        msg = f"size must be between 1 and {MAX_UPLOAD_SIZE} bytes"
+        raise UploadError(msg)
+    if not isinstance(content_type, str) or not content_type.startswith(CONTENT_TYPE_PREFIXES):
+        msg = "contentType must be an image or video type"
+        raise UploadError(msg)
+
+
+def list_uploaded_parts(object_key: str, upload_id: str) -> list[dict] | None:
+    """
+    Get the parts S3 already holds for an upload, or None when the upload no longer exists
+    """
+    s3 = get_client("s3")
+    parts = []
+    kwargs = {"Bucket": BUCKET_NAME, "Key": object_key, "UploadId": upload_id}
+    try:
+        while True:
+            response = s3.list_parts(**kwargs)
+            parts.extend(
+                {"PartNumber": part["PartNumber"], "ETag": part["ETag"], "Size": part["Size"]} for part in response.get("Parts", [])
+            )
+            if not response.get("IsTruncated"):
+                return parts
+            kwargs["PartNumberMarker"] = response["NextPartNumberMarker"]
+    except s3.exceptions.NoSuchUpload:
+        return None
+
+
+def presign_parts(object_key: str, upload_id: str, part_numbers: list[int]) -> list[dict]:
+    s3 = get_client("s3")
+    return [
+        {
+            "partNumber": part_number,
+            "url": s3.generate_presigned_url(
+                "upload_part",
+                Params={"Bucket": BUCKET_NAME, "Key": object_key, "UploadId": upload_id, "PartNumber": part_number},
+                ExpiresIn=URL_EXPIRY_SECONDS,
+            ),
+        }
+        for part_number in part_numbers
+    ]
+
+
+def start_upload(user_id: str, content_hash: str, size: int, content_type: str) -> dict:
+    """
+    Start or resume the upload of a user's media, or report that the content is already stored
+    """
+    validate(content_hash, size, content_type)
+    table = get_table(TABLE_NAME)
+    key = media_record_key(user_id, content_hash)
+    object_key = media_key(user_id, content_hash)
+
+    record = table.get_item(Key=key, ConsistentRead=True).get("Item")
+    if record and record["Status"] in STORED_STATUSES:
+        return {"status": "exists", "objectKey": object_key}
+
+    part_size = part_size_for(size)
+    uploaded = None
+    if record and record["Status"] == UPLOADING and record["Size"] == size and record["ContentType"] == content_type:
+        uploaded = list_uploaded_parts(object_key, record["UploadId"])
+
+    if uploaded is None:
+        record = create_upload(user_id, content_hash, size, content_type, previous=record)
+        uploaded = []
+
+    part_count = math.ceil(size / part_size)
+    done = {part["PartNumber"] for part in uploaded}
+    missing = [part_number for part_number in range(1, part_count + 1) if part_number not in done]
+    return {
+        "status": "pending",
+        "objectKey": object_key,
+        "uploadId": record["UploadId"],
+        "partSize": part_size,
+        "partCount": part_count,
+        "completedParts": sorted(done),
+        "parts": presign_parts(object_key, record["UploadId"], missing),
+        "expiresIn": URL_EXPIRY_SECONDS,
+    }
+
+
+def create_upload(user_id: str, content_hash: str, size: int, content_type: str, previous: dict | None) -> dict:
+    """
+    Create the multipart upload and its record. The record is only replaced if it is unchanged since it was read:
+    an upload in progress by its UploadId, a record of INVALID content by its Status
+    """
+    s3 = get_client("s3")
+    table = get_table(TABLE_NAME)
+    object_key = media_key(user_id, content_hash)
+    upload_id = s3.create_multipart_upload(Bucket=BUCKET_NAME, Key=object_key, ContentType=content_type)["UploadId"]
+
+    record = {
+        **media_record_key(user_id, content_hash),
+        "ObjectKey": object_key,
+        "ContentHash": content_hash,
+        "ContentType": content_type,
+        "Size": size,
+        "Status": UPLOADING,
+        "UploadId": upload_id,
+        "CreatedAt": int(time.time()),
+        "ExpiresAt": int(time.time()) + UPLOAD_RECORD_TTL,
+    }
+    if previous and previous["Status"] == UPLOADING:
+        condition = {"ConditionExpression": "UploadId = :previous", "ExpressionAttributeValues": {":previous": previous["UploadId"]}}
+    elif previous:
+        condition = {
+            "ConditionExpression": "#status = :previous",
+            "ExpressionAttributeNames": {"#status": "Status"},
+            "ExpressionAttributeValues": {":previous": previous["Status"]},
+        }
+    else:
+        condition = {"ConditionExpression": "attribute_not_exists(sk)"}
+
+    try:
+        table.put_item(Item=record, **condition)
+    except table.meta.client.exceptions.ConditionalCheckFailedException as e:
+        s3.abort_multipart_upload(Bucket=BUCKET_NAME, Key=object_key, UploadId=upload_id)
+        msg = "Another upload of this file was started, retry to resume it"
+        raise UploadError(msg) from e
+    return record
+
+
+def complete_upload(user_id: str, content_hash: str) -> dict:
+    """
+    Assemble the uploaded parts into the media object once every part is in S3
+    """
+    validate_hash(content_hash)
+    table = get_table(TABLE_NAME)
+    key = media_record_key(user_id, content_hash)
+    object_key = media_key(user_id, content_hash)
+
+    record = table.get_item(Key=key, ConsistentRead=True).get("Item")
+    if not record:
+        msg = "No upload was started for this file"
+        raise UploadError(msg)
+    if record["Status"] in STORED_STATUSES:
+        return {"status": "exists", "objectKey": object_key}
+    if record["Status"] == INVALID:
+        msg = "The stored file did not match its hash or is not readable media, start the upload again"
+        raise UploadError(msg)
+
+    uploaded = list_uploaded_parts(object_key, record["UploadId"])
+    if uploaded is None:
+        msg = "The upload expired, start it again"
+        raise UploadError(msg)
+    part_count = math.ceil(int(record["Size"]) / part_size_for(int(record["Size"])))
+    done = {part["PartNumber"] for part in uploaded}
+    missing = [part_number for part_number in range(1, part_count + 1) if part_number not in done]
+    if missing or sum(part["Size"] for part in uploaded) != record["Size"]:
+        msg = f"The upload is incomplete, missing parts: {missing[:20]}" if missing else "The uploaded parts do not add up to the file size"
+        raise UploadError(msg)
+
+    get_client("s3").complete_multipart_upload(
+        Bucket=BUCKET_NAME,
+        Key=object_key,
+        UploadId=record["UploadId"],
+        MultipartUpload={"Parts": [{"PartNumber": part["PartNumber"], "ETag": part["ETag"]} for part in uploaded]},
+    )
+    # The media pipeline, triggered by the completed object, may have got to the record first
+    with contextlib.suppress(table.meta.client.exceptions.ConditionalCheckFailedException):
+        table.update_item(
+            Key=key,
+            UpdateExpression="SET #status = :uploaded, UploadedAt = :now REMOVE UploadId, ExpiresAt",
+            ConditionExpression="#status = :uploading",
+            ExpressionAttributeNames={"#status": "Status"},
+            ExpressionAttributeValues={":uploaded": UPLOADED, ":uploading": UPLOADING, ":now": int(time.time())},
+        )
+    return {"status": "uploaded", "objectKey": object_key}
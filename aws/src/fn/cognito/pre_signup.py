@@ -5,71 +5,140 @@
 
 # ==================================================================================================
 # Python imports
+from functools import cache
 from os import environ
 
-# ==================================================================================================
-# Boto imports
-import boto3
-import requests
-
 # ==================================================================================================
 # Powertools imports and configuration
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
 # ==================================================================================================
 # Module imports
-from shared.logger import logger
+from shared.aws import get_table
+from shared.cache import TTLCache
+from shared.lazy import lazy_import
+from shared.logger import Lazy, invocation, logger
+from shared.metrics import metrics
+from shared.resilience import CircuitBreaker, Deadline
+
+# requests is only loaded when the first siteverify call is made
+requests = lazy_import("requests")
 
 # ==================================================================================================
 # Global declarations
 CAPATCHA_CUTOFF_SCORE = 0.5
+SECRET_CACHE_TTL = int(environ.get("SECRET_CACHE_TTL", "300"))
+
+# Cognito gives triggers 5 seconds, whatever the Lambda timeout is
+COGNITO_TRIGGER_TIMEOUT_MS = 5000
+DEADLINE_RESERVE_MS = int(environ.get("DEADLINE_RESERVE_MS", "500"))
+VERIFY_ATTEMPT_TIMEOUT = float(environ.get("VERIFY_ATTEMPT_TIMEOUT", "1.5"))
+VERIFY_MAX_ATTEMPTS = int(environ.get("VERIFY_MAX_ATTEMPTS", "3"))
+BREAKER_FAILURE_THRESHOLD = int(environ.get("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(environ.get("BREAKER_RESET_TIMEOUT", "30"))
+# What to do when siteverify cannot be reached in time: "reject" the signup or "allow" it
+VERIFY_FALLBACK_POLICY = environ.get("VERIFY_FALLBACK_POLICY", "reject")
 
 TABLE_NAME = environ.get("TABLE_NAME")
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table(TABLE_NAME)
-SITE_VERIFICATION_URL = "https://www.google.com/recaptcha/api/siteverify"
+SITE_VERIFICATION_URL = environ.get("SITE_VERIFICATION_URL", "https://www.google.com/recaptcha/api/siteverify")
 
+# ==================================================================================================
+# Global initializations
+# The secret cache, HTTP session and breaker survive across warm invocations: the secret is read once
+# per TTL and the siteverify connection is kept alive instead of being re-established on every signup
+breaker = CircuitBreaker(failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT)
 
-def get_recaptcha_secret() -> str:
+
+@cache
+def get_http_session() -> "requests.Session":
+    """
+    Get the keep-alive HTTP session, created on first use
+    """
+    session = requests.Session()
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4))
+    return session
+
+
+def load_secret(name: str) -> str:
     """
-    Get the reCaptcha secret from the environment
+    Load a secret from the APP#DATA/SECRETS item
     """
-    response = table.get_item(Key={"pk": "APP#DATA", "sk": "SECRETS"})
-    logger.info(f"Table response: {response}")
-    return response.get("Item").get("RECAPTCHA_SECRET_KEY")
+    response = get_table(TABLE_NAME).get_item(Key={"pk": "APP#DATA", "sk": "SECRETS"})
+    return response.get("Item").get(name)
+
+
+secrets = TTLCache(load_secret, ttl=SECRET_CACHE_TTL)
 
 
-def verify_recaptcha(recaptcha_token: str) -> bool:
+def get_recaptcha_secret() -> str:
     """
-    Verify the reCaptcha token
+    Get the reCaptcha secret, cached across warm invocations
     """
-    response = requests.post(
-        SITE_VERIFICATION_URL,
-        data={"secret": get_recaptcha_secret(), "response": recaptcha_token},
-        timeout=30,
-    )
+    secret = secrets.get("RECAPTCHA_SECRET_KEY")
+    invocation.append(secret_cache=Lazy(secrets.stats))
+    return secret
 
-    if response.raise_for_status():
-        return False
 
-    logger.info(f"Response: {response.json()}")
-    # Return true if the token is valid and the score is greater than 0.5
-    return response.json().get("success") and response.json().get("score") > CAPATCHA_CUTOFF_SCORE
+def fallback(reason: str) -> bool:
+    """
+    Apply the fallback policy when siteverify cannot give an answer
+    """
+    logger.warning(f"Recaptcha verification unavailable ({reason}), applying fallback policy: {VERIFY_FALLBACK_POLICY}")
+    return VERIFY_FALLBACK_POLICY == "allow"
 
 
+def verify_recaptcha(recaptcha_token: str, deadline: Deadline | None = None) -> bool:
+    """
+    Verify the reCaptcha token, retrying with short timeouts within the deadline
+    """
+    deadline = deadline or Deadline(COGNITO_TRIGGER_TIMEOUT_MS - DEADLINE_RESERVE_MS)
+
+    if not breaker.allow():
+        return fallback("circuit open")
+
+    data = {"secret": get_recaptcha_secret(), "response": recaptcha_token}
+
+    for attempt in range(1, VERIFY_MAX_ATTEMPTS + 1):
+        if deadline.expired():
+            break
+        try:
+            with metrics.timer("http.siteverify"):
+                response = get_http_session().post(SITE_VERIFICATION_URL, data=data, timeout=deadline.timeout(VERIFY_ATTEMPT_TIMEOUT))
+            response.raise_for_status()
+            result = response.json()
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Recaptcha verification attempt {attempt} failed: {e}")
+            breaker.record_failure()
+            if not breaker.allow():
+                return fallback("circuit open")
+            continue
+
+        breaker.record_success()
+        invocation.debug("Siteverify response", response=result)
+        if not result.get("success"):
+            return False
+        # A valid token without a usable score is no answer: null counts as 0, anything else not a number is unknown
+        score = result.get("score") or 0
+        if isinstance(score, bool) or not isinstance(score, int | float):
+            return fallback(f"non-numeric score {score!r}")
+        # Return true if the score is greater than 0.5
+        return score > CAPATCHA_CUTOFF_SCORE
+
+    return fallback("deadline exceeded")
+
+
+@metrics.log_metrics
+@invocation.log_invocation
 def trigger(event: dict, context: LambdaContext) -> dict:
     """
     Main entry point for the Lambda function
     """
-    logger.info(f"Event: {event}")
-    logger.info(f"Context: {context}")
-
     recaptcha_token = event.get("request").get("validationData").get("recaptchaToken")
-    logger.info(f"Recaptcha token: {recaptcha_token}")
 
-    verification_result = verify_recaptcha(recaptcha_token)
+    deadline = Deadline.from_context(context, cap_ms=COGNITO_TRIGGER_TIMEOUT_MS, reserve_ms=DEADLINE_RESERVE_MS)
+    verification_result = verify_recaptcha(recaptcha_token, deadline)
 
-    logger.info(f"Verification result: {verification_result}")
+    invocation.append(verified=verification_result)
 
     if not verification_result:
         msg = "Recaptcha verification failed. Please try again later"
@@ -0,0 +1,58 @@
+"""
+# --*-- coding: utf-8 --*--
+# This module dispatches the scheduled jobs that are due, invoked every minute by EventBridge
+"""
+
+# ==================================================================================================
+# Python imports
+import json
+from os import environ
+
+# ==================================================================================================
+# Powertools imports
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# ==================================================================================================
+# Module-level imports
+from shared.aws import get_client, get_table
+from shared.logger import invocation, logger
+from shared.metrics import metrics
+from shared.schedule import DEFAULT_LOOKBACK_BUCKETS, Dispatcher, ScheduleStore
+
+# ==================================================================================================
+# Global declarations
+TABLE_NAME = environ.get("TABLE_NAME")
+PUBLISH_QUEUE_URL = environ.get("PUBLISH_QUEUE_URL")
+LOOKBACK_BUCKETS = int(environ.get("DISPATCH_LOOKBACK_BUCKETS", str(DEFAULT_LOOKBACK_BUCKETS)))
+
+# ==================================================================================================
+
+
+def send_batch(jobs: list[dict]) -> list[str]:
+    """
+    Send up to 10 jobs to the publish queue in one call and return the ids of the jobs that failed
+    """
+    entries = [
+        {
+            "Id": job["JobId"],
+            "MessageBody": json.dumps({key: value for key, value in job.items() if key not in ("ClaimedBy", "ClaimExpires")}, default=str),
+        }
+        for job in jobs
+    ]
+    response = get_client("sqs").send_message_batch(QueueUrl=PUBLISH_QUEUE_URL, Entries=entries)
+    failed = response.get("Failed", [])
+    for failure in failed:
+        logger.warning(f"Could not send job {failure['Id']}: {failure.get('Message')}")
+    return [failure["Id"] for failure in failed]
+
+
+@metrics.log_metrics
+@invocation.log_invocation
+def main(_event: dict, context: LambdaContext) -> dict:
+    """
+    The lambda handler method: It claims the due jobs and sends them to the publish queue
+    """
+    dispatcher = Dispatcher(ScheduleStore(get_table(TABLE_NAME)), send_batch, owner=getattr(context, "aws_request_id", None))
+    stats = dispatcher.run(LOOKBACK_BUCKETS)
+    invocation.append(dispatch=stats)
+    return stats
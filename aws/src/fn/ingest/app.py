@@ -0,0 +1,172 @@
+"""
+# --*-- coding: utf-8 --*--
+# This module ingests the sources' feeds, invoked on a schedule by EventBridge: unchanged feeds cost a
+# 304, and the new entries of changed ones are written as articles
+"""
+
+# ==================================================================================================
+# Python imports
+import asyncio
+import time
+from collections import Counter
+from os import environ
+
+# ==================================================================================================
+# Third party imports
+import aiohttp
+
+# ==================================================================================================
+# Powertools imports
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# ==================================================================================================
+# Module-level imports
+from lib.feeds import UPDATED, Entry, Feed, FeedResult, Ingestor, feed_id, source_feeds
+from shared.dynamodb import get_data_table
+from shared.logger import invocation, logger
+from shared.metrics import metrics
+
+# ==================================================================================================
+# Global declarations
+TABLE_NAME = environ.get("TABLE_NAME")
+MAX_CONNECTIONS = int(environ.get("MAX_CONNECTIONS", "32"))
+REQUEST_TIMEOUT_SECONDS = float(environ.get("REQUEST_TIMEOUT_SECONDS", "10"))
+USER_AGENT = environ.get("FEED_USER_AGENT", "SnapNews/1.0 (+feed ingestion)")
+# Articles expire through the table TTL
+ARTICLE_RETENTION_SECONDS = 7 * 24 * 3600
+WRITE_WORKERS = 4
+
+CATALOGUE_KEY = {"pk": "APP#DATA", "sk": "SOURCES"}
+FEED_STATE_SK = "STATE"
+
+# The event loop and its HTTP session outlive the invocation, so warm invocations reuse open connections
+_loop = asyncio.new_event_loop()
+_sessions: dict[str, aiohttp.ClientSession] = {}
+
+# ==================================================================================================
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Get the pooled HTTP session; it must be called from a coroutine running on the module's loop
+    """
+    session = _sessions.get("default")
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=MAX_CONNECTIONS, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS),
+            headers={"User-Agent": USER_AGENT},
+        )
+        _sessions["default"] = session
+    return session
+
+
+def feed_state_key(url: str) -> dict:
+    return {"pk": f"FEED#{feed_id(url)}", "sk": FEED_STATE_SK}
+
+
+def load_partitions() -> list[str]:
+    """
+    Get every source partition from the catalogue item
+    """
+    catalogue = get_data_table(TABLE_NAME).get(
+        CATALOGUE_KEY,
+        ProjectionExpression="#partitions",
+        ExpressionAttributeNames={"#partitions": "Partitions"},
+    )
+    return sorted((catalogue or {}).get("Partitions", ()))
+
+
+def load_feeds(partitions: list[str]) -> list[Feed]:
+    """
+    Get the feeds of the sources in the given partitions (SOURCE#<country>#<language>); a URL shared
+    by several sources is fetched once
+    """
+    table = get_data_table(TABLE_NAME)
+    feeds: dict[str, Feed] = {}
+    for partition in partitions:
+        for source in table.query(
+            KeyConditionExpression="pk = :pk",
+            ExpressionAttributeValues={":pk": partition},
+            ProjectionExpression="pk, sk, Feeds",
+        ):
+            for feed in source_feeds(source):
+                feeds.setdefault(feed.url, feed)
+    return list(feeds.values())
+
+
+def load_states(feeds: list[Feed]) -> dict[str, dict]:
+    """
+    Get the stored state of each feed, by URL
+    """
+    items = get_data_table(TABLE_NAME).batch_get([feed_state_key(feed.url) for feed in feeds])
+    return {item["Url"]: item for item in items}
+
+
+def article(feed: Feed, entry: Entry, now: int) -> dict:
+    item = {
+        "pk": f"ARTICLE#{entry.key}",
+        "sk": "ARTICLE",
+        "Source": feed.source,
+        "Category": feed.category,
+        "Feed": feed.url,
+        "Guid": entry.guid,
+        "Link": entry.link,
+        "Title": entry.title,
+        "Published": entry.published,
+        "Summary": entry.summary,
+        "FetchedAt": now,
+        "ExpiresAt": now + ARTICLE_RETENTION_SECONDS,
+    }
+    return {name: value for name, value in item.items() if value is not None}
+
+
+def save(results: list[FeedResult], now: int) -> dict:
+    """
+    Write the new articles, each once however many feeds of its source gave it, then the state of the
+    changed feeds. A feed with an article left unwritten keeps its previous state, so the next cycle
+    fetches it in full and gives the entry again instead of taking it for seen
+    """
+    table = get_data_table(TABLE_NAME)
+    articles = {}
+    for result in results:
+        for entry in result.entries:
+            articles.setdefault(entry.key, article(result.feed, entry, now))
+    unprocessed = table.batch_write(puts=articles.values(), workers=WRITE_WORKERS)
+    unwritten = {request["PutRequest"]["Item"]["pk"].removeprefix("ARTICLE#") for request in unprocessed}
+
+    updated = [result for result in results if result.status == UPDATED]
+    saved = [result for result in updated if not any(entry.key in unwritten for entry in result.entries)]
+    states = [
+        {**feed_state_key(result.feed.url), "Url": result.feed.url, "CheckedAt": now, **{k: v for k, v in result.state.items() if v}}
+        for result in saved
+    ]
+    unprocessed_states = table.batch_write(puts=states, workers=WRITE_WORKERS)
+    return {
+        "articles": len(articles) - len(unwritten),
+        "unwritten": len(unwritten) + len(unprocessed_states),
+        "deferred": len(updated) - len(saved),
+    }
+
+
+async def fetch(feeds: list[Feed], states: dict[str, dict]) -> list[FeedResult]:
+    return await Ingestor(get_session()).fetch_all(feeds, states)
+
+
+@metrics.log_metrics
+@invocation.log_invocation
+def main(event: dict, context: LambdaContext) -> dict:  # noqa: ARG001
+    """
+    The lambda handler method: It fetches the feeds of the given source partitions (all of them by
+    default) and writes their new entries
+    """
+    partitions = (event or {}).get("partitions") or load_partitions()
+    feeds = load_feeds(partitions)
+    results = _loop.run_until_complete(fetch(feeds, load_states(feeds)))
+    for result in results:
+        if result.error:
+            logger.warning(f"Could not fetch {result.feed.url}: {result.error}")
+
+    stats = {"feeds": len(feeds), **Counter(result.status for result in results), **save(results, int(time.time()))}
+    invocation.append(ingest=stats, partitions=len(partitions))
+    return stats
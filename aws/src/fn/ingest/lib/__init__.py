@@ -0,0 +1,3 @@
+"""
+Just a docstring
+"""
@@ -0,0 +1,266 @@
+"""
+Feeds module
+
+Fetches the sources' feeds with conditional GETs over one pooled HTTP session. Each feed's ETag and
+Last-Modified are kept in its state item, so a feed that has not changed since the last cycle costs
+a 304 and no body. Changed feeds are parsed as they stream in (RSS and Atom), reading stops once a
+feed has given its newest entries, and entries are deduplicated by source and GUID or link against
+the ones the feed gave before.
+"""
+
+# ==================================================================================================
+# Python imports
+import asyncio
+import hashlib
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import NamedTuple
+from xml.etree.ElementTree import Element, ParseError, XMLPullParser
+
+# ==================================================================================================
+# Third party imports
+import aiohttp
+
+# ==================================================================================================
+# Module-level imports
+from shared.metrics import metrics
+
+# ==================================================================================================
+# Global declarations
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+
+MAX_CONCURRENT_REQUESTS = 16
+CHUNK_BYTES = 16 * 1024
+# Feeds list their newest entries first: what is past these limits was seen in earlier cycles
+MAX_FEED_BYTES = 2 * 1024 * 1024
+MAX_ENTRIES_PER_FEED = 100
+# Entry keys remembered per feed, to tell the entries it gave before from new ones
+MAX_RECENT_KEYS = 300
+MAX_SUMMARY_CHARS = 1000
+
+ENTRY_TAGS = {"item", "entry"}
+FIELD_TAGS = {
+    "guid": "guid",
+    "id": "guid",
+    "link": "link",
+    "title": "title",
+    "pubDate": "published",
+    "published": "published",
+    "updated": "published",
+    "description": "summary",
+    "summary": "summary",
+}
+
+
+class Feed(NamedTuple):
+    """
+    A feed URL of a source ("SOURCE#GB#en/NAME#BBC") under one of its categories
+    """
+
+    url: str
+    source: str
+    category: str
+
+
+class Entry(NamedTuple):
+    key: str
+    guid: str | None
+    link: str | None
+    title: str | None
+    published: int | None
+    summary: str | None
+
+
+class FeedResult(NamedTuple):
+    """
+    A fetched feed: its new entries and the state to store for the next cycle (None when unchanged)
+    """
+
+    feed: Feed
+    status: str
+    entries: list[Entry]
+    state: dict | None = None
+    error: str | None = None
+
+
+def feed_id(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()[:32]
+
+
+def entry_key(source: str, guid: str | None, link: str | None, title: str | None) -> str | None:
+    """
+    Get the key an entry is deduplicated by: a hash of its source and its GUID, else its link, else its
+    title. A GUID need not be a permalink ("1234" is one), so it is only unique within its source
+    """
+    identity = guid or link or title
+    return hashlib.sha256(f"{source}\n{identity}".encode()).hexdigest()[:32] if identity else None
+
+
+def source_feeds(source: dict) -> list[Feed]:
+    """
+    Get the feeds of a source item, whose Feeds map each category to a URL or a list of URLs
+    """
+    name = f"{source['pk']}/{source['sk']}"
+    feeds = {}
+    for category, urls in (source.get("Feeds") or {}).items():
+        for url in [urls] if isinstance(urls, str) else urls:
+            feeds.setdefault(url, Feed(url, name, category))
+    return list(feeds.values())
+
+
+def parse_date(value: str | None) -> int | None:
+    """
+    Get the epoch seconds of an RSS (RFC 822) or Atom (ISO 8601) date
+    """
+    if not value:
+        return None
+    for parse in (parsedate_to_datetime, datetime.fromisoformat):
+        try:
+            return int(parse(value).timestamp())
+        except (TypeError, ValueError, IndexError):
+            continue
+    return None
+
+
+def local_name(tag: str) -> str:
+    # "{http://www.w3.org/2005/Atom}entry" -> "entry"
+    return tag.rpartition("}")[2]
+
+
+class FeedParser:
+    """
+    Incremental RSS/Atom parser: feed() takes the next chunk of the document and returns the entries
+    it completed. Parsed entries are cleared, so memory stays flat however long the feed is
+    """
+
+    def __init__(self, source: str, max_entries: int = MAX_ENTRIES_PER_FEED) -> None:
+        self.source = source
+        self.max_entries = max_entries
+        self.count = 0
+        self._parser = XMLPullParser(events=("start", "end"))
+        self._fields: dict[str, str] | None = None
+        self._parents: list[Element] = []
+
+    @property
+    def done(self) -> bool:
+        return self.count >= self.max_entries
+
+    def feed(self, chunk: bytes) -> list[Entry]:
+        self._parser.feed(chunk)
+        entries = []
+        for event, element in self._parser.read_events():
+            if event == "start":
+                self._start(element)
+                continue
+            entry = self._end(element)
+            if entry and not self.done:
+                self.count += 1
+                entries.append(entry)
+        return entries
+
+    def _start(self, element: Element) -> None:
+        if local_name(element.tag) in ENTRY_TAGS:
+            self._fields = {}
+        elif self._fields is None:
+            self._parents.append(element)
+
+    def _end(self, element: Element) -> Entry | None:
+        name = local_name(element.tag)
+        if self._fields is None:
+            if self._parents and self._parents[-1] is element:
+                self._parents.pop()
+            return None
+        if name in ENTRY_TAGS:
+            entry = self._entry(self._fields)
+            self._fields = None
+            # Cleared and detached from the channel/feed element, so nothing of the entry is kept
+            element.clear()
+            if self._parents:
+                self._parents[-1].clear()
+            return entry
+        if name in FIELD_TAGS:
+            self._field(FIELD_TAGS[name], element)
+        return None
+
+    def _field(self, field: str, element: Element) -> None:
+        if field == "link" and element.get("href"):
+            # Atom: the entry's own page is the alternate link (the default relation)
+            if element.get("rel", "alternate") == "alternate":
+                self._fields.setdefault("link", element.get("href").strip())
+            return
+        text = (element.text or "").strip()
+        if text:
+            self._fields.setdefault(field, text)
+
+    def _entry(self, fields: dict[str, str]) -> Entry | None:
+        key = entry_key(self.source, fields.get("guid"), fields.get("link"), fields.get("title"))
+        if key is None:
+            return None
+        summary = fields.get("summary")
+        return Entry(
+            key=key,
+            guid=fields.get("guid"),
+            link=fields.get("link"),
+            title=fields.get("title"),
+            published=parse_date(fields.get("published")),
+            summary=summary[:MAX_SUMMARY_CHARS] if summary else None,
+        )
+
+
+class Ingestor:
+    """
+    Fetches feeds concurrently, at most `max_concurrency` at a time, with the validators of their state
+    ({ETag, LastModified, Recent}) from the previous cycle
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, max_concurrency: int = MAX_CONCURRENT_REQUESTS) -> None:
+        self.session = session
+        self.max_concurrency = max_concurrency
+
+    async def fetch_all(self, feeds: list[Feed], states: dict[str, dict]) -> list[FeedResult]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        return await asyncio.gather(*(self.fetch(feed, states.get(feed.url) or {}, semaphore) for feed in feeds))
+
+    async def fetch(self, feed: Feed, state: dict, semaphore: asyncio.Semaphore) -> FeedResult:
+        headers = {}
+        if state.get("ETag"):
+            headers["If-None-Match"] = state["ETag"]
+        if state.get("LastModified"):
+            headers["If-Modified-Since"] = state["LastModified"]
+
+        async with semaphore:
+            try:
+                with metrics.timer("http.feed"):
+                    async with self.session.get(feed.url, headers=headers) as response:
+                        if response.status == 304:  # noqa: PLR2004
+                            return FeedResult(feed, UNCHANGED, [])
+                        if response.status >= 300:  # noqa: PLR2004
+                            return FeedResult(feed, FAILED, [], error=f"HTTP {response.status}")
+                        entries = await self._read(response, feed.source)
+                        validators = {"ETag": response.headers.get("ETag"), "LastModified": response.headers.get("Last-Modified")}
+            except (aiohttp.ClientError, TimeoutError, ParseError) as e:
+                return FeedResult(feed, FAILED, [], error=f"{type(e).__name__}: {e}")
+
+        recent = state.get("Recent") or []
+        seen = set(recent)
+        fresh = []
+        for entry in entries:
+            if entry.key not in seen:
+                seen.add(entry.key)
+                fresh.append(entry)
+        state = {**validators, "Recent": ([entry.key for entry in fresh] + recent)[:MAX_RECENT_KEYS]}
+        return FeedResult(feed, UPDATED, fresh, state)
+
+    @staticmethod
+    async def _read(response: aiohttp.ClientResponse, source: str) -> list[Entry]:
+        parser = FeedParser(source)
+        entries = []
+        size = 0
+        async for chunk in response.content.iter_chunked(CHUNK_BYTES):
+            size += len(chunk)
+            entries.extend(parser.feed(chunk))
+            if parser.done or size >= MAX_FEED_BYTES:
+                break
+        return entries
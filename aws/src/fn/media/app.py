@@ -0,0 +1,177 @@
+"""
+# --*-- coding: utf-8 --*--
+# This module post-processes uploaded media: it checks the content hash, probes the metadata and
+# renders the platform-sized renditions ahead of publishing, triggered by S3 object-created events
+"""
+
+# ==================================================================================================
+# Python imports
+import hashlib
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from os import environ
+from pathlib import Path
+
+# ==================================================================================================
+# Powertools imports
+from aws_lambda_powertools.utilities.data_classes import S3Event, event_source
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# ==================================================================================================
+# Module-level imports
+from lib.probe import ProbeError, probe_image, probe_mp4
+from lib.renditions import render_all
+from shared.aws import get_client, get_table
+from shared.logger import Lazy, invocation, logger
+from shared.media import INVALID, PROCESSED, media_record_key, parse_media_key, rendition_key
+from shared.metrics import metrics
+
+# ==================================================================================================
+# Global declarations
+TABLE_NAME = environ.get("TABLE_NAME")
+# Images are processed in memory; larger ones are rejected
+MAX_IMAGE_SIZE = int(environ.get("MAX_IMAGE_SIZE", str(50 * 1024 * 1024)))
+# Poster frames of videos need ffmpeg (e.g. from a layer); without it videos only get their metadata
+FFMPEG_PATH = environ.get("FFMPEG_PATH", "/opt/bin/ffmpeg")
+POSTER_FRAME_SECONDS = 1.0
+HASH_CHUNK_SIZE = 1024 * 1024
+UPLOAD_WORKERS = 8
+
+# ==================================================================================================
+
+
+@metrics.log_metrics
+@invocation.log_invocation
+@event_source(data_class=S3Event)
+def main(event: S3Event, context: LambdaContext) -> dict:  # noqa: ARG001
+    """
+    The lambda handler method: It processes each media object in the event
+    """
+    results = {}
+    for record in event.records:
+        key = record.s3.get_object.key
+        results[key] = process_object(record.s3.bucket.name, key, record.s3.get_object.etag)
+    invocation.append(processed=Lazy(lambda: Counter(results.values())))
+    invocation.debug("Processed", results=results)
+    return results
+
+
+def process_object(bucket: str, key: str, etag: str) -> str:
+    """
+    Process one media object and return what happened to it. Re-running on the same object is a no-op
+    """
+    parsed = parse_media_key(key)
+    if parsed is None:
+        return "skipped"
+    user_id, content_hash = parsed
+
+    table = get_table(TABLE_NAME)
+    record = table.get_item(Key=media_record_key(user_id, content_hash), ConsistentRead=True).get("Item") or {}
+    if record.get("SourceETag") == etag and record.get("Status") in (PROCESSED, INVALID):
+        return "duplicate"
+
+    s3 = get_client("s3")
+    head = s3.head_object(Bucket=bucket, Key=key)
+    content_type = head.get("ContentType", "")
+    try:
+        if content_type.startswith("image/"):
+            metadata, renditions = process_image(bucket, key, head["ContentLength"], content_hash)
+        elif content_type.startswith("video/"):
+            metadata, renditions = process_video(bucket, key, head["ContentLength"], content_hash)
+        else:
+            msg = f"Unsupported content type: {content_type}"
+            raise ProbeError(msg)
+    except ProbeError as e:
+        logger.warning(f"Invalid media {key}: {e}")
+        return save_result(user_id, content_hash, etag, {"Status": INVALID, "Reason": str(e)})
+
+    keys = {name: rendition_key(user_id, content_hash, name) for name in renditions}
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+        list(
+            executor.map(
+                lambda name: s3.put_object(Bucket=bucket, Key=keys[name], Body=renditions[name], ContentType="image/jpeg"),
+                renditions,
+            ),
+        )
+    # DynamoDB takes numbers as Decimal
+    metadata = {name: Decimal(str(value)) if isinstance(value, float) else value for name, value in metadata.items()}
+    return save_result(user_id, content_hash, etag, {"Status": PROCESSED, "Metadata": metadata, "Renditions": keys})
+
+
+def save_result(user_id: str, content_hash: str, etag: str, attributes: dict) -> str:
+    """
+    Store the processing result on the media record, unless a run for the same object already did
+    """
+    table = get_table(TABLE_NAME)
+    values = {**attributes, "SourceETag": etag, "ProcessedAt": int(time.time())}
+    names = {f"#{name.lower()}": name for name in values}
+    try:
+        table.update_item(
+            Key=media_record_key(user_id, content_hash),
+            UpdateExpression="SET " + ", ".join(f"#{name.lower()} = :{name.lower()}" for name in values) + " REMOVE ExpiresAt, UploadId",
+            ConditionExpression="NOT (#sourceetag = :sourceetag AND #status IN (:processed, :invalid))",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues={
+                **{f":{name.lower()}": value for name, value in values.items()},
+                ":processed": PROCESSED,
+                ":invalid": INVALID,
+            },
+        )
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        return "duplicate"
+    return attributes["Status"].lower()
+
+
+def process_image(bucket: str, key: str, size: int, content_hash: str) -> tuple[dict, dict[str, bytes]]:
+    if size > MAX_IMAGE_SIZE:
+        msg = f"Image is larger than {MAX_IMAGE_SIZE} bytes"
+        raise ProbeError(msg)
+    data = get_client("s3").get_object(Bucket=bucket, Key=key)["Body"].read()
+    check_hash(hashlib.sha256(data).hexdigest(), content_hash)
+    metadata = {**probe_image(data), "size": size, "sha256": content_hash}
+    return metadata, render_all(data)
+
+
+def process_video(bucket: str, key: str, size: int, content_hash: str) -> tuple[dict, dict[str, bytes]]:
+    s3 = get_client("s3")
+    digest = hashlib.sha256()
+    for chunk in s3.get_object(Bucket=bucket, Key=key)["Body"].iter_chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    check_hash(digest.hexdigest(), content_hash)
+
+    def read_range(start: int, end: int) -> bytes:
+        return s3.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end - 1}")["Body"].read()
+
+    metadata = {**probe_mp4(read_range, size), "size": size, "sha256": content_hash}
+    frame = poster_frame(s3.generate_presigned_url("get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=300))
+    if frame is None:
+        return metadata, {}
+    return metadata, render_all(frame)
+
+
+def check_hash(actual: str, expected: str) -> None:
+    if actual != expected:
+        msg = f"Content hash mismatch: uploaded as {expected}, content is {actual}"
+        raise ProbeError(msg)
+
+
+def poster_frame(url: str) -> bytes | None:
+    """
+    Get a JPEG frame from early in a video with ffmpeg, which streams only what it needs from the URL
+    """
+    ffmpeg = FFMPEG_PATH if Path(FFMPEG_PATH).exists() else shutil.which("ffmpeg")
+    if not ffmpeg:
+        return None
+    with tempfile.TemporaryDirectory() as directory:
+        output = Path(directory) / "frame.jpg"
+        command = [ffmpeg, "-v", "error", "-ss", str(POSTER_FRAME_SECONDS), "-i", url, "-frames:v", "1", "-q:v", "2", str(output)]
+        completed = subprocess.run(command, capture_output=True, timeout=60, check=False)  # noqa: S603
+        if completed.returncode or not output.exists():
+            logger.warning(f"ffmpeg could not extract a frame: {completed.stderr[-500:]!r}")
+            return None
+        return output.read_bytes()
@@ -0,0 +1,132 @@
+"""
+Media probing module
+
+Reads the dimensions of images and the duration and dimensions of MP4/MOV videos. Videos are
+probed by walking their ISO BMFF boxes with ranged reads, so only the headers are fetched, not
+the whole file, and no ffprobe binary is needed.
+"""
+
+# ==================================================================================================
+# Python imports
+import struct
+from collections.abc import Callable
+from io import BytesIO
+
+# ==================================================================================================
+# Third party imports
+from PIL import Image, ImageOps
+
+# ==================================================================================================
+# Global declarations
+BOX_HEADER_SIZE = 8
+# The movie header box is read whole; anything larger is not a sane moov
+MAX_MOOV_SIZE = 64 * 1024 * 1024
+CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts"}
+
+
+class ProbeError(Exception):
+    """
+    Raised when a media file cannot be parsed
+    """
+
+
+def probe_image(data: bytes) -> dict:
+    """
+    Get the format and display dimensions of an image (EXIF rotation applied)
+    """
+    try:
+        with Image.open(BytesIO(data)) as image:
+            image_format = image.format
+            width, height = ImageOps.exif_transpose(image).size
+    except (OSError, Image.DecompressionBombError) as e:
+        msg = f"Unreadable image: {e}"
+        raise ProbeError(msg) from e
+    return {"kind": "image", "format": image_format, "width": width, "height": height}
+
+
+def iter_boxes(data: bytes, start: int = 0, end: int | None = None) -> list[tuple[bytes, int, int]]:
+    """
+    Get the (type, payload start, payload end) of the boxes in a byte range
+    """
+    end = len(data) if end is None else end
+    boxes = []
+    offset = start
+    while offset + BOX_HEADER_SIZE <= end:
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        header = BOX_HEADER_SIZE
+        if size == 1:
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header += 8
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            break
+        boxes.append((box_type, offset + header, offset + size))
+        offset += size
+    return boxes
+
+
+def find_moov(read_range: Callable[[int, int], bytes], size: int) -> bytes:
+    """
+    Fetch the moov box of a file by walking its top-level box headers
+    """
+    offset = 0
+    while offset + BOX_HEADER_SIZE <= size:
+        header = read_range(offset, min(offset + 16, size))
+        box_size, box_type = struct.unpack_from(">I4s", header)
+        header_size = BOX_HEADER_SIZE
+        if box_size == 1:
+            box_size = struct.unpack_from(">Q", header, 8)[0]
+            header_size += 8
+        elif box_size == 0:
+            box_size = size - offset
+        if box_size < header_size:
+            break
+        if box_type == b"moov":
+            if box_size > MAX_MOOV_SIZE:
+                break
+            return read_range(offset + header_size, offset + box_size)
+        offset += box_size
+    msg = "No moov box found, not an MP4/MOV file"
+    raise ProbeError(msg)
+
+
+def probe_mp4(read_range: Callable[[int, int], bytes], size: int) -> dict:
+    """
+    Get the duration and video dimensions of an MP4/MOV file. `read_range(start, end)` returns bytes [start, end)
+    """
+    try:
+        return _probe_mp4(read_range, size)
+    except (struct.error, IndexError) as e:
+        # A box shorter than the fields it must hold
+        msg = f"Malformed MP4 box: {e}"
+        raise ProbeError(msg) from e
+
+
+def _probe_mp4(read_range: Callable[[int, int], bytes], size: int) -> dict:
+    moov = find_moov(read_range, size)
+    duration = None
+    width = height = 0
+
+    def walk(start: int, end: int) -> None:
+        nonlocal duration, width, height
+        for box_type, payload_start, payload_end in iter_boxes(moov, start, end):
+            if box_type == b"mvhd":
+                version = moov[payload_start]
+                if version == 1:
+                    timescale, length = struct.unpack_from(">IQ", moov, payload_start + 20)
+                else:
+                    timescale, length = struct.unpack_from(">II", moov, payload_start + 12)
+                duration = length / timescale if timescale else None
+            elif box_type == b"tkhd" and not width:
+                # Width and height are 16.16 fixed point at the end of the box; audio tracks have 0x0
+                track_width, track_height = struct.unpack_from(">II", moov, payload_end - 8)
+                width, height = track_width >> 16, track_height >> 16
+            elif box_type in CONTAINER_BOXES:
+                walk(payload_start, payload_end)
+
+    walk(0, len(moov))
+    if duration is None:
+        msg = "No movie header found"
+        raise ProbeError(msg)
+    return {"kind": "video", "format": "mp4", "width": width, "height": height, "duration": round(duration, 3)}
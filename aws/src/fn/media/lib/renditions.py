@@ -0,0 +1,117 @@
+"""
+Renditions module
+
+Produces the platform-sized versions of an image (and of video poster frames). Each rendition is
+resized in its own process so they use every vCPU of the function. Lambda has no /dev/shm, which
+multiprocessing.Pool and ProcessPoolExecutor need, so the pool is made of plain processes and pipes.
+"""
+
+# ==================================================================================================
+# Python imports
+import multiprocessing
+import os
+from collections.abc import Callable
+from io import BytesIO
+from typing import Any
+
+# ==================================================================================================
+# Third party imports
+from PIL import Image, ImageOps
+
+# ==================================================================================================
+# Module-level imports
+from lib.probe import ProbeError
+
+# ==================================================================================================
+# Global declarations
+
+# Name -> (width, height). Images are cropped to the aspect ratio around their centre, then resized
+RENDITIONS = {
+    "square": (1080, 1080),  # Instagram feed
+    "portrait": (1080, 1350),  # Instagram portrait
+    "landscape": (1200, 675),  # X, Facebook link and 16:9 previews
+    "linkedin": (1200, 627),
+    "thumbnail": (320, 320),
+}
+JPEG_QUALITY = 85
+MAX_WORKERS = int(os.environ.get("RENDITION_WORKERS", str(os.cpu_count() or 1)))
+
+
+def render(data: bytes, size: tuple[int, int]) -> bytes:
+    """
+    Get one rendition of an image as JPEG. A body that is corrupt past the header the probe read raises ProbeError
+    """
+    try:
+        with Image.open(BytesIO(data)) as source:
+            # Decode JPEGs at a reduced scale when they are much larger than the target, whatever their orientation
+            source.draft("RGB", (max(size) * 2, max(size) * 2))
+            image = ImageOps.fit(ImageOps.exif_transpose(source).convert("RGB"), size, Image.Resampling.LANCZOS)
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        msg = f"Unreadable image: {e}"
+        raise ProbeError(msg) from e
+    output = BytesIO()
+    image.save(output, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def _child(connection: Any, function: Callable, args: tuple) -> None:  # noqa: ANN401
+    try:
+        connection.send((True, function(*args)))
+    except ProbeError as e:
+        connection.send((False, ProbeError(str(e))))
+    except Exception as e:  # noqa: BLE001
+        connection.send((False, RuntimeError(f"Rendition worker failed: {e!r}")))
+    finally:
+        connection.close()
+
+
+def parallel_map(function: Callable, args_list: list[tuple], workers: int = MAX_WORKERS) -> list:
+    """
+    Run function(*args) for each args in separate processes, at most `workers` at a time, keeping the order.
+    The first error raised by a child is raised once the children still running are stopped
+    """
+    if workers <= 1 or len(args_list) <= 1:
+        return [function(*args) for args in args_list]
+
+    context = multiprocessing.get_context("fork")
+    results: list = [None] * len(args_list)
+    pending = list(enumerate(args_list))
+    while pending:
+        running = []
+        for index, args in pending[:workers]:
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_child, args=(sender, function, args))
+            process.start()
+            sender.close()
+            running.append((index, process, receiver))
+        pending = pending[workers:]
+
+        failure = None
+        for index, process, receiver in running:
+            if failure is None:
+                try:
+                    ok, value = receiver.recv()
+                except EOFError:
+                    process.join()
+                    ok, value = False, RuntimeError(f"Rendition worker failed: exit code {process.exitcode}")
+                if ok:
+                    results[index] = value
+                else:
+                    failure = value
+            else:
+                # The batch has failed, so the other renditions are not needed
+                process.terminate()
+            process.join()
+            receiver.close()
+        if failure is not None:
+            raise failure
+    return results
+
+
+def render_all(data: bytes, renditions: dict[str, tuple[int, int]] = RENDITIONS) -> dict[str, bytes]:
+    """
+    Get every rendition of an image, rendered in parallel
+    """
+    names = list(renditions)
+    outputs = parallel_map(render, [(data, renditions[name]) for name in names])
+    return dict(zip(names, outputs, strict=True))
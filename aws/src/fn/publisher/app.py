@@ -0,0 +1,147 @@
+"""
+# --*-- coding: utf-8 --*--
+# This module publishes the dispatched jobs to the social platforms, consuming the publish queue.
+# Jobs over a rate limit or hitting a transient error are requeued with a delay
+"""
+
+# ==================================================================================================
+# Python imports
+import asyncio
+import json
+import math
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from os import environ
+
+# ==================================================================================================
+# Third party imports
+import aiohttp
+
+# ==================================================================================================
+# Powertools imports
+from aws_lambda_powertools.utilities.data_classes import SQSEvent, event_source
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# ==================================================================================================
+# Module-level imports
+from lib.platforms import load_platforms
+from lib.publisher import FAILED, MAX_DELAY_SECONDS, PUBLISHED, Outcome, Publisher
+from shared.aws import get_client, get_table
+from shared.cache import TTLCache
+from shared.logger import Lazy, invocation
+from shared.metrics import metrics
+from shared.ratelimit import TokenBucketStore
+from shared.schedule import FAILED as JOB_FAILED
+from shared.schedule import PUBLISHED as JOB_PUBLISHED
+from shared.schedule import ScheduleStore, chunks
+
+# ==================================================================================================
+# Global declarations
+TABLE_NAME = environ.get("TABLE_NAME")
+PUBLISH_QUEUE_URL = environ.get("PUBLISH_QUEUE_URL")
+PLATFORMS = load_platforms(environ.get("PLATFORM_LIMITS"), environ.get("PLATFORM_API_URL"))
+MAX_CONNECTIONS = int(environ.get("MAX_CONNECTIONS", "64"))
+REQUEST_TIMEOUT_SECONDS = float(environ.get("REQUEST_TIMEOUT_SECONDS", "20"))
+CREDENTIALS_CACHE_TTL = 300
+FINISH_WORKERS = 8
+
+# The event loop and its HTTP session outlive the invocation, so warm invocations reuse open connections
+_loop = asyncio.new_event_loop()
+_sessions: dict[str, aiohttp.ClientSession] = {}
+
+# ==================================================================================================
+
+
+def load_access_token(account: tuple[str, str, str]) -> str | None:
+    """
+    Get the access token of a user's connected account from its record
+    """
+    user_id, platform, account_id = account
+    item = (
+        get_table(TABLE_NAME)
+        .get_item(
+            Key={"pk": f"USER#{user_id}", "sk": f"ACCOUNT#{platform}#{account_id}"},
+            ProjectionExpression="AccessToken",
+        )
+        .get("Item")
+    )
+    return item.get("AccessToken") if item else None
+
+
+credentials_cache = TTLCache(load_access_token, CREDENTIALS_CACHE_TTL)
+
+
+def access_token(job: dict) -> str | None:
+    return credentials_cache.get((job["UserId"], job["Platform"], job["AccountId"]))
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Get the pooled HTTP session; it must be called from a coroutine running on the module's loop
+    """
+    session = _sessions.get("default")
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=MAX_CONNECTIONS, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS),
+        )
+        _sessions["default"] = session
+    return session
+
+
+async def publish(jobs: list[dict]) -> list[Outcome]:
+    return await Publisher(TokenBucketStore(get_table(TABLE_NAME)), PLATFORMS, get_session(), access_token).publish(jobs)
+
+
+def requeue(entries: list[tuple[str, Outcome]]) -> list[str]:
+    """
+    Send throttled and retried jobs back to the queue with their delays and return the message ids that could not be
+    """
+    failed = []
+    for batch in chunks(entries, 10):
+        response = get_client("sqs").send_message_batch(
+            QueueUrl=PUBLISH_QUEUE_URL,
+            Entries=[
+                {
+                    "Id": str(index),
+                    "MessageBody": json.dumps(outcome.job, default=str),
+                    "DelaySeconds": min(MAX_DELAY_SECONDS, math.ceil(outcome.delay)),
+                }
+                for index, (_, outcome) in enumerate(batch)
+            ],
+        )
+        failed.extend(batch[int(failure["Id"])][0] for failure in response.get("Failed", []))
+    return failed
+
+
+@metrics.log_metrics
+@invocation.log_invocation
+@event_source(data_class=SQSEvent)
+def main(event: SQSEvent, context: LambdaContext) -> dict:  # noqa: ARG001
+    """
+    The lambda handler method: It publishes the batch and reports the messages to redeliver
+    """
+    messages = [(record.message_id, record.json_body) for record in event.records]
+    outcomes = _loop.run_until_complete(publish([job for _, job in messages]))
+
+    store = ScheduleStore(get_table(TABLE_NAME))
+    now = time.time()
+    finished = [outcome for outcome in outcomes if outcome.status in (PUBLISHED, FAILED)]
+    with ThreadPoolExecutor(max_workers=FINISH_WORKERS) as executor:
+        list(
+            executor.map(
+                lambda outcome: store.finish(outcome.job, JOB_PUBLISHED if outcome.status == PUBLISHED else JOB_FAILED, now, outcome.error),
+                finished,
+            ),
+        )
+
+    pending = [
+        (message_id, outcome)
+        for (message_id, _), outcome in zip(messages, outcomes, strict=True)
+        if outcome.status not in (PUBLISHED, FAILED)
+    ]
+    failed_ids = requeue(pending)
+
+    invocation.append(published=Lazy(lambda: Counter(outcome.status for outcome in outcomes)), requeue_failures=len(failed_ids))
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in failed_ids]}
@@ -0,0 +1,60 @@
+"""
+Platforms module
+
+The social platforms posts are published to, with the rate limits they enforce per connected
+account and per app. The limits are the defaults of each platform's posting API and can be
+overridden without a deploy through the PLATFORM_LIMITS environment variable (JSON).
+"""
+
+# ==================================================================================================
+# Python imports
+import json
+from typing import NamedTuple
+
+# ==================================================================================================
+# Module-level imports
+from shared.ratelimit import TokenBucket
+
+# ==================================================================================================
+# Global declarations
+DAY_SECONDS = 24 * 3600
+
+
+class Platform(NamedTuple):
+    """
+    A platform's posting endpoint and its token bucket limits: burst capacity and refill rate in posts per second
+    """
+
+    name: str
+    url: str
+    account_capacity: float
+    account_rate: float
+    app_capacity: float
+    app_rate: float
+
+    def account_bucket(self, account_id: str) -> TokenBucket:
+        return TokenBucket(f"{self.name}/ACCOUNT#{account_id}", self.account_capacity, self.account_rate)
+
+    def app_bucket(self) -> TokenBucket:
+        return TokenBucket(self.name, self.app_capacity, self.app_rate)
+
+
+PLATFORMS = {
+    "x": Platform("x", "https://api.x.com/2/tweets", 10, 100 / DAY_SECONDS, 100, 10_000 / DAY_SECONDS),
+    "linkedin": Platform("linkedin", "https://api.linkedin.com/rest/posts", 10, 150 / DAY_SECONDS, 100, 100_000 / DAY_SECONDS),
+    "facebook": Platform("facebook", "https://graph.facebook.com/v21.0/me/feed", 10, 200 / 3600, 100, 5_000 / 3600),
+    "instagram": Platform("instagram", "https://graph.facebook.com/v21.0/me/media_publish", 5, 50 / DAY_SECONDS, 100, 5_000 / 3600),
+}
+
+
+def load_platforms(overrides: str | None = None, base_url: str | None = None) -> dict[str, Platform]:
+    """
+    Get the platforms with their limits overridden by a JSON object of {name: {field: value}}.
+    With `base_url` (e.g. a local mock), every platform posts to <base_url>/<name>
+    """
+    platforms = dict(PLATFORMS)
+    for name, fields in json.loads(overrides or "{}").items():
+        platforms[name] = platforms[name]._replace(**fields) if name in platforms else Platform(name=name, **fields)
+    if base_url:
+        platforms = {name: platform._replace(url=f"{base_url.rstrip('/')}/{name}") for name, platform in platforms.items()}
+    return platforms
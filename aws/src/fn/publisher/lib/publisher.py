@@ -0,0 +1,198 @@
+"""
+Publisher module
+
+Publishes a batch of jobs through the platforms' rate limits. Tokens are taken from the shared
+per-account and per-app buckets before any request is made, in one conditional update per
+bucket, so jobs over the limit are requeued with the delay after which the bucket will have
+refilled instead of being sent to collect a 429. The granted jobs are sent concurrently over one
+pooled HTTP session.
+"""
+
+# ==================================================================================================
+# Python imports
+import asyncio
+import random
+from collections import defaultdict
+from collections.abc import Callable
+from typing import NamedTuple
+
+# ==================================================================================================
+# Third party imports
+import aiohttp
+
+# ==================================================================================================
+# Module-level imports
+# isort: split
+from shared.metrics import metrics
+from shared.ratelimit import TokenBucketStore
+
+from lib.platforms import Platform
+
+# ==================================================================================================
+# Global declarations
+PUBLISHED = "published"
+# Over the rate limit: requeued with a delay, does not count as an attempt
+THROTTLED = "throttled"
+# Transient error (5xx, timeout, connection): requeued with backoff until MAX_ATTEMPTS
+RETRY = "retry"
+FAILED = "failed"
+
+MAX_ATTEMPTS = 5
+BASE_RETRY_SECONDS = 30
+MAX_DELAY_SECONDS = 900  # The SQS DelaySeconds limit
+DEFAULT_RETRY_AFTER_SECONDS = 60
+MAX_CONCURRENT_REQUESTS = 32
+# Jobs that get tokens within this many seconds wait for them in the invocation instead of taking a trip through the queue
+DEFAULT_HOLD_SECONDS = 5.0
+
+
+class Outcome(NamedTuple):
+    job: dict
+    status: str
+    delay: float = 0.0
+    error: str | None = None
+
+
+def retry_after_seconds(value: str | None) -> float:
+    """
+    Get the seconds of a Retry-After header given in seconds; HTTP dates and garbage fall back to the default
+    """
+    try:
+        return max(float(value), 1.0)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER_SECONDS
+
+
+def spread(jobs: list[dict], wait: float, rate: float) -> list[Outcome]:
+    """
+    Throttle jobs with delays one refill interval apart, so they come back as the bucket refills rather than all at once
+    """
+    return [Outcome(job, THROTTLED, wait + index / rate) for index, job in enumerate(jobs)]
+
+
+class Publisher:
+    """
+    Publishes jobs ({Platform, AccountId, ObjectKey, Text, ...}) and returns one Outcome per job, in input order.
+
+    `credentials` returns the access token of a job's account, or None when it is not connected.
+    Jobs throttled for less than what is left of `hold_seconds` are retried in place; the rest are
+    returned as THROTTLED with their delay.
+    """
+
+    def __init__(
+        self,
+        buckets: TokenBucketStore,
+        platforms: dict[str, Platform],
+        session: aiohttp.ClientSession,
+        credentials: Callable[[dict], str | None],
+        hold_seconds: float = DEFAULT_HOLD_SECONDS,
+    ) -> None:
+        self.buckets = buckets
+        self.platforms = platforms
+        self.session = session
+        self.credentials = credentials
+        self.hold_seconds = hold_seconds
+
+    async def publish(self, jobs: list[dict]) -> list[Outcome]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.hold_seconds
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        outcomes: dict[int, Outcome] = {}
+        pending = list(range(len(jobs)))
+        while True:
+            outcomes.update(await self._publish_round(jobs, pending, semaphore))
+            now = loop.time()
+            pending = [index for index in pending if outcomes[index].status == THROTTLED and now + outcomes[index].delay <= deadline]
+            if not pending:
+                return [outcomes[index] for index in range(len(jobs))]
+            await asyncio.sleep(min(outcomes[index].delay for index in pending))
+
+    async def _publish_round(self, jobs: list[dict], indexes: list[int], semaphore: asyncio.Semaphore) -> dict[int, Outcome]:
+        outcomes: dict[int, Outcome] = {}
+        grouped: dict[str, dict[str, list[int]]] = defaultdict(lambda: defaultdict(list))
+        for index in indexes:
+            job = jobs[index]
+            if job.get("Platform") not in self.platforms or not job.get("AccountId"):
+                outcomes[index] = Outcome(job, FAILED, error=f"Unknown platform or account: {job.get('Platform')}/{job.get('AccountId')}")
+            else:
+                grouped[job["Platform"]][job["AccountId"]].append(index)
+
+        results = await asyncio.gather(
+            *(self._publish_platform(self.platforms[name], accounts, jobs, semaphore) for name, accounts in grouped.items()),
+        )
+        for result in results:
+            outcomes.update(result)
+        return outcomes
+
+    async def _publish_platform(
+        self,
+        platform: Platform,
+        accounts: dict[str, list[int]],
+        jobs: list[dict],
+        semaphore: asyncio.Semaphore,
+    ) -> dict[int, Outcome]:
+        # Account tokens first, then as many app tokens as the accounts granted; the app's shortfall goes back to the accounts
+        account_ids = list(accounts)
+        grants = await asyncio.gather(
+            *(
+                asyncio.to_thread(self.buckets.acquire, platform.account_bucket(account_id), len(accounts[account_id]))
+                for account_id in account_ids
+            ),
+        )
+        total = sum(granted for granted, _ in grants)
+        app_granted, app_wait = await asyncio.to_thread(self.buckets.acquire, platform.app_bucket(), total) if total else (0, 0.0)
+
+        shortfall = total - app_granted
+        outcomes: dict[int, Outcome] = {}
+        sends, refunds = [], []
+        for account_id, (granted, wait) in zip(account_ids, grants, strict=True):
+            indexes = accounts[account_id]
+            bucket = platform.account_bucket(account_id)
+            taken = min(shortfall, granted)
+            shortfall -= taken
+            if taken:
+                refunds.append(asyncio.to_thread(self.buckets.refund, bucket, taken))
+                delay, rate = max(wait, app_wait), min(bucket.rate, platform.app_rate)
+            else:
+                delay, rate = wait, bucket.rate
+            throttled = indexes[granted - taken :]
+            outcomes.update(zip(throttled, spread([jobs[index] for index in throttled], delay, rate), strict=True))
+            sends.extend((index, self._send(platform, jobs[index], semaphore)) for index in indexes[: granted - taken])
+
+        results = await asyncio.gather(*(send for _, send in sends), *refunds)
+        outcomes.update(zip((index for index, _ in sends), results[: len(sends)], strict=True))
+        return outcomes
+
+    async def _send(self, platform: Platform, job: dict, semaphore: asyncio.Semaphore) -> Outcome:
+        token = await asyncio.to_thread(self.credentials, job)
+        if not token:
+            return Outcome(job, FAILED, error=f"Account {job['AccountId']} is not connected to {platform.name}")
+
+        body = {"text": job.get("Text", ""), "media": [job["ObjectKey"]] if job.get("ObjectKey") else []}
+        # Platforms that support it drop a request they already accepted, so a redelivered message cannot post twice
+        headers = {"Authorization": f"Bearer {token}", "Idempotency-Key": job["JobId"]}
+        async with semaphore:
+            try:
+                with metrics.timer(f"http.{platform.name}"):
+                    async with self.session.post(platform.url, json=body, headers=headers) as response:
+                        if response.status < 300:  # noqa: PLR2004
+                            return Outcome(job, PUBLISHED)
+                        if response.status == 429:  # noqa: PLR2004
+                            # Our buckets drifted from the platform's view: empty the account's so every worker backs off
+                            delay = retry_after_seconds(response.headers.get("Retry-After"))
+                            await asyncio.to_thread(self.buckets.penalize, platform.account_bucket(job["AccountId"]), delay)
+                            return Outcome(job, THROTTLED, delay)
+                        error = f"HTTP {response.status}: {(await response.text())[:200]}"
+                        if response.status < 500:  # noqa: PLR2004
+                            return Outcome(job, FAILED, error=error)
+            except (aiohttp.ClientError, TimeoutError) as e:
+                error = f"{type(e).__name__}: {e}"
+        return self._retry(job, error)
+
+    @staticmethod
+    def _retry(job: dict, error: str) -> Outcome:
+        attempts = int(job.get("Attempts", 0)) + 1
+        if attempts >= MAX_ATTEMPTS:
+            return Outcome(job, FAILED, error=error)
+        delay = random.uniform(0, min(MAX_DELAY_SECONDS, BASE_RETRY_SECONDS * 2**attempts))  # noqa: S311
+        return Outcome({**job, "Attempts": attempts}, RETRY, delay, error)
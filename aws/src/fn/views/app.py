@@ -0,0 +1,68 @@
+"""
+# --*-- coding: utf-8 --*--
+# This module keeps the per-user home views up to date from the table's stream of job changes
+"""
+
+# ==================================================================================================
+# Python imports
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from os import environ
+
+# ==================================================================================================
+# Powertools imports
+from aws_lambda_powertools.utilities.data_classes import DynamoDBStreamEvent, event_source
+from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import DynamoDBRecordEventName
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# ==================================================================================================
+# Module-level imports
+from shared.aws import get_table
+from shared.logger import invocation, logger
+from shared.metrics import metrics
+from shared.schedule import JOB_PREFIX
+from shared.views import HomeViewStore
+
+# ==================================================================================================
+# Global declarations
+TABLE_NAME = environ.get("TABLE_NAME")
+UPDATE_WORKERS = 8
+
+# ==================================================================================================
+
+
+@metrics.log_metrics
+@invocation.log_invocation
+@event_source(data_class=DynamoDBStreamEvent)
+def main(event: DynamoDBStreamEvent, context: LambdaContext) -> dict:  # noqa: ARG001
+    """
+    The lambda handler method: It applies the latest state of each changed job to its user's view and
+    reports the records of users whose view could not be updated, so they are retried
+    """
+    changes: dict[str, list[tuple[str, dict | None, dict | None]]] = defaultdict(list)
+    for record in event.records:
+        if not record.dynamodb.keys.get("sk", "").startswith(JOB_PREFIX):
+            continue
+        old = record.dynamodb.old_image or None
+        new = None if record.event_name == DynamoDBRecordEventName.REMOVE else record.dynamodb.new_image or None
+        job = new or old
+        if not job or not job.get("UserId"):
+            continue
+        # Records of an item arrive in order, so the last one is its current state
+        changes[job["UserId"]].append((record.dynamodb.sequence_number, old, new))
+
+    store = HomeViewStore(get_table(TABLE_NAME))
+
+    def apply(user_id: str) -> str | None:
+        try:
+            store.apply(user_id, changes[user_id])
+        except Exception:  # noqa: BLE001
+            logger.exception(f"Could not update the home view of {user_id}")
+            return user_id
+        return None
+
+    with ThreadPoolExecutor(max_workers=UPDATE_WORKERS) as executor:
+        failed = [user_id for user_id in executor.map(apply, changes) if user_id]
+
+    invocation.append(updated=len(changes) - len(failed), failed=len(failed))
+    return {"batchItemFailures": [{"itemIdentifier": sequence} for user_id in failed for sequence, _, _ in changes[user_id]]}
@@ -0,0 +1,53 @@
+"""
+# --coding: utf-8 --
+# AWS Utilities
+# Lazily created AWS clients and resources, shared across warm invocations
+"""
+
+# ==================================================================================================
+# Python imports
+import threading
+from functools import cache
+from typing import Any
+
+# ==================================================================================================
+# Module-level imports
+from shared.metrics import metrics
+
+# ==================================================================================================
+# Global declarations
+_lock = threading.Lock()
+
+# ==================================================================================================
+
+
+@cache
+def get_client(service_name: str) -> Any:  # noqa: ANN401
+    """
+    Get a boto3 client, created (and boto3 imported) on first use
+    """
+    with _lock:
+        import boto3  # noqa: PLC0415
+
+        return metrics.instrument(boto3.client(service_name))
+
+
+@cache
+def get_resource(service_name: str) -> Any:  # noqa: ANN401
+    """
+    Get a boto3 resource, created (and boto3 imported) on first use
+    """
+    with _lock:
+        import boto3  # noqa: PLC0415
+
+        resource = boto3.resource(service_name)
+        metrics.instrument(resource.meta.client)
+        return resource
+
+
+@cache
+def get_table(table_name: str) -> Any:  # noqa: ANN401
+    """
+    Get a DynamoDB Table resource, created on first use
+    """
+    return get_resource("dynamodb").Table(table_name)
@@ -0,0 +1,89 @@
+"""
+# --coding: utf-8 --
+# Cache Utilities
+# In-process caches that survive across warm Lambda invocations
+"""
+
+# ==================================================================================================
+# Python imports
+import threading
+import time
+from collections.abc import Callable, Hashable
+from typing import Any
+
+# ==================================================================================================
+
+
+class TTLCache:
+    """
+    Caches the values returned by a loader for `ttl` seconds.
+
+    Once an entry is older than `refresh_ahead * ttl` the next get reloads it within the invocation;
+    Lambda freezes the process between invocations, so a background reload could be left half done.
+    If that reload fails the stale entry is served until it expires. Expired entries must reload.
+    """
+
+    def __init__(self, loader: Callable[[Hashable], Any], ttl: float, refresh_ahead: float = 0.8) -> None:
+        self.loader = loader
+        self.ttl = ttl
+        self.refresh_after = ttl * refresh_ahead
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self._entries: dict[Hashable, tuple[Any, float]] = {}
+        self._refreshing: set[Hashable] = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:  # noqa: ANN401
+        """
+        Get the cached value for a key, loading it if missing or expired
+        """
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is None or now - entry[1] >= self.ttl:
+            self.misses += 1
+            return self._load(key)
+
+        self.hits += 1
+        if now - entry[1] >= self.refresh_after:
+            return self._refresh(key, entry[0])
+
+        return entry[0]
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """
+        Drop a single key, or every key when none is given
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        """
+        Get the hit/miss counters of the cache
+        """
+        return {"hits": self.hits, "misses": self.misses, "refreshes": self.refreshes, "size": len(self._entries)}
+
+    def _load(self, key: Hashable) -> Any:  # noqa: ANN401
+        value = self.loader(key)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+        return value
+
+    def _refresh(self, key: Hashable, stale: Any) -> Any:  # noqa: ANN401
+        # One thread reloads a key at a time; the others keep serving the stale value meanwhile
+        with self._lock:
+            if key in self._refreshing:
+                return stale
+            self._refreshing.add(key)
+        self.refreshes += 1
+        try:
+            return self._load(key)
+        except Exception:  # noqa: BLE001
+            return stale
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
@@ -0,0 +1,292 @@
+"""
+# --coding: utf-8 --
+# DynamoDB Utilities
+# A data-access layer over the low-level client: plain values in and out through a fast attribute
+# (de)serializer, batched reads and writes with retries, and paginated queries
+"""
+
+# ==================================================================================================
+# Python imports
+import math
+import random
+import time
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from functools import cache
+from typing import Any
+
+# ==================================================================================================
+# Module-level imports
+from shared.aws import get_client
+
+# ==================================================================================================
+# Global declarations
+
+# BatchGetItem takes up to 100 keys and BatchWriteItem up to 25 requests; what DynamoDB leaves
+# unprocessed (or throttles) is retried with full-jitter backoff
+BATCH_GET_SIZE = 100
+BATCH_WRITE_SIZE = 25
+MAX_BATCH_ATTEMPTS = 6
+BASE_BACKOFF_SECONDS = 0.05
+MAX_BACKOFF_SECONDS = 1.0
+RETRYABLE_ERROR_CODES = frozenset({"ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded"})
+
+# Request parameters that carry attribute values
+VALUE_PARAMETERS = ("Key", "Item", "ExclusiveStartKey", "ExpressionAttributeValues")
+
+# ==================================================================================================
+# Attribute (de)serialization
+#
+# boto3's TypeSerializer/TypeDeserializer check each value against every type in turn and build
+# numbers through a Decimal context; here the encoder is looked up by the value's exact type.
+# Numbers come back as int when they are integers and as Decimal otherwise, and binary values as bytes
+
+
+def _number(value: int | Decimal) -> dict:
+    if isinstance(value, Decimal) and not value.is_finite():
+        msg = f"DynamoDB numbers must be finite, not {value}"
+        raise ValueError(msg)
+    return {"N": str(value)}
+
+
+def _float(value: float) -> dict:
+    if not math.isfinite(value):
+        msg = f"DynamoDB numbers must be finite, not {value}"
+        raise ValueError(msg)
+    return {"N": repr(value)}
+
+
+def _map(value: Mapping) -> dict:
+    return {"M": {key: serialize(item) for key, item in value.items()}}
+
+
+def _list(value: Iterable) -> dict:
+    return {"L": [serialize(item) for item in value]}
+
+
+def _set(value: set | frozenset) -> dict:
+    first = next(iter(value), None)
+    if isinstance(first, str):
+        return {"SS": list(value)}
+    if isinstance(first, bytes | bytearray):
+        return {"BS": [bytes(item) for item in value]}
+    if isinstance(first, int | float | Decimal) and not isinstance(first, bool):
+        return {"NS": [serialize(item)["N"] for item in value]}
+    msg = "DynamoDB sets must be non-empty sets of strings, numbers or bytes"
+    raise TypeError(msg)
+
+
+_ENCODERS: dict[type, Callable[[Any], dict]] = {
+    str: lambda value: {"S": value},
+    bool: lambda value: {"BOOL": value},
+    int: _number,
+    Decimal: _number,
+    float: _float,
+    type(None): lambda _value: {"NULL": True},
+    bytes: lambda value: {"B": value},
+    bytearray: lambda value: {"B": bytes(value)},
+    dict: _map,
+    list: _list,
+    tuple: _list,
+    set: _set,
+    frozenset: _set,
+}
+
+
+def _encoder(value: Any) -> Callable[[Any], dict]:  # noqa: ANN401
+    """
+    Get the encoder of a value whose type is not in _ENCODERS (a subclass or another mapping)
+    """
+    for kind, encoder in _ENCODERS.items():
+        if kind is not type(None) and isinstance(value, kind):
+            return encoder
+    if isinstance(value, Mapping):
+        return _map
+    msg = f"Unsupported type for DynamoDB: {type(value).__name__}"
+    raise TypeError(msg)
+
+
+def serialize(value: Any) -> dict:  # noqa: ANN401
+    """
+    Get the typed attribute of a plain value, e.g. "a" -> {"S": "a"}
+    """
+    encoder = _ENCODERS.get(type(value))
+    return (encoder or _encoder(value))(value)
+
+
+def _to_number(value: str) -> int | Decimal:
+    return int(value) if value.lstrip("-").isdigit() else Decimal(value)
+
+
+_DECODERS: dict[str, Callable[[Any], Any]] = {
+    "S": lambda value: value,
+    "N": _to_number,
+    "BOOL": lambda value: value,
+    "NULL": lambda _value: None,
+    "B": bytes,
+    "M": lambda value: {key: deserialize(item) for key, item in value.items()},
+    "L": lambda value: [deserialize(item) for item in value],
+    "SS": set,
+    "NS": lambda value: {_to_number(item) for item in value},
+    "BS": lambda value: {bytes(item) for item in value},
+}
+
+
+def deserialize(attribute: Mapping[str, Any]) -> Any:  # noqa: ANN401
+    """
+    Get the plain value of a typed attribute, e.g. {"N": "1"} -> 1
+    """
+    ((kind, value),) = attribute.items()
+    return _DECODERS[kind](value)
+
+
+def serialize_item(item: Mapping[str, Any]) -> dict:
+    return {name: serialize(value) for name, value in item.items()}
+
+
+def deserialize_item(item: Mapping[str, Any]) -> dict:
+    return {name: deserialize(attribute) for name, attribute in item.items()}
+
+
+def backoff(attempt: int) -> None:
+    if attempt:
+        time.sleep(random.uniform(0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2**attempt)))  # noqa: S311
+
+
+# ==================================================================================================
+# Tables
+
+
+class UnprocessedKeysError(Exception):
+    """
+    Raised when a batch read still has unprocessed keys after every attempt
+    """
+
+    def __init__(self, keys: list[dict]) -> None:
+        super().__init__(f"{len(keys)} key(s) left unprocessed")
+        self.keys = keys
+
+
+class Table:
+    """
+    A DynamoDB table that takes and returns plain values. Request parameters are those of the client,
+    with plain values in Key, Item, ExclusiveStartKey and ExpressionAttributeValues
+    """
+
+    def __init__(self, name: str, client: Any = None) -> None:  # noqa: ANN401
+        self.name = name
+        self._client = client
+
+    @property
+    def client(self) -> Any:  # noqa: ANN401
+        # The shared client of shared.aws, built (and boto3 imported) on first use
+        return self._client or get_client("dynamodb")
+
+    def _params(self, params: dict) -> dict:
+        params = {"TableName": self.name, **params}
+        for name in VALUE_PARAMETERS:
+            if params.get(name) is not None:
+                params[name] = serialize_item(params[name])
+        return params
+
+    def get(self, key: dict, **params: Any) -> dict | None:  # noqa: ANN401
+        """
+        Get an item by its key, or None when there is none
+        """
+        item = self.client.get_item(**self._params({"Key": key, **params})).get("Item")
+        return deserialize_item(item) if item is not None else None
+
+    def put(self, item: dict, **params: Any) -> None:  # noqa: ANN401
+        self.client.put_item(**self._params({"Item": item, **params}))
+
+    def delete(self, key: dict, **params: Any) -> None:  # noqa: ANN401
+        self.client.delete_item(**self._params({"Key": key, **params}))
+
+    def pages(self, **params: Any) -> Iterator[tuple[list[dict], dict | None]]:  # noqa: ANN401
+        """
+        Query page by page, yielding each page's items and the key to resume after it (None on the last page)
+        """
+        params = self._params(params)
+        while True:
+            response = self.client.query(**params)
+            last_key = response.get("LastEvaluatedKey")
+            yield [deserialize_item(item) for item in response.get("Items", [])], deserialize_item(last_key) if last_key else None
+            if not last_key:
+                return
+            params["ExclusiveStartKey"] = last_key
+
+    def query(self, **params: Any) -> Iterator[dict]:  # noqa: ANN401
+        """
+        Query every matching item, fetching the pages as they are consumed
+        """
+        for items, _ in self.pages(**params):
+            yield from items
+
+    def batch_get(self, keys: Iterable[dict], **params: Any) -> list[dict]:  # noqa: ANN401
+        """
+        Get the items of many keys (in no particular order; missing items are left out), 100 keys
+        per request. params are those of the table's KeysAndAttributes, e.g. ConsistentRead
+        """
+        unique = {tuple(sorted(key.items())): key for key in keys}
+        requests = [serialize_item(key) for key in unique.values()]
+        items = []
+        for offset in range(0, len(requests), BATCH_GET_SIZE):
+            items.extend(self._batch_get(requests[offset : offset + BATCH_GET_SIZE], params))
+        return items
+
+    def _batch_get(self, keys: list[dict], params: dict) -> list[dict]:
+        items = []
+        for attempt in range(MAX_BATCH_ATTEMPTS):
+            backoff(attempt)
+            try:
+                response = self.client.batch_get_item(RequestItems={self.name: {"Keys": keys, **params}})
+            except self.client.exceptions.ClientError as e:
+                if e.response["Error"]["Code"] not in RETRYABLE_ERROR_CODES:
+                    raise
+                continue
+            items.extend(deserialize_item(item) for item in response.get("Responses", {}).get(self.name, []))
+            keys = response.get("UnprocessedKeys", {}).get(self.name, {}).get("Keys", [])
+            if not keys:
+                return items
+        raise UnprocessedKeysError([deserialize_item(key) for key in keys])
+
+    def batch_write(self, puts: Iterable[dict] = (), deletes: Iterable[dict] = (), workers: int = 1) -> list[dict]:
+        """
+        Put and delete many items, 25 per request from up to `workers` threads. Returns the requests
+        left unprocessed after every attempt, as {"PutRequest": {"Item": item}} or {"DeleteRequest": {"Key": key}}
+        """
+        requests = [{"PutRequest": {"Item": serialize_item(item)}} for item in puts]
+        requests += [{"DeleteRequest": {"Key": serialize_item(key)}} for key in deletes]
+        chunks = [requests[offset : offset + BATCH_WRITE_SIZE] for offset in range(0, len(requests), BATCH_WRITE_SIZE)]
+        if workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                unprocessed = [request for left in executor.map(self._batch_write, chunks) for request in left]
+        else:
+            unprocessed = [request for chunk in chunks for request in self._batch_write(chunk)]
+        return [
+            {kind: {name: deserialize_item(value) for name, value in request.items()} for kind, request in unprocessed_request.items()}
+            for unprocessed_request in unprocessed
+        ]
+
+    def _batch_write(self, requests: list[dict]) -> list[dict]:
+        for attempt in range(MAX_BATCH_ATTEMPTS):
+            backoff(attempt)
+            try:
+                response = self.client.batch_write_item(RequestItems={self.name: requests})
+            except self.client.exceptions.ClientError as e:
+                if e.response["Error"]["Code"] not in RETRYABLE_ERROR_CODES:
+                    raise
+                continue
+            requests = response.get("UnprocessedItems", {}).get(self.name, [])
+            if not requests:
+                return []
+        return requests
+
+
+@cache
+def get_data_table(table_name: str) -> Table:
+    """
+    Get a Table of the shared DynamoDB client, created on first use
+    """
+    return Table(table_name)
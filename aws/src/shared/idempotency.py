@@ -0,0 +1,212 @@
+"""
+# --coding: utf-8 --
+# Idempotency Utilities
+# A route decorator that stores each mutating request's response and replays it for repeats
+"""
+
+# ==================================================================================================
+# Python imports
+import base64
+import contextlib
+import functools
+import hashlib
+import json
+import time
+from collections.abc import Callable
+from os import environ
+from typing import Any
+
+# ==================================================================================================
+# Powertools imports
+from aws_lambda_powertools.event_handler import APIGatewayRestResolver, Response
+from aws_lambda_powertools.event_handler.exceptions import ServiceError
+
+# ==================================================================================================
+# Module-level imports
+from shared.aws import get_table
+from shared.uuid import uuid7
+
+# ==================================================================================================
+# Global declarations
+
+# One record per request: pk = IDEMPOTENCY#<key>, sk = RECORD, expiring through the table TTL
+RECORD_PREFIX = "IDEMPOTENCY#"
+RECORD_SK = "RECORD"
+IN_PROGRESS = "IN_PROGRESS"
+COMPLETED = "COMPLETED"
+
+# Clients can send their own key; without one, the hash of the request is the key
+KEY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+DEFAULT_TTL_SECONDS = int(environ.get("IDEMPOTENCY_TTL_SECONDS", "3600"))
+# A request that is still in progress after this long is taken to have died, and a retry may run it again
+IN_PROGRESS_LEASE_SECONDS = 30
+# A concurrent duplicate waits this long for the first request's response before getting a 409
+DUPLICATE_WAIT_SECONDS = 2.0
+DUPLICATE_POLL_SECONDS = 0.1
+
+# ==================================================================================================
+
+
+def request_hash(event: Any, scope: str) -> str:  # noqa: ANN401
+    """
+    Hash what makes two requests the same: caller, method, path, query and body (JSON compared canonically)
+    """
+    body = event.decoded_body or ""
+    with contextlib.suppress(ValueError):
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+    query = sorted((event.query_string_parameters or {}).items())
+    payload = json.dumps([scope, event.http_method, event.path, query, body], separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def dump_response(response: Any) -> str:  # noqa: ANN401
+    if isinstance(response, Response):
+        body = response.body
+        encoded = isinstance(body, bytes)
+        return json.dumps(
+            {
+                "response": {
+                    "status_code": response.status_code,
+                    "headers": dict(response.headers),
+                    "body": base64.b64encode(body).decode() if encoded else body,
+                },
+                "base64": encoded,
+            },
+            default=str,
+        )
+    return json.dumps({"value": response}, default=str)
+
+
+def load_response(stored: str) -> Any:  # noqa: ANN401
+    data = json.loads(stored)
+    if "value" in data:
+        return data["value"]
+    fields = data["response"]
+    body = base64.b64decode(fields["body"]) if data["base64"] else fields["body"]
+    return Response(status_code=fields["status_code"], body=body, headers={**fields["headers"], REPLAYED_HEADER: "true"})
+
+
+class IdempotencyStore:
+    """
+    Idempotency records in the single table. Claiming a key is one conditional put, so of several
+    concurrent duplicates exactly one runs the route
+    """
+
+    def __init__(self, table: Any, ttl: int = DEFAULT_TTL_SECONDS) -> None:  # noqa: ANN401
+        self.table = table
+        self.ttl = ttl
+
+    def claim(self, key: str, request: str, owner: str, now: float) -> tuple[bool, dict | None]:
+        """
+        Claim a key for a request. Returns whether it was claimed and, if not, the record holding it
+        """
+        try:
+            self.table.put_item(
+                Item={
+                    "pk": RECORD_PREFIX + key,
+                    "sk": RECORD_SK,
+                    "Status": IN_PROGRESS,
+                    "RequestHash": request,
+                    "Owner": owner,
+                    "LeaseExpires": int(now) + IN_PROGRESS_LEASE_SECONDS,
+                    "ExpiresAt": int(now) + self.ttl,
+                },
+                # Expired records linger until the TTL deletes them, and abandoned claims lapse with their lease
+                ConditionExpression="attribute_not_exists(pk) OR ExpiresAt < :now OR (#status = :in_progress AND LeaseExpires < :now)",
+                ExpressionAttributeNames={"#status": "Status"},
+                ExpressionAttributeValues={":now": int(now), ":in_progress": IN_PROGRESS},
+            )
+        except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+            return False, self.get(key)
+        return True, None
+
+    def get(self, key: str) -> dict | None:
+        return self.table.get_item(Key={"pk": RECORD_PREFIX + key, "sk": RECORD_SK}, ConsistentRead=True).get("Item")
+
+    def complete(self, key: str, owner: str, response: str) -> None:
+        """
+        Store the response of a claimed request, unless its lease lapsed and another request took the key over
+        """
+        with contextlib.suppress(self.table.meta.client.exceptions.ConditionalCheckFailedException):
+            self.table.update_item(
+                Key={"pk": RECORD_PREFIX + key, "sk": RECORD_SK},
+                UpdateExpression="SET #status = :completed, #response = :response REMOVE LeaseExpires",
+                ConditionExpression="#owner = :owner",
+                ExpressionAttributeNames={"#status": "Status", "#response": "Response", "#owner": "Owner"},
+                ExpressionAttributeValues={":completed": COMPLETED, ":response": response, ":owner": owner},
+            )
+
+    def release(self, key: str, owner: str) -> None:
+        """
+        Forget a claim whose request failed, so a retry runs it again
+        """
+        with contextlib.suppress(self.table.meta.client.exceptions.ConditionalCheckFailedException):
+            self.table.delete_item(
+                Key={"pk": RECORD_PREFIX + key, "sk": RECORD_SK},
+                ConditionExpression="#owner = :owner",
+                ExpressionAttributeNames={"#owner": "Owner"},
+                ExpressionAttributeValues={":owner": owner},
+            )
+
+
+def idempotent(
+    app: APIGatewayRestResolver,
+    table_name: str | None,
+    scope: Callable[[], str] | None = None,
+    ttl: int = DEFAULT_TTL_SECONDS,
+) -> Callable:
+    """
+    Make a route idempotent: the first request runs it and its response is stored, repeats of the
+    same request get the stored response back. Place it below the route decorator.
+
+    `scope` returns who is calling (e.g. the user id) so that identical requests from different
+    callers are kept apart; by default it is the Authorization header. A repeat that arrives while
+    the first request is still running waits briefly for its response, then gets a 409. Reusing an
+    Idempotency-Key header for a different request gets a 422. Responses of failed requests (raised
+    exceptions) are not stored.
+    """
+
+    def decorator(route: Callable) -> Callable:
+        @functools.wraps(route)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+            event = app.current_event
+            caller = scope() if scope else event.get_header_value("Authorization", "", case_sensitive=False)
+            request = request_hash(event, caller)
+            client_key = event.get_header_value(KEY_HEADER, case_sensitive=False)
+            key = hashlib.sha256(f"{caller}|{client_key}".encode()).hexdigest() if client_key else request
+
+            store = IdempotencyStore(get_table(table_name), ttl)
+            owner = uuid7()
+            claimed, record = store.claim(key, request, owner, time.time())
+            if not claimed and record is None:
+                # The holder released the key between our put and read: it failed, so this request runs instead
+                claimed, record = store.claim(key, request, owner, time.time())
+            if claimed:
+                try:
+                    response = route(*args, **kwargs)
+                except BaseException:
+                    store.release(key, owner)
+                    raise
+                store.complete(key, owner, dump_response(response))
+                return response
+            return replay(store, key, request, record)
+
+        return wrapper
+
+    return decorator
+
+
+def replay(store: IdempotencyStore, key: str, request: str, record: dict | None) -> Any:  # noqa: ANN401
+    """
+    Get the stored response of a repeated request, waiting a little for one that is still in progress
+    """
+    if record and record["RequestHash"] != request:
+        raise ServiceError(422, f"The {KEY_HEADER} was already used for a different request")
+    deadline = time.monotonic() + DUPLICATE_WAIT_SECONDS
+    while record and record["Status"] == IN_PROGRESS and time.monotonic() < deadline:
+        time.sleep(DUPLICATE_POLL_SECONDS)
+        record = store.get(key)
+    if record and record["Status"] == COMPLETED:
+        return load_response(record["Response"])
+    raise ServiceError(409, "The same request is already in progress")
@@ -1,23 +1,148 @@
-# ruff: noqa: Q000
 """
 # --coding: utf-8 --
 Contains the lambda response functions and headers
 
+Bodies are serialized with the fastest JSON encoder available (orjson, else the standard library),
+and large bodies are compressed for clients that accept brotli or gzip.
+
 Returns:
-    dict: The lambda response
+    Response: The lambda response
 """
 
-HEADERS = {
-    'Content-Type': 'application/json',
-    'Access-Control-Allow-Headers': '*',
-    'Access-Control-Allow-Origin': '*',
-    'Access-Control-Allow-Methods': '*',
-}
+# ==================================================================================================
+# Python imports
+import base64
+import functools
+import gzip
+import json
+from collections.abc import Callable, Mapping
+from decimal import Decimal
+from os import environ
+from types import MappingProxyType
+from typing import Any
+
+# ==================================================================================================
+# Third party imports
+try:
+    import orjson
+except ImportError:  # optional: the standard library encoder is used without it
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: responses are only gzip compressed without it
+    brotli = None
+
+# ==================================================================================================
+# Powertools imports
+from aws_lambda_powertools.event_handler import Response
+
+# ==================================================================================================
+# Global declarations
+
+# Read-only, so the one copy can be shared by every response
+HEADERS: Mapping[str, str] = MappingProxyType(
+    {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Headers": "*",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "*",
+    },
+)
+
+# "orjson" (when installed) or "json"
+JSON_ENCODER = environ.get("JSON_ENCODER", "orjson")
+# Smaller bodies are sent as they are: compressing them saves less than it costs
+COMPRESSION_MIN_BYTES = int(environ.get("COMPRESSION_MIN_BYTES", "1024"))
+# Fast settings, as every body is compressed on the request path
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+# In order of preference
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+VARY_HEADERS: Mapping[str, str] = MappingProxyType({"Vary": "Accept-Encoding"})
+ENCODING_HEADERS: Mapping[str, Mapping[str, str]] = MappingProxyType(
+    {encoding: MappingProxyType({"Content-Encoding": encoding, **VARY_HEADERS}) for encoding in ENCODINGS},
+)
+
+# ==================================================================================================
+
+
+def _default(value: Any) -> Any:  # noqa: ANN401
+    """
+    Serialize what JSON has no type for: DynamoDB numbers, sets and read-only mappings
+    """
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, set | frozenset):
+        return list(value)
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+
+def _json_dumps(value: Any) -> str:  # noqa: ANN401
+    return json.dumps(value, separators=(",", ":"), default=_default)
+
+
+def _orjson_dumps(value: Any) -> str:  # noqa: ANN401
+    return orjson.dumps(value, default=_default).decode()
+
+
+def json_encoder(name: str | None = JSON_ENCODER) -> Callable[[Any], str]:
+    """
+    Get a JSON encoder by name. orjson falls back to the standard library when it is not installed
+    """
+    if name == "orjson" and orjson is not None:
+        return _orjson_dumps
+    return _json_dumps
+
+
+# The encoder of every response body; also the resolvers' serializer
+dumps = json_encoder()
+
+
+def RESPONSE(body: Any, status_code: int = 200, headers: Mapping[str, str] = HEADERS) -> Response:  # noqa: N802, ANN401
+    return Response(status_code=status_code, body=dumps(body), headers=headers)
+
+
+@functools.lru_cache(maxsize=64)
+def accepted_encoding(accept_encoding: str | None) -> str | None:
+    """
+    Get the preferred encoding an Accept-Encoding header allows, if any
+    """
+    accepted = set()
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.strip())
+    return next((encoding for encoding in ENCODINGS if encoding in accepted or "*" in accepted), None)
+
 
+def compress_response(response: dict, request_headers: Mapping[str, str] | None, min_bytes: int = COMPRESSION_MIN_BYTES) -> dict:
+    """
+    Compress the body of a resolved proxy response when it is large and the client accepts brotli or gzip
+    """
+    body = response.get("body")
+    if response.get("isBase64Encoded") or not isinstance(body, str) or len(body) < min_bytes:
+        return response
+    if any(name.lower() == "content-encoding" for name in response.get("multiValueHeaders") or response.get("headers") or {}):
+        return response
+    accept = next((value for name, value in (request_headers or {}).items() if name.lower() == "accept-encoding"), None)
+    encoding = accepted_encoding(accept)
+    added = ENCODING_HEADERS[encoding] if encoding else VARY_HEADERS
+    if "multiValueHeaders" in response:
+        headers = {**response["multiValueHeaders"], **{name: [value] for name, value in added.items()}}
+        response = {**response, "multiValueHeaders": headers}
+    else:
+        response = {**response, "headers": {**(response.get("headers") or {}), **added}}
+    if not encoding:
+        return response
 
-def RESPONSE(body: dict, status_code: int = 200, headers: dict = HEADERS) -> dict:  # noqa: N802
-    return {
-        'statusCode': status_code,
-        'headers': headers,
-        'body': body,
-    }
+    data = body.encode()
+    compressed = brotli.compress(data, quality=BROTLI_QUALITY) if encoding == "br" else gzip.compress(data, GZIP_LEVEL, mtime=0)
+    return {**response, "body": base64.b64encode(compressed).decode(), "isBase64Encoded": True}
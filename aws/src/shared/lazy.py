@@ -0,0 +1,32 @@
+"""
+# --coding: utf-8 --
+# Lazy imports
+# Defer heavy imports until an attribute of the module is first used
+"""
+
+# ==================================================================================================
+# Python imports
+import importlib.util
+import sys
+from types import ModuleType
+
+# ==================================================================================================
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Import a module lazily: the module object is returned immediately, and it is executed on first attribute access
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -1,13 +1,187 @@
-"""Module for logging."""
+"""Module for logging.
+
+Handlers log one structured record per invocation (log_invocation): a summary of the event, the
+fields the handler appended and, for a sampled share of requests, the redacted and truncated event
+and the handler's debug messages. Nothing is formatted unless it is written.
+"""
 
 ## ==================================================================================================
 ## Python imports
+import contextlib
+import functools
+import json
+import logging
+import time
+import zlib
+from collections.abc import Callable, Mapping
+from os import environ
+from typing import Any
 
 ## ==================================================================================================
 ## Powertools imports
 from aws_lambda_powertools import Logger
 
+## ==================================================================================================
+## Global declarations
+
+# Share of requests whose event and debug messages are logged, picked by request id
+SAMPLE_RATE = float(environ.get("LOG_SAMPLE_RATE", "0.01"))
+# Truncation of the values of sampled records
+MAX_STRING_CHARS = int(environ.get("LOG_MAX_STRING_CHARS", "512"))
+MAX_ITEMS = int(environ.get("LOG_MAX_ITEMS", "20"))
+MAX_DEPTH = 6
+# Values whose key contains one of these (case insensitive) are never logged
+REDACTED_KEYS = ("authorization", "cookie", "password", "secret", "token", "signature", "credential", "email", "phone")
+REDACTED = "[redacted]"
+# String values that hold JSON (e.g. request and message bodies), parsed so their secrets are redacted too
+JSON_KEYS = frozenset({"body", "Message"})
+
 ## ==================================================================================================
 ## Logger and tracer initialisation
 
 logger = Logger()
+
+## ==================================================================================================
+
+
+class Lazy:
+    """
+    A field value computed only when the record is written, e.g. Lazy(cache.stats)
+    """
+
+    __slots__ = ("function",)
+
+    def __init__(self, function: Callable[[], Any]) -> None:
+        self.function = function
+
+
+@functools.lru_cache(maxsize=1024)
+def is_redacted(key: str) -> bool:
+    key = key.lower()
+    return any(part in key for part in REDACTED_KEYS)
+
+
+def sanitize(value: Any, depth: int = 0) -> Any:  # noqa: ANN401
+    """
+    Get a copy of a value that is safe and small enough to log: secrets redacted, strings truncated
+    and collections cut to their first items
+    """
+    if isinstance(value, Lazy):
+        value = value.function()
+    if value is None or isinstance(value, bool | int | float):
+        return value
+    if isinstance(value, str):
+        return value if len(value) <= MAX_STRING_CHARS else f"{value[:MAX_STRING_CHARS]}…[{len(value)} chars]"
+    if depth >= MAX_DEPTH:
+        return f"[{type(value).__name__}]"
+    if isinstance(value, Mapping):
+        items = list(value.items())
+        sanitized = {str(key): sanitize_item(str(key), item, depth + 1) for key, item in items[:MAX_ITEMS]}
+        if len(items) > MAX_ITEMS:
+            sanitized["…"] = f"{len(items) - MAX_ITEMS} more keys"
+        return sanitized
+    if isinstance(value, list | tuple | set | frozenset):
+        items = list(value)
+        sanitized = [sanitize(item, depth + 1) for item in items[:MAX_ITEMS]]
+        if len(items) > MAX_ITEMS:
+            sanitized.append(f"…{len(items) - MAX_ITEMS} more items")
+        return sanitized
+    return sanitize(str(value), depth)
+
+
+def sanitize_item(key: str, value: Any, depth: int) -> Any:  # noqa: ANN401
+    if is_redacted(key):
+        return REDACTED
+    if key in JSON_KEYS and isinstance(value, str) and value[:1] in ("{", "["):
+        with contextlib.suppress(ValueError):
+            value = json.loads(value)
+    return sanitize(value, depth)
+
+
+def is_sampled(request_id: str | None, rate: float = SAMPLE_RATE) -> bool:
+    """
+    Whether a request is sampled. The same request id always gets the same answer, so its retries and
+    every function it passes through log alike
+    """
+    if rate <= 0 or not request_id:
+        return rate >= 1
+    return zlib.crc32(request_id.encode()) < rate * 2**32
+
+
+def summarize_event(event: Any) -> dict:  # noqa: ANN401
+    """
+    Get the few fields that identify an event, whatever its source
+    """
+    if not isinstance(event, Mapping):
+        return {"type": type(event).__name__}
+    if "httpMethod" in event:
+        return {"method": event["httpMethod"], "path": event.get("path")}
+    if "triggerSource" in event:
+        return {"trigger": event["triggerSource"], "user_pool": event.get("userPoolId")}
+    if records := event.get("Records"):
+        first = records[0]
+        return {"source": first.get("eventSource") or first.get("EventSource"), "records": len(records)}
+    return {"keys": sorted(event)[:MAX_ITEMS]}
+
+
+class InvocationLog:
+    """
+    Collects what a handler logs during an invocation and writes it as one record when it ends
+    """
+
+    def __init__(self, log: Logger = logger, sample_rate: float = SAMPLE_RATE) -> None:
+        self.log = log
+        self.sample_rate = sample_rate
+        self.cold_start = True
+        self.sampled = False
+        self._fields: dict[str, Any] = {}
+        self._debug: list[dict] = []
+
+    def append(self, **fields: Any) -> None:  # noqa: ANN401
+        """
+        Add fields to the invocation's record. Pass Lazy values for anything costly to compute
+        """
+        self._fields.update(fields)
+
+    def debug(self, message: str, **fields: Any) -> None:  # noqa: ANN401
+        """
+        Add a message to the record of a sampled invocation; otherwise it is dropped unformatted
+        """
+        if self.sampled:
+            self._debug.append({"message": message, **fields})
+
+    def log_invocation(self, handler: Callable) -> Callable:
+        """
+        Decorate a Lambda handler: write the invocation's record when it returns or raises
+        """
+
+        @functools.wraps(handler)
+        def wrapper(event: Any, context: Any) -> Any:  # noqa: ANN401
+            request_id = getattr(context, "aws_request_id", None)
+            cold_start, self.cold_start = self.cold_start, False
+            self.sampled = is_sampled(request_id, self.sample_rate)
+            self._fields, self._debug = {"request_id": request_id, "cold_start": cold_start}, []
+            start = time.perf_counter()
+            try:
+                response = handler(event, context)
+            except Exception:
+                if self.log.isEnabledFor(logging.ERROR):
+                    self.log.exception("Invocation failed", extra=self._record(event, start))
+                raise
+            if self.log.isEnabledFor(logging.INFO):
+                if isinstance(response, Mapping) and "statusCode" in response:
+                    self._fields["status"] = response["statusCode"]
+                self.log.info("Invocation", extra=self._record(event, start))
+            return response
+
+        return wrapper
+
+    def _record(self, event: Any, start: float) -> dict:  # noqa: ANN401
+        record = {**summarize_event(event), "duration_ms": round((time.perf_counter() - start) * 1000, 3), **sanitize(self._fields)}
+        if self.sampled:
+            record["event"] = sanitize(event)
+            record["debug"] = sanitize(self._debug)
+        return record
+
+
+invocation = InvocationLog()
@@ -0,0 +1,59 @@
+"""
+# --coding: utf-8 --
+# Media Utilities
+# Object keys and table records of user media, shared by the upload API and the media pipeline
+"""
+
+# ==================================================================================================
+# Python imports
+import re
+
+# ==================================================================================================
+# Global declarations
+
+# Media is stored once per user and content: media/<user id>/<sha256 of the content>
+MEDIA_PREFIX = "media/"
+# Renditions of a media object: renditions/<user id>/<sha256>/<rendition name>.jpg
+RENDITIONS_PREFIX = "renditions/"
+CONTENT_HASH_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+UPLOADING = "UPLOADING"
+UPLOADED = "UPLOADED"
+PROCESSED = "PROCESSED"
+# The content did not match its hash or could not be read as media
+INVALID = "INVALID"
+
+# ==================================================================================================
+
+
+def media_key(user_id: str, content_hash: str) -> str:
+    """
+    Get the S3 object key of a user's media
+    """
+    return f"{MEDIA_PREFIX}{user_id}/{content_hash}"
+
+
+def rendition_key(user_id: str, content_hash: str, name: str) -> str:
+    """
+    Get the S3 object key of a rendition of a user's media
+    """
+    return f"{RENDITIONS_PREFIX}{user_id}/{content_hash}/{name}.jpg"
+
+
+def parse_media_key(object_key: str) -> tuple[str, str] | None:
+    """
+    Get the (user id, content hash) of a media object key, or None for keys outside the media layout
+    """
+    if not object_key.startswith(MEDIA_PREFIX):
+        return None
+    user_id, _, content_hash = object_key[len(MEDIA_PREFIX) :].partition("/")
+    if not user_id or not CONTENT_HASH_PATTERN.fullmatch(content_hash):
+        return None
+    return user_id, content_hash
+
+
+def media_record_key(user_id: str, content_hash: str) -> dict:
+    """
+    Get the table key of the record tracking a user's media
+    """
+    return {"pk": f"USER#{user_id}", "sk": f"MEDIA#{content_hash}"}
@@ -0,0 +1,212 @@
+"""
+# --coding: utf-8 --
+# Metrics
+# Hot-path timings buffered in memory and written as CloudWatch Embedded Metric Format (EMF) records,
+# flushed once per invocation
+"""
+
+# ==================================================================================================
+# Python imports
+import functools
+import json
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from os import environ
+from typing import Any
+
+# ==================================================================================================
+# Global declarations
+NAMESPACE = environ.get("POWERTOOLS_METRICS_NAMESPACE") or environ.get("PROJECT_NAME") or "SnapNews"
+SERVICE = environ.get("POWERTOOLS_SERVICE_NAME") or environ.get("AWS_LAMBDA_FUNCTION_NAME") or "local"
+DISABLED = environ.get("POWERTOOLS_METRICS_DISABLED", "").lower() == "true"
+
+MILLISECONDS = "Milliseconds"
+COUNT = "Count"
+# EMF limits: values per metric and metrics per record
+MAX_VALUES = 100
+MAX_METRICS = 100
+# Handlers that are not decorated with log_metrics never flush; this bounds what they can buffer
+MAX_BUFFERED_VALUES = 10_000
+
+# Error codes that are answers rather than failures, so are not counted as errors
+EXPECTED_ERRORS = frozenset({"ConditionalCheckFailedException"})
+
+# Where the request start time is kept in botocore's per-call context
+_START_KEY = "metrics_start"
+
+# ==================================================================================================
+
+
+def elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+class Metrics:
+    """
+    A per-invocation buffer of metric values. Each value is one sample of the metric's histogram:
+    CloudWatch computes the percentiles from the value lists of the EMF records.
+
+    Recording a value is a list append, so timers can sit on the hot path; the records are built and
+    written to stdout (where the Lambda log agent extracts them) in one write by flush(). Handlers
+    record from worker threads too (boto3 calls in a pool), so the buffer is guarded by a lock.
+    """
+
+    def __init__(self, namespace: str = NAMESPACE, service: str = SERVICE) -> None:
+        self.namespace = namespace
+        self.service = service
+        self.cold_start = True
+        self._values: dict[str, list[float]] = {}
+        self._units: dict[str, str] = {}
+        self._dimensions: dict[str, str] = {}
+        self._properties: dict[str, Any] = {}
+        self._buffered = 0
+        self._lock = threading.Lock()
+
+    def add(self, name: str, value: float, unit: str = MILLISECONDS) -> None:
+        with self._lock:
+            if self._buffered >= MAX_BUFFERED_VALUES:
+                return
+            self._buffered += 1
+            values = self._values.get(name)
+            if values is None:
+                values = self._values[name] = []
+                self._units[name] = unit
+            values.append(value)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """
+        Record how long the block takes, in milliseconds, including when it raises
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, elapsed_ms(start))
+
+    def set_dimension(self, name: str, value: str) -> None:
+        with self._lock:
+            self._dimensions[name] = value
+
+    def set_property(self, name: str, value: Any) -> None:  # noqa: ANN401
+        """
+        Add a searchable field to the records that is not a metric dimension (e.g. a request id)
+        """
+        with self._lock:
+            self._properties[name] = value
+
+    def records(self) -> list[dict]:
+        """
+        Get the EMF records of the buffered values. Every metric is published per service and, when
+        dimensions are set (e.g. the route), per service and dimensions
+        """
+        with self._lock:
+            return self._records()
+
+    def _records(self) -> list[dict]:
+        dimensions = [["Service", *self._dimensions]]
+        if self._dimensions:
+            dimensions.append(["Service"])
+        fields = {"Service": self.service, **self._dimensions, **self._properties}
+        timestamp = int(time.time() * 1000)
+
+        records = []
+        rounds = max((len(values) - 1) // MAX_VALUES + 1 for values in self._values.values()) if self._values else 0
+        for index in range(rounds):
+            start = index * MAX_VALUES
+            names = [name for name, values in self._values.items() if len(values) > start]
+            for offset in range(0, len(names), MAX_METRICS):
+                chunk = names[offset : offset + MAX_METRICS]
+                directive = {
+                    "Namespace": self.namespace,
+                    "Dimensions": dimensions,
+                    "Metrics": [{"Name": name, "Unit": self._units[name]} for name in chunk],
+                }
+                record = {"_aws": {"Timestamp": timestamp, "CloudWatchMetrics": [directive]}, **fields}
+                for name in chunk:
+                    values = self._values[name][start : start + MAX_VALUES]
+                    record[name] = values if len(values) > 1 else values[0]
+                records.append(record)
+        return records
+
+    def flush(self) -> None:
+        """
+        Write the buffered values as EMF records and start a new buffer
+        """
+        with self._lock:
+            records = self._records()
+            self._values, self._units, self._dimensions, self._properties = {}, {}, {}, {}
+            self._buffered = 0
+        if records and not DISABLED:
+            sys.stdout.write("".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records))
+            sys.stdout.flush()
+
+    def log_metrics(self, handler: Callable) -> Callable:
+        """
+        Decorate a Lambda handler: time the invocation, flag cold starts and flush once at the end
+        """
+
+        @functools.wraps(handler)
+        def wrapper(event: Any, context: Any) -> Any:  # noqa: ANN401
+            # 1 on a cold start, 0 otherwise: the sum counts cold starts, the average is their rate
+            self.add("ColdStart", int(self.cold_start), COUNT)
+            self.cold_start = False
+            if request_id := getattr(context, "aws_request_id", None):
+                self.set_property("RequestId", request_id)
+            try:
+                with self.timer("Duration"):
+                    return handler(event, context)
+            finally:
+                self.flush()
+
+        return wrapper
+
+    def route_middleware(self, app: Any, next_middleware: Callable) -> Any:  # noqa: ANN401
+        """
+        Resolver middleware (app.use(middlewares=[metrics.route_middleware])): time the route and
+        add it as the Route dimension
+        """
+        route = f"{app.current_event.http_method} {app.context.get('_path', app.current_event.path)}"
+        self.set_dimension("Route", route)
+        with self.timer("RouteLatency"):
+            return next_middleware(app)
+
+    def instrument(self, client: Any) -> Any:  # noqa: ANN401
+        """
+        Record the latency of every call a boto3 client makes (retries included), as <service>.<operation>
+        """
+        events = client.meta.events
+        events.register("before-call", self._before_call)
+        events.register("after-call", self._after_call)
+        events.register("after-call-error", self._after_call_error)
+        return client
+
+    def _before_call(self, context: dict, **_kwargs: Any) -> None:  # noqa: ANN401
+        context[_START_KEY] = time.perf_counter()
+
+    def _after_call(self, model: Any, context: dict, http_response: Any = None, parsed: dict | None = None, **_kwargs: Any) -> None:  # noqa: ANN401
+        start = context.pop(_START_KEY, None)
+        if start is None:
+            return
+        name = f"{model.service_model.service_name}.{model.name}"
+        self.add(name, elapsed_ms(start))
+        if http_response is None or http_response.status_code < 300:  # noqa: PLR2004
+            return
+        # A failed condition is how conditional writes (e.g. idempotency claims) answer, not an error
+        if (parsed or {}).get("Error", {}).get("Code") not in EXPECTED_ERRORS:
+            self.add(f"{name}.Errors", 1, COUNT)
+
+    def _after_call_error(self, context: dict, **kwargs: Any) -> None:  # noqa: ANN401
+        # Raised before a response arrived (e.g. a connection error); the operation is in the event name
+        start = context.pop(_START_KEY, None)
+        if start is None:
+            return
+        operation = kwargs.get("event_name", "after-call-error.unknown.unknown").split(".", 1)[1]
+        self.add(operation, elapsed_ms(start))
+        self.add(f"{operation}.Errors", 1, COUNT)
+
+
+metrics = Metrics()
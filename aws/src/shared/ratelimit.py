@@ -0,0 +1,109 @@
+"""
+# --coding: utf-8 --
+# Rate Limit Utilities
+# Token buckets held in the single table and shared by every concurrent worker
+"""
+
+# ==================================================================================================
+# Python imports
+import math
+import time
+from collections.abc import Callable
+from decimal import Decimal
+from typing import Any
+
+# ==================================================================================================
+# Global declarations
+BUCKET_PREFIX = "RATELIMIT#"
+# Concurrent workers update a bucket with optimistic locking on UpdatedAt; a lost race is retried
+MAX_CONFLICT_RETRIES = 5
+CONFLICT_WAIT_SECONDS = 0.5
+
+# ==================================================================================================
+
+
+class TokenBucket:
+    """
+    A token bucket refilled at `rate` tokens per second up to `capacity`
+    """
+
+    __slots__ = ("capacity", "key", "rate")
+
+    def __init__(self, key: str, capacity: float, rate: float) -> None:
+        self.key = key
+        self.capacity = capacity
+        self.rate = rate
+
+    def table_key(self) -> dict:
+        scope, _, name = self.key.partition("/")
+        return {"pk": f"{BUCKET_PREFIX}{scope}", "sk": name or "APP"}
+
+
+class TokenBucketStore:
+    """
+    Token buckets stored as items (Tokens, UpdatedAt) and refilled lazily on every acquire.
+
+    Tokens are taken in bulk with one conditional update, so a worker holding 50 jobs for an
+    account pays one write, not 50. A bucket can go negative when the platform itself throttles
+    us, which keeps every worker away from it until it has refilled.
+    """
+
+    def __init__(self, table: Any, clock: Callable[[], float] = time.time) -> None:  # noqa: ANN401
+        self.table = table
+        self.clock = clock
+
+    def acquire(self, bucket: TokenBucket, wanted: int) -> tuple[int, float]:
+        """
+        Take up to `wanted` tokens. Returns the number granted and, if short, the seconds until the next token
+        """
+        for _ in range(MAX_CONFLICT_RETRIES):
+            now = self.clock()
+            item = self.table.get_item(Key=bucket.table_key(), ConsistentRead=True).get("Item")
+            if item:
+                tokens, updated_at = float(item["Tokens"]), item["UpdatedAt"]
+                available = min(bucket.capacity, tokens + (now - float(updated_at)) * bucket.rate)
+            else:
+                updated_at, available = None, bucket.capacity
+
+            granted = max(0, min(wanted, math.floor(available)))
+            wait = 0.0 if granted == wanted else (granted + 1 - available) / bucket.rate
+            if not granted:
+                return 0, wait
+            if self._write(bucket, available - granted, now, updated_at):
+                return granted, wait
+        return 0, CONFLICT_WAIT_SECONDS
+
+    def refund(self, bucket: TokenBucket, tokens: int) -> None:
+        """
+        Give back tokens that were acquired but not used
+        """
+        if tokens > 0:
+            self.table.update_item(
+                Key=bucket.table_key(),
+                UpdateExpression="SET Tokens = Tokens + :tokens",
+                ConditionExpression="attribute_exists(Tokens)",
+                ExpressionAttributeValues={":tokens": tokens},
+            )
+
+    def penalize(self, bucket: TokenBucket, seconds: float) -> None:
+        """
+        Empty a bucket so that it yields nothing for `seconds`, e.g. after the platform answered 429 with Retry-After
+        """
+        self.table.put_item(
+            Item={**bucket.table_key(), "Tokens": to_decimal(-seconds * bucket.rate), "UpdatedAt": to_decimal(self.clock())},
+        )
+
+    def _write(self, bucket: TokenBucket, tokens: float, now: float, previous: Decimal | None) -> bool:
+        if previous is None:
+            condition = {"ConditionExpression": "attribute_not_exists(pk)"}
+        else:
+            condition = {"ConditionExpression": "UpdatedAt = :previous", "ExpressionAttributeValues": {":previous": previous}}
+        try:
+            self.table.put_item(Item={**bucket.table_key(), "Tokens": to_decimal(tokens), "UpdatedAt": to_decimal(now)}, **condition)
+        except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+
+def to_decimal(value: float) -> Decimal:
+    return Decimal(str(round(value, 6)))
@@ -0,0 +1,199 @@
+"""
+# --coding: utf-8 --
+# Recurrence Utilities
+# Weekly posting slots compiled to bitmasks and expanded to UTC occurrences in bulk
+"""
+
+# ==================================================================================================
+# Python imports
+from bisect import bisect_right
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+# ==================================================================================================
+# Global declarations
+HOURS_PER_WEEK = 7 * 24
+DAY_SECONDS = 86400
+WEEK_SECONDS = 7 * DAY_SECONDS
+# 1970-01-01 was a Thursday, so Monday 00:00 falls 3 days into every epoch week
+EPOCH_WEEKDAY = 3
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+
+# UTC offset changes are months apart, so probing once a day and bisecting finds all of them
+TRANSITION_PROBE_SECONDS = DAY_SECONDS
+
+# ==================================================================================================
+
+
+@lru_cache(maxsize=1024)
+def offset_transitions(timezone: str, year: int) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    """
+    Get the UTC offsets of a timezone over a calendar year (plus a day either side).
+
+    Returns (switches, offsets): offsets[i] applies to local wall times before switches[i], and
+    offsets[-1] after the last one. A switch is placed at the local time where the later offset
+    takes over, which gives the same result as zoneinfo with fold=0: wall times skipped by a
+    forward change use the old offset (landing after the change) and repeated wall times resolve
+    to their first occurrence.
+    """
+    zone = ZoneInfo(timezone)
+
+    def offset_at(epoch_seconds: int) -> int:
+        return int(datetime.fromtimestamp(epoch_seconds, zone).utcoffset().total_seconds())
+
+    start = int(datetime(year, 1, 1, tzinfo=UTC).timestamp()) - 2 * DAY_SECONDS
+    end = int(datetime(year + 1, 1, 1, tzinfo=UTC).timestamp()) + 2 * DAY_SECONDS
+    offsets = [offset_at(start)]
+    switches = []
+
+    probe = start
+    while probe < end:
+        following = min(probe + TRANSITION_PROBE_SECONDS, end)
+        if offset_at(following) != offsets[-1]:
+            low, high = probe, following
+            while high - low > 1:
+                middle = (low + high) // 2
+                if offset_at(middle) == offsets[-1]:
+                    low = middle
+                else:
+                    high = middle
+            new_offset = offset_at(high)
+            switches.append(high + max(offsets[-1], new_offset))
+            offsets.append(new_offset)
+        probe = following
+
+    return tuple(switches), tuple(offsets)
+
+
+def week_start(local_seconds: int) -> int:
+    """
+    Get the Monday 00:00 at or before a wall time, both as seconds on a naive (local) epoch scale
+    """
+    days = local_seconds // DAY_SECONDS
+    return (days - (days + EPOCH_WEEKDAY) % 7) * DAY_SECONDS
+
+
+class Recurrence:
+    """
+    A weekly posting schedule in a timezone, e.g. every Monday and Thursday at 09:00 Europe/London.
+
+    The rule is compiled to one 168-bit mask (a bit per weekday and hour) for each minute past the
+    hour that is used, so rules are cheap to store, compare and group. Occurrences are produced by
+    walking the set bits week by week and resolving each wall time through the timezone's offset
+    transitions, never minute by minute.
+    """
+
+    __slots__ = ("_week_offsets", "masks", "timezone")
+
+    def __init__(self, timezone: str, masks: dict[int, int]) -> None:
+        ZoneInfo(timezone)  # Fail early on unknown zones
+        self.timezone = timezone
+        self.masks = {minute: mask for minute, mask in sorted(masks.items()) if mask}
+        self._week_offsets = sorted(
+            hour * 3600 + minute * 60 for minute, mask in self.masks.items() for hour in range(HOURS_PER_WEEK) if mask >> hour & 1
+        )
+
+    @classmethod
+    def from_slots(cls, timezone: str, slots: Iterable[tuple[int, int, int]]) -> "Recurrence":
+        """
+        Build a rule from (weekday, hour, minute) slots, Monday being weekday 0
+        """
+        masks = defaultdict(int)
+        for weekday, hour, minute in slots:
+            if not (0 <= weekday < 7 and 0 <= hour < 24 and 0 <= minute < 60):  # noqa: PLR2004
+                msg = f"Invalid slot: {(weekday, hour, minute)}"
+                raise ValueError(msg)
+            masks[minute] |= 1 << (weekday * 24 + hour)
+        return cls(timezone, masks)
+
+    @classmethod
+    def parse(cls, timezone: str, spec: str) -> "Recurrence":
+        """
+        Build a rule from a spec like "MO,TH 09:00; SA 10:30"
+        """
+        slots = []
+        for part in filter(None, (part.strip() for part in spec.split(";"))):
+            try:
+                days, clock = part.split()
+                hour, minute = (int(value) for value in clock.split(":"))
+                slots.extend((WEEKDAYS[day.strip().upper()], hour, minute) for day in days.split(","))
+            except (KeyError, ValueError) as e:
+                msg = f"Invalid recurrence spec: {part!r}"
+                raise ValueError(msg) from e
+        return cls.from_slots(timezone, slots)
+
+    def key(self) -> tuple:
+        return (self.timezone, tuple(self.masks.items()))
+
+    def to_dict(self) -> dict:
+        return {"timezone": self.timezone, "masks": {str(minute): f"{mask:x}" for minute, mask in self.masks.items()}}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Recurrence":
+        return cls(data["timezone"], {int(minute): int(mask, 16) for minute, mask in data["masks"].items()})
+
+    def occurrences(self, start: float, end: float) -> list[int]:
+        """
+        Get the occurrences in [start, end) as UTC epoch seconds, in order
+        """
+        if not self._week_offsets or end <= start:
+            return []
+
+        start, end = int(start), int(end)
+        first_year = datetime.fromtimestamp(start, UTC).year
+        last_year = datetime.fromtimestamp(end, UTC).year
+        result = []
+        for year in range(first_year, last_year + 1):
+            year_start = max(start, int(datetime(year, 1, 1, tzinfo=UTC).timestamp()))
+            year_end = min(end, int(datetime(year + 1, 1, 1, tzinfo=UTC).timestamp()))
+            result.extend(self._occurrences_in_year(year, year_start, year_end))
+        return result
+
+    def next(self, after: float, count: int) -> list[int]:
+        """
+        Get the next `count` occurrences strictly after `after`
+        """
+        if not self._week_offsets or count <= 0:
+            return []
+
+        result = []
+        window_start = int(after) + 1
+        # Enough weeks for the count, so one window is usually enough
+        window = (count // len(self._week_offsets) + 1) * WEEK_SECONDS
+        while len(result) < count:
+            result.extend(self.occurrences(window_start, window_start + window))
+            window_start += window
+        return result[:count]
+
+    def _occurrences_in_year(self, year: int, start: int, end: int) -> list[int]:
+        switches, offsets = offset_transitions(self.timezone, year)
+        result = []
+        week = week_start(start + min(offsets))
+        last_local = end + max(offsets)
+        while week <= last_local:
+            for week_offset in self._week_offsets:
+                local = week + week_offset
+                occurrence = local - offsets[bisect_right(switches, local)]
+                if start <= occurrence < end:
+                    result.append(occurrence)
+            week += WEEK_SECONDS
+        # Wall times skipped by a forward change can land on the same instant as the next slot
+        return sorted(set(result))
+
+
+def expand_all(rules: dict[str, Recurrence], start: float, end: float) -> dict[str, list[int]]:
+    """
+    Get the occurrences in [start, end) of many users' rules. Identical rules are expanded once
+    """
+    expanded = {}
+    result = {}
+    for user_id, rule in rules.items():
+        key = rule.key()
+        occurrences = expanded.get(key)
+        if occurrences is None:
+            occurrences = expanded[key] = rule.occurrences(start, end)
+        result[user_id] = occurrences
+    return result
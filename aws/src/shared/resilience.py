@@ -0,0 +1,98 @@
+"""
+# --coding: utf-8 --
+# Resilience Utilities
+# Deadline budgets and circuit breakers for calls to upstream services
+"""
+
+# ==================================================================================================
+# Python imports
+import threading
+import time
+
+# ==================================================================================================
+
+
+class Deadline:
+    """
+    A time budget that calls can draw their timeouts from
+    """
+
+    def __init__(self, budget_ms: float) -> None:
+        self.expires_at = time.monotonic() + max(budget_ms, 0) / 1000
+
+    @classmethod
+    def from_context(cls, context: object, cap_ms: float, reserve_ms: float = 0) -> "Deadline":
+        """
+        Build a deadline from the Lambda context, capped to `cap_ms` and keeping `reserve_ms` for the handler
+        """
+        remaining_ms = context.get_remaining_time_in_millis() if hasattr(context, "get_remaining_time_in_millis") else cap_ms
+        return cls(min(remaining_ms, cap_ms) - reserve_ms)
+
+    def remaining(self) -> float:
+        """
+        Get the remaining budget in seconds
+        """
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, limit: float) -> float:
+        """
+        Get a timeout for a single attempt: `limit` seconds, or less if the budget is running out
+        """
+        return min(limit, self.remaining())
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after `failure_threshold` consecutive failures.
+
+    The breaker stays open for `reset_timeout` seconds, then lets a single trial call through
+    (half-open). A success closes it again, a failure re-opens it. The state is per container,
+    so it survives across warm invocations.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = self.CLOSED
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may go through. In half-open state only one trial call is allowed
+        """
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN:
+                # Re-arm the open timer so concurrent callers keep short-circuiting during the trial
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._state == self.OPEN or self.failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self.opened_at = time.monotonic()
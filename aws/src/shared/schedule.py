@@ -0,0 +1,285 @@
+"""
+# --coding: utf-8 --
+# Schedule Utilities
+# Time-bucketed schedule store and the dispatcher that claims and fans out due jobs
+"""
+
+# ==================================================================================================
+# Python imports
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from typing import Any
+
+# ==================================================================================================
+# Module-level imports
+from shared.dynamodb import Table, get_data_table
+from shared.uuid import uuid7, uuid7_batch
+
+# ==================================================================================================
+# Global declarations
+
+# Jobs are stored under the minute they are due: pk = SCHEDULE#2025-01-31T09:30, sk = JOB#<uuid7>
+BUCKET_SECONDS = 60
+BUCKET_PREFIX = "SCHEDULE#"
+BUCKET_FORMAT = "%Y-%m-%dT%H:%M"
+JOB_PREFIX = "JOB#"
+
+PENDING = "PENDING"
+CLAIMED = "CLAIMED"
+DISPATCHED = "DISPATCHED"
+PUBLISHED = "PUBLISHED"
+FAILED = "FAILED"
+
+# A claimed job that is not marked dispatched within the lease is picked up again by a later run
+CLAIM_LEASE_SECONDS = 120
+# Dispatched jobs are kept for this long (through the table TTL) for auditing
+RETENTION_SECONDS = 7 * 24 * 3600
+# Buckets before the current one that each run revisits, to pick up missed runs and expired claims.
+# It must span more than the claim lease, or jobs whose send failed are never retried
+DEFAULT_LOOKBACK_BUCKETS = 10
+# Buckets older than the lookback are drained from a cursor: every bucket before it holds no job left to send.
+# After an outage a run sweeps at most this many of them, so a long backlog is drained over a few runs
+CURSOR_KEY = {"pk": "APP#DATA", "sk": "DISPATCH#CURSOR"}
+MAX_SWEEP_BUCKETS = 120
+FANOUT_BATCH_SIZE = 10
+CLAIM_WORKERS = 16
+
+# Bulk adds are written 25 jobs per BatchWriteItem (see shared.dynamodb) from this many threads
+BATCH_WRITE_WORKERS = 4
+
+# ==================================================================================================
+
+
+def bucket_key(epoch_seconds: float) -> str:
+    """
+    Get the partition key of the minute bucket a timestamp falls in
+    """
+    bucket_start = int(epoch_seconds) - int(epoch_seconds) % BUCKET_SECONDS
+    return BUCKET_PREFIX + datetime.fromtimestamp(bucket_start, UTC).strftime(BUCKET_FORMAT)
+
+
+def bucket_start(epoch_seconds: float) -> int:
+    return int(epoch_seconds) - int(epoch_seconds) % BUCKET_SECONDS
+
+
+def due_buckets(now: float, lookback: int = DEFAULT_LOOKBACK_BUCKETS, cursor: int | None = None) -> list[int]:
+    """
+    Get the starts of the buckets that can hold due jobs at `now`, oldest first: those from the cursor
+    (at most MAX_SWEEP_BUCKETS of them) and the last `lookback` ones
+    """
+    current = bucket_start(now)
+    window = range(current - lookback * BUCKET_SECONDS, current + 1, BUCKET_SECONDS)
+    if cursor is None:
+        return list(window)
+    return [*range(cursor, min(cursor + MAX_SWEEP_BUCKETS * BUCKET_SECONDS, window.start), BUCKET_SECONDS), *window]
+
+
+def chunks(items: list, size: int) -> Iterator[list]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class ScheduleStore:
+    """
+    Scheduled jobs in the single table, keyed by the minute bucket they are due in.
+
+    Claims are conditional updates, so concurrent dispatchers never hand out the same job twice
+    while its lease is valid. `clock` returns epoch seconds and can be replaced to simulate time.
+    Bulk adds go through `data_table`, the same table on the low-level client (shared.dynamodb).
+    """
+
+    def __init__(self, table: Any, clock: Callable[[], float] = time.time, data_table: Table | None = None) -> None:  # noqa: ANN401
+        self.table = table
+        self.clock = clock
+        self.data_table = data_table or get_data_table(table.name)
+
+    def add(self, user_id: str, object_key: str, due_at: float, details: dict | None = None) -> dict:
+        """
+        Store a pending job and return it
+        """
+        # A job due in the past is due now: the dispatcher only looks back so far for a new job
+        job = new_job(uuid7(), user_id, object_key, max(due_at, self.clock()), details)
+        self.table.put_item(Item=job, ConditionExpression="attribute_not_exists(sk)")
+        return job
+
+    def add_many(self, user_id: str, entries: list[tuple[str, float, dict | None]]) -> tuple[list[dict], set[str]]:
+        """
+        Store many (object_key, due_at, details) jobs with BatchWriteItem. Returns the jobs in input order and the ids of those not written.
+
+        Job ids come from one monotonic UUIDv7 batch, so they are unique and a retried put can only
+        overwrite the same job. Throttled and unprocessed puts are retried; the jobs still unwritten
+        after every attempt are reported rather than raised, since the others are already stored.
+        Jobs due in the past are due now, as in add.
+        """
+        now = self.clock()
+        jobs = [
+            new_job(job_id, user_id, object_key, max(due_at, now), details)
+            for job_id, (object_key, due_at, details) in zip(uuid7_batch(len(entries)), entries, strict=True)
+        ]
+        unprocessed = self.data_table.batch_write(puts=jobs, workers=BATCH_WRITE_WORKERS)
+        return jobs, {request["PutRequest"]["Item"]["JobId"] for request in unprocessed}
+
+    def due(self, bucket: str, now: float) -> list[dict]:
+        """
+        Get the jobs of a bucket that are due and either pending or holding an expired claim
+        """
+        kwargs = {
+            "KeyConditionExpression": "pk = :pk",
+            "FilterExpression": "DueAt <= :now AND (#status = :pending OR (#status = :claimed AND ClaimExpires < :now))",
+            "ExpressionAttributeNames": {"#status": "Status"},
+            "ExpressionAttributeValues": {":pk": bucket, ":now": int(now), ":pending": PENDING, ":claimed": CLAIMED},
+        }
+        jobs = []
+        while True:
+            response = self.table.query(**kwargs)
+            jobs.extend(response.get("Items", []))
+            if "LastEvaluatedKey" not in response:
+                return jobs
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def cursor(self) -> int | None:
+        """
+        Get the start of the oldest bucket that may still hold a job to send, if a dispatcher stored it
+        """
+        item = self.table.get_item(Key=CURSOR_KEY, ConsistentRead=True).get("Item")
+        return int(item["Cursor"]) if item else None
+
+    def set_cursor(self, cursor: int) -> None:
+        self.table.put_item(Item={**CURSOR_KEY, "Cursor": cursor})
+
+    def claim(self, job: dict, owner: str, now: float) -> bool:
+        """
+        Claim a job for `owner`. Returns False when another dispatcher holds it or it was dispatched
+        """
+        try:
+            self.table.update_item(
+                Key={"pk": job["pk"], "sk": job["sk"]},
+                UpdateExpression="SET #status = :claimed, ClaimedBy = :owner, ClaimExpires = :expires",
+                ConditionExpression="#status = :pending OR (#status = :claimed AND ClaimExpires < :now)",
+                ExpressionAttributeNames={"#status": "Status"},
+                ExpressionAttributeValues={
+                    ":claimed": CLAIMED,
+                    ":pending": PENDING,
+                    ":owner": owner,
+                    ":now": int(now),
+                    ":expires": int(now) + CLAIM_LEASE_SECONDS,
+                },
+            )
+        except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+    def complete(self, job: dict, owner: str, now: float) -> bool:
+        """
+        Mark a claimed job as dispatched; it then expires through the table TTL. Returns False when
+        the claim lapsed and another dispatcher took the job over
+        """
+        try:
+            self.table.update_item(
+                Key={"pk": job["pk"], "sk": job["sk"]},
+                UpdateExpression="SET #status = :dispatched, DispatchedAt = :now, ExpiresAt = :expires REMOVE ClaimExpires",
+                ConditionExpression="#status = :claimed AND ClaimedBy = :owner",
+                ExpressionAttributeNames={"#status": "Status"},
+                ExpressionAttributeValues={
+                    ":dispatched": DISPATCHED,
+                    ":claimed": CLAIMED,
+                    ":owner": owner,
+                    ":now": int(now),
+                    ":expires": int(now) + RETENTION_SECONDS,
+                },
+            )
+        except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+    def finish(self, job: dict, status: str, now: float, error: str | None = None) -> None:
+        """
+        Record the outcome of publishing a dispatched job
+        """
+        values = {":status": status, ":now": int(now)}
+        expression = "SET #status = :status, FinishedAt = :now"
+        if error:
+            expression += ", #error = :error"
+            values[":error"] = error
+        self.table.update_item(
+            Key={"pk": job["pk"], "sk": job["sk"]},
+            UpdateExpression=expression,
+            ExpressionAttributeNames={"#status": "Status", **({"#error": "Error"} if error else {})},
+            ExpressionAttributeValues=values,
+        )
+
+
+def new_job(job_id: str, user_id: str, object_key: str, due_at: float, details: dict | None = None) -> dict:
+    return {
+        "pk": bucket_key(due_at),
+        "sk": JOB_PREFIX + job_id,
+        "JobId": job_id,
+        "UserId": user_id,
+        "ObjectKey": object_key,
+        "DueAt": int(due_at),
+        "Status": PENDING,
+        **(details or {}),
+    }
+
+
+class Dispatcher:
+    """
+    Claims every due job in the recent buckets and sends them on in batches.
+
+    Buckets that went past the lookback while the dispatcher was down, or with a job it could not send,
+    are drained from the store's cursor, which each run moves up to the oldest bucket it left a job in.
+
+    `send_batch` receives up to FANOUT_BATCH_SIZE jobs and returns the ids of the jobs it failed
+    to send; those keep their claim and are retried by a later run once the lease expires. A sent
+    job whose lease lapsed before it was marked dispatched is counted as lost: another run may have
+    claimed and sent it again, and the publisher's idempotency keys absorb the duplicate.
+    """
+
+    def __init__(self, store: ScheduleStore, send_batch: Callable[[list[dict]], list[str]], owner: str | None = None) -> None:
+        self.store = store
+        self.send_batch = send_batch
+        self.owner = owner or uuid7()
+
+    def run(self, lookback: int = DEFAULT_LOOKBACK_BUCKETS) -> dict:
+        """
+        Dispatch the jobs due now and return the counts of found, claimed, sent, failed and lost jobs,
+        and of the buckets swept from the cursor
+        """
+        now = self.store.clock()
+        cursor = self.store.cursor()
+        buckets = due_buckets(now, lookback, cursor)
+        jobs = [job for bucket in buckets for job in self.store.due(bucket_key(bucket), now)]
+
+        with ThreadPoolExecutor(max_workers=CLAIM_WORKERS) as executor:
+            results = executor.map(lambda job: self.store.claim(job, self.owner, now), jobs)
+            claimed = [job for job, ok in zip(jobs, results, strict=True) if ok]
+
+        failed_ids = set()
+        for batch in chunks(claimed, FANOUT_BATCH_SIZE):
+            failed_ids.update(self.send_batch(batch))
+
+        sent = [job for job in claimed if job["JobId"] not in failed_ids]
+        with ThreadPoolExecutor(max_workers=CLAIM_WORKERS) as executor:
+            completed = list(executor.map(lambda job: self.store.complete(job, self.owner, now), sent))
+
+        # A due job this run did not dispatch keeps its bucket ahead of the cursor until a run finds it gone,
+        # and so does the rest of a backlog too long to sweep at once
+        done = {job["JobId"] for job, ok in zip(sent, completed, strict=True) if ok}
+        starts = [bucket_start(job["DueAt"]) for job in jobs if job["JobId"] not in done]
+        swept = buckets[: len(buckets) - lookback - 1]
+        if swept and swept[-1] + BUCKET_SECONDS < buckets[len(swept)]:
+            starts.append(swept[-1] + BUCKET_SECONDS)
+        next_cursor = min([*starts, bucket_start(now)])
+        if next_cursor != cursor:
+            self.store.set_cursor(next_cursor)
+
+        return {
+            "found": len(jobs),
+            "claimed": len(claimed),
+            "sent": len(sent),
+            "failed": len(failed_ids),
+            "lost": completed.count(False),
+            "swept": len(swept),
+        }
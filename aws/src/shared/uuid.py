@@ -7,14 +7,30 @@
 # ==================================================================================================
 # Python imports
 import os
+import threading
+import time
 
 # ==================================================================================================
+# Global declarations
 
+# Layout (RFC 9562, method 1): 48-bit unix_ts_ms | ver(4) | 12-bit counter | var(2) | 62 random bits
+COUNTER_BITS = 12
+COUNTER_MAX = (1 << COUNTER_BITS) - 1
+# The counter is seeded with its top bit cleared so that at least 2048 IDs fit in each millisecond
+COUNTER_SEED_MASK = COUNTER_MAX >> 1
+RANDOM_MASK = (1 << 62) - 1
+VERSION_VARIANT_BITS = (0x7 << 76) | (0b10 << 62)
 
-def uuid7(unix_timestamp: int) -> str:
+# ==================================================================================================
+
+
+def uuid7(unix_timestamp: int | None = None) -> str:
     """
-    Generate a UUIDv7 string from a Unix timestamp
+    Generate a UUIDv7 string from a Unix timestamp, or the next monotonic UUIDv7 when no timestamp is given
     """
+    if unix_timestamp is None:
+        return generator.generate(1)[0]
+
     ## Convert the timestamp to milliseconds
     timestamp_ms = unix_timestamp * 1000
 
@@ -39,3 +55,83 @@ def uuid7(unix_timestamp: int) -> str:
     uuid_string = f"{hex_string[0:8]}-{hex_string[8:12]}-{hex_string[12:16]}-{hex_string[16:20]}-{hex_string[20:32]}"
 
     return uuid_string
+
+
+def uuid7_batch(count: int, *, as_bytes: bool = False) -> list[str] | list[bytes]:
+    """
+    Generate `count` monotonic UUIDv7s in one call, as strings or raw 16-byte values
+    """
+    return generator.generate(count, as_bytes=as_bytes)
+
+
+class UUID7Generator:
+    """
+    Generates strictly increasing UUIDv7s using millisecond time and a 12-bit counter.
+
+    The counter is re-seeded randomly whenever the millisecond changes and incremented for every
+    ID within the same millisecond. If it overflows, or the clock goes backwards, the timestamp is
+    advanced past the last one issued, so IDs stay sortable and unique within the process.
+    Random bits for a whole batch are drawn with a single os.urandom call.
+    """
+
+    def __init__(self) -> None:
+        self.last_ms = 0
+        self.counter = 0
+        self._lock = threading.Lock()
+
+    def generate(self, count: int, *, as_bytes: bool = False) -> list[str] | list[bytes]:
+        values = self.generate_ints(count)
+        if as_bytes:
+            return [value.to_bytes(16, "big") for value in values]
+        return [format_uuid(value) for value in values]
+
+    def generate_ints(self, count: int) -> list[int]:
+        """
+        Generate `count` monotonic UUIDv7s as 128-bit integers
+        """
+        if count <= 0:
+            return []
+
+        random_bytes = os.urandom(8 * count)
+        random_ints = [int.from_bytes(random_bytes[i : i + 8], "big") for i in range(0, 8 * count, 8)]
+        values = []
+
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self.last_ms:
+                self.last_ms = now_ms
+                self.counter = (random_ints[0] >> 52) & COUNTER_SEED_MASK
+            else:
+                self._increment()
+
+            timestamp_ms = self.last_ms
+            counter = self.counter
+            for index, random_int in enumerate(random_ints):
+                if index:
+                    counter += 1
+                    if counter > COUNTER_MAX:
+                        timestamp_ms += 1
+                        counter = (random_int >> 52) & COUNTER_SEED_MASK
+                values.append((timestamp_ms << 80) | VERSION_VARIANT_BITS | (counter << 64) | (random_int & RANDOM_MASK))
+
+            self.last_ms = timestamp_ms
+            self.counter = counter
+
+        return values
+
+    def _increment(self) -> None:
+        self.counter += 1
+        if self.counter > COUNTER_MAX:
+            self.last_ms += 1
+            self.counter = 0
+
+
+def format_uuid(value: int) -> str:
+    """
+    Format a 128-bit integer as a hyphenated UUID string
+    """
+    hex_string = f"{value:032x}"
+    return f"{hex_string[0:8]}-{hex_string[8:12]}-{hex_string[12:16]}-{hex_string[16:20]}-{hex_string[20:32]}"
+
+
+generator = UUID7Generator()
@@ -0,0 +1,334 @@
+"""
+# --coding: utf-8 --
+# View Utilities
+# The materialized per-user home view, maintained from the job records and read with one GetItem
+"""
+
+# ==================================================================================================
+# Python imports
+import time
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime, timedelta
+from typing import Any
+from zoneinfo import ZoneInfo
+
+# ==================================================================================================
+# Module-level imports
+from shared.schedule import CLAIMED, DISPATCHED, FAILED, PENDING, PUBLISHED, chunks
+
+# ==================================================================================================
+# Global declarations
+
+# One item per user: pk = USER#<user id>, sk = VIEW#HOME, with two maps keyed by job id:
+#   Upcoming: jobs not published yet -> {DueAt, ObjectKey, Platform, AccountId}
+#   Results: jobs published or failed, until their record expires -> {Status, FinishedAt, Platform, Error}
+# Each entry is a function of the job's latest record only, so applying a change twice is harmless.
+# PENDING jobs never expire, so Upcoming keeps only the next HOME_VIEW_UPCOMING_LIMIT jobs and Later counts
+# the rest; as the kept ones finish, the next are read back from the UserJobs index (UserId, DueAt)
+HOME_VIEW_SK = "VIEW#HOME"
+UPCOMING_STATUSES = {PENDING, CLAIMED, DISPATCHED}
+FINISHED_STATUSES = {PUBLISHED, FAILED}
+UPCOMING_FIELDS = ("DueAt", "ObjectKey", "Platform", "AccountId")
+RESULT_FIELDS = ("Status", "FinishedAt", "Platform", "Error")
+# Jobs per UpdateItem, keeping the update expression well under its 4 KB limit
+CHANGES_PER_UPDATE = 40
+# Well over a week of posts for most users, so the per-day counts of the home screen stay whole
+HOME_VIEW_UPCOMING_LIMIT = 200
+USER_JOBS_INDEX = "UserJobs"
+MAX_UPDATE_ATTEMPTS = 3
+# Later moves by an atomic ADD, and a redelivered stream record must not move it twice: the view remembers the
+# records that moved it, at least a whole stream batch (500 records) of them
+COUNTED_LIMIT = 500
+
+HOME_UPCOMING_LIMIT = 20
+HOME_RECENT_LIMIT = 10
+HOME_SLOT_DAYS = 7
+
+# ==================================================================================================
+
+
+def home_view_key(user_id: str) -> dict:
+    return {"pk": f"USER#{user_id}", "sk": HOME_VIEW_SK}
+
+
+def view_entry(job: dict | None) -> tuple[str | None, dict | None]:
+    """
+    Get the map ("Upcoming", "Results" or None) a job record belongs in and its entry there
+    """
+    status = (job or {}).get("Status")
+    if status in UPCOMING_STATUSES:
+        return "Upcoming", {field: job[field] for field in UPCOMING_FIELDS if job.get(field) is not None}
+    if status in FINISHED_STATUSES:
+        return "Results", {field: job[field] for field in RESULT_FIELDS if job.get(field) is not None}
+    return None, None
+
+
+def build_home_view(user_id: str, jobs: Iterable[dict]) -> dict:
+    """
+    Build a user's home view from scratch out of their job records
+    """
+    view = {**home_view_key(user_id), "Upcoming": {}, "Results": {}}
+    for job in jobs:
+        name, entry = view_entry(job)
+        if name:
+            view[name][job["JobId"]] = entry
+    view["Upcoming"], view["Later"] = next_upcoming(view["Upcoming"])
+    return view
+
+
+def next_upcoming(entries: dict[str, dict]) -> tuple[dict[str, dict], int]:
+    """
+    Split upcoming entries into the next HOME_VIEW_UPCOMING_LIMIT ones, which a view keeps, and the number of the rest
+    """
+    ranked = sorted(entries.items(), key=lambda item: (item[1]["DueAt"], item[0]))
+    return dict(ranked[:HOME_VIEW_UPCOMING_LIMIT]), max(0, len(ranked) - HOME_VIEW_UPCOMING_LIMIT)
+
+
+def is_upcoming(job: dict | None) -> bool:
+    return (job or {}).get("Status") in UPCOMING_STATUSES
+
+
+def kept_changes(view: dict, changes: dict[str, dict | None]) -> set[str] | None:
+    """
+    Get the changed jobs a view keeps in Upcoming, or None when the kept entries can change and must be picked
+    again. That is when a kept entry leaves or moves past the last one while Later counts jobs that may replace
+    it, or a job the view does not keep comes before the last kept entry
+    """
+    upcoming = view.get("Upcoming", {})
+    due = {}
+    for job_id, job in changes.items():
+        name, entry = view_entry(job)
+        if name == "Upcoming":
+            due[job_id] = entry
+    if not view.get("Later"):
+        # Every upcoming job is kept: the view only has to pick when it outgrows its limit
+        held = (upcoming.keys() - changes.keys()) | due.keys()
+        return set(due) if len(held) <= HOME_VIEW_UPCOMING_LIMIT else None
+    if not upcoming:
+        return None
+    last = max((entry["DueAt"], job_id) for job_id, entry in upcoming.items())
+    kept = {job_id for job_id, entry in due.items() if (entry["DueAt"], job_id) <= last}
+    if any((job_id in upcoming) != (job_id in kept) for job_id in changes):
+        return None
+    return kept
+
+
+def later_change(view: dict, records: list[tuple[str, dict | None, dict | None]], kept: set[str]) -> tuple[int, list[str]]:
+    """
+    Get how many upcoming jobs the records add past the kept entries (or take away), and the records moving Later.
+    Records the view counted before move it no more
+    """
+    counted = set(view.get("Counted", []))
+    later, sequences = 0, []
+    for sequence, old, new in records:
+        step = is_upcoming(new) - is_upcoming(old)
+        if not step or sequence in counted:
+            continue
+        sequences.append(sequence)
+        job_id = (new or old)["JobId"]
+        if job_id not in view["Upcoming"] and job_id not in kept:
+            later += step
+    return later, sequences
+
+
+def remember(view: dict, sequences: list[str]) -> list[str]:
+    """
+    Get the stream records a view has counted in Later, with `sequences` added and only the latest COUNTED_LIMIT kept
+    """
+    return [*view.get("Counted", []), *sequences][-COUNTED_LIMIT:]
+
+
+def version_condition(version: object) -> tuple[str, dict]:
+    """
+    Get the condition that a view is still at `version` and its values
+    """
+    if version is None:
+        return "attribute_not_exists(Version)", {}
+    return "Version = :seen", {":seen": version}
+
+
+class HomeViewStore:
+    """
+    Applies job changes to the home views. `records` are a user's stream records in order, as
+    (sequence number, old image, new image) with None for the image of a job that did not exist
+    """
+
+    def __init__(self, table: Any) -> None:  # noqa: ANN401
+        self.table = table
+
+    def apply(self, user_id: str, records: list[tuple[str, dict | None, dict | None]]) -> None:
+        changes = {(new or old)["JobId"]: new for _, old, new in records}
+        conflict = self.table.meta.client.exceptions.ConditionalCheckFailedException
+        for attempt in range(MAX_UPDATE_ATTEMPTS):
+            view = self._view(user_id)
+            # Only a change of the kept entries needs the index; jobs coming and going past them just move Later
+            kept = kept_changes(view, changes)
+            try:
+                version = self._update(user_id, records, changes, view, kept)
+                if kept is None:
+                    self._refill(user_id, records, changes, view, version)
+                return
+            except conflict:
+                # Another update moved the view on meanwhile: decide again from its version
+                if attempt == MAX_UPDATE_ATTEMPTS - 1:
+                    raise
+
+    def _view(self, user_id: str) -> dict:
+        view = self.table.get_item(Key=home_view_key(user_id), ConsistentRead=True).get("Item")
+        if view is not None:
+            return view
+        # The maps of a user's first view must exist before paths into them are valid
+        view = {**build_home_view(user_id, []), "Version": 0}
+        try:
+            self.table.put_item(Item=view, ConditionExpression="attribute_not_exists(pk)")
+        except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+            return self.table.get_item(Key=home_view_key(user_id), ConsistentRead=True)["Item"]
+        return view
+
+    def _update(
+        self,
+        user_id: str,
+        records: list[tuple[str, dict | None, dict | None]],
+        changes: dict[str, dict | None],
+        view: dict,
+        kept: set[str] | None,
+    ) -> object:
+        """
+        Write the entries of the changed jobs, holding in Upcoming only the `kept` ones, and add the upcoming jobs
+        that came or went past the kept entries to Later. With `kept` None, every upcoming change is held and Later
+        left to the refill that picks again. Returns the view's new version
+        """
+        later, sequences = later_change(view, records, kept) if kept is not None else (0, [])
+        version = view.get("Version")
+        for index, batch in enumerate(chunks(list(changes.items()), CHANGES_PER_UPDATE)):
+            sets, removes = [], []
+            names = {"#upcoming": "Upcoming", "#results": "Results"}
+            values: dict[str, Any] = {":now": int(time.time()), ":one": 1}
+            for position, (job_id, job) in enumerate(batch):
+                names[f"#j{position}"] = job_id
+                name, entry = view_entry(job)
+                if name == "Upcoming" and kept is not None and job_id not in kept:
+                    name = None
+                for target in ("Upcoming", "Results"):
+                    if target == name:
+                        sets.append(f"#{target.lower()}.#j{position} = :j{position}")
+                        values[f":j{position}"] = entry
+                    else:
+                        removes.append(f"#{target.lower()}.#j{position}")
+
+            # Version changes on every update, so a rebuild can tell whether the view moved on while it was computed
+            adds = ["Version :one"]
+            if index == 0 and sequences:
+                sets.append("Counted = :counted")
+                values[":counted"] = remember(view, sequences)
+                if later:
+                    adds.append("Later :later")
+                    values[":later"] = later
+            expression = "SET " + ", ".join(["UpdatedAt = :now", *sets]) + " ADD " + ", ".join(adds)
+            if removes:
+                expression += " REMOVE " + ", ".join(removes)
+            condition, seen = version_condition(version)
+            response = self.table.update_item(
+                Key=home_view_key(user_id),
+                UpdateExpression=expression,
+                ConditionExpression=condition,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={**values, **seen},
+                ReturnValues="UPDATED_NEW",
+            )
+            version = response["Attributes"]["Version"]
+        return version
+
+    def _refill(
+        self,
+        user_id: str,
+        records: list[tuple[str, dict | None, dict | None]],
+        changes: dict[str, dict | None],
+        view: dict,
+        version: object,
+    ) -> None:
+        """
+        Pick the next upcoming entries again out of all of the user's jobs. The index lags the table, so the
+        changes being applied override what it holds for their jobs. Later is counted afresh, so the records moving
+        it are all counted by it
+        """
+        jobs = {job["JobId"]: job for job in self._upcoming_jobs(user_id)} | changes
+        upcoming = {}
+        for job_id, job in jobs.items():
+            name, entry = view_entry(job)
+            if name == "Upcoming":
+                upcoming[job_id] = entry
+        kept, later = next_upcoming(upcoming)
+        counted = set(view.get("Counted", []))
+        sequences = [sequence for sequence, old, new in records if is_upcoming(new) != is_upcoming(old) and sequence not in counted]
+        condition, seen = version_condition(version)
+        self.table.update_item(
+            Key=home_view_key(user_id),
+            UpdateExpression="SET Upcoming = :upcoming, Later = :later, Counted = :counted, UpdatedAt = :now ADD Version :one",
+            ConditionExpression=condition,
+            ExpressionAttributeValues={
+                ":upcoming": kept,
+                ":later": later,
+                ":counted": remember(view, sequences),
+                ":now": int(time.time()),
+                ":one": 1,
+                **seen,
+            },
+        )
+
+    def _upcoming_jobs(self, user_id: str) -> Iterator[dict]:
+        kwargs = {
+            "IndexName": USER_JOBS_INDEX,
+            "KeyConditionExpression": "UserId = :user",
+            "FilterExpression": "#status IN (:pending, :claimed, :dispatched)",
+            "ExpressionAttributeNames": {"#status": "Status"},
+            "ExpressionAttributeValues": {":user": user_id, ":pending": PENDING, ":claimed": CLAIMED, ":dispatched": DISPATCHED},
+        }
+        while True:
+            response = self.table.query(**kwargs)
+            yield from response.get("Items", [])
+            if "LastEvaluatedKey" not in response:
+                return
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def render_home(view: dict | None, now: float, timezone: str = "UTC") -> dict:
+    """
+    Get the home screen data of a view: the next posts, posts per day for the coming week and recent results.
+    Posts per day count the entries the view keeps, the next HOME_VIEW_UPCOMING_LIMIT
+    """
+    upcoming = sorted(
+        (to_api(job_id, entry) for job_id, entry in (view or {}).get("Upcoming", {}).items()),
+        key=lambda job: job["dueAt"],
+    )
+    results = sorted(
+        (to_api(job_id, entry) for job_id, entry in (view or {}).get("Results", {}).items()),
+        key=lambda result: result.get("finishedAt", 0),
+        reverse=True,
+    )
+
+    zone = ZoneInfo(timezone)
+    today = datetime.fromtimestamp(now, zone).date()
+    days = [today + timedelta(days=offset) for offset in range(HOME_SLOT_DAYS)]
+    per_day = dict.fromkeys(days, 0)
+    for job in upcoming:
+        day = datetime.fromtimestamp(job["dueAt"], UTC).astimezone(zone).date()
+        if day in per_day:
+            per_day[day] += 1
+
+    return {
+        "scheduled": len(upcoming) + int((view or {}).get("Later", 0)),
+        "published": sum(1 for result in results if result["status"] == PUBLISHED),
+        "failed": sum(1 for result in results if result["status"] == FAILED),
+        "upcoming": upcoming[:HOME_UPCOMING_LIMIT],
+        "days": [{"date": day.isoformat(), "scheduled": count} for day, count in per_day.items()],
+        "recent": results[:HOME_RECENT_LIMIT],
+    }
+
+
+def to_api(job_id: str, entry: dict) -> dict:
+    """
+    Get a view entry with camelCase fields and its numbers (Decimal in DynamoDB) as ints
+    """
+    fields = {name[0].lower() + name[1:]: int(value) if name.endswith("At") else value for name, value in entry.items()}
+    return {"jobId": job_id, **fields}